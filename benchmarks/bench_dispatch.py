@@ -0,0 +1,96 @@
+"""
+Стоимость маршрутизации апдейта в зависимости от числа кнопок меню:
+цепочка фильтров F.text == ... / F.data.startswith(...) против bot.dispatch.DispatchTable.
+
+    python -m benchmarks.bench_dispatch
+"""
+from aiogram import Bot, Dispatcher, F, Router
+from aiogram.fsm.context import FSMContext
+from aiogram.types import CallbackQuery, Chat, Message, Update, User
+from datetime import datetime
+import asyncio
+import time
+
+from bot.callbacks import MoodCallback
+from bot.dispatch import DispatchTable
+
+MENU_SIZES = (10, 50, 200, 1000)
+ROUNDS = 2000
+USER = User(id=1, is_bot=False, first_name="Bench")
+CHAT = Chat(id=1, type="private")
+
+
+async def _noop(event, state: FSMContext, *args) -> None:
+    return None
+
+
+def filter_chain(size: int) -> Router:
+    router = Router()
+    for i in range(size):
+        router.message(F.text == f"button {i}")(_noop)
+        router.callback_query(F.data.startswith(f"p{i}:"))(_noop)
+    router.message()(_noop)  # как обработчик свободного текста в режиме чата
+    return router
+
+
+def dispatch_table(size: int) -> Router:
+    router = Router()
+    table = DispatchTable()
+    table.attach(router)
+    for i in range(size):
+        table.text(f"button {i}")(_noop)
+    table.callback(MoodCallback)(_noop)
+    # Префиксы p0..pN ведут на тот же маршрут, как legacy_prefix.
+    for i in range(size):
+        table.callbacks[f"p{i}"] = table.callbacks[MoodCallback.__prefix__]
+    router.message()(_noop)
+    return router
+
+
+def message_update(text: str) -> Update:
+    return Update(update_id=1, message=Message(message_id=1, date=datetime.now(), chat=CHAT, from_user=USER, text=text))
+
+
+def callback_update(data: str) -> Update:
+    message = Message(message_id=1, date=datetime.now(), chat=CHAT, from_user=USER, text="-")
+    return Update(
+        update_id=1,
+        callback_query=CallbackQuery(id="1", from_user=USER, chat_instance="1", message=message, data=data),
+    )
+
+
+async def measure(dp: Dispatcher, bot: Bot, update: Update, rounds: int = ROUNDS) -> float:
+    """Микросекунды на один feed_update."""
+    for _ in range(100):
+        await dp.feed_update(bot, update)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await dp.feed_update(bot, update)
+    return (time.perf_counter() - started) / rounds * 1e6
+
+
+async def run() -> None:
+    bot = Bot(token="123456:BENCHMARK")
+    cases = [
+        ("last button", lambda size: message_update(f"button {size - 1}")),
+        ("free text", lambda size: message_update("просто сообщение")),
+        ("last callback", lambda size: callback_update(f"p{size - 1}:x")),
+    ]
+    print(f"{'case':14} {'buttons':>8} {'filters us':>11} {'table us':>9}")
+    for name, make_update in cases:
+        for size in MENU_SIZES:
+            results = []
+            for builder in (filter_chain, dispatch_table):
+                dp = Dispatcher()
+                dp.include_router(builder(size))
+                results.append(await measure(dp, bot, make_update(size)))
+            print(f"{name:14} {size:8} {results[0]:11.1f} {results[1]:9.1f}")
+    await bot.session.close()
+
+
+def main() -> None:
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
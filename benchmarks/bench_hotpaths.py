@@ -0,0 +1,300 @@
+"""
+Микробенчмарки CPU-работы, которую бот делает на каждый апдейт: тексты,
+клавиатуры, история для Gemini, результаты тестов и /stats.
+
+Каждый случай замеряется через timeit (autorange, затем REPEAT повторов),
+в отчёт идёт медиана времени одного вызова в микросекундах. Рядом
+печатается отношение к базовой линии из benchmarks/baselines.json;
+--save записывает текущие цифры как новую базовую линию, и этот файл
+коммитится вместе с изменением, которое их сдвинуло.
+
+    python -m benchmarks.bench_hotpaths [--filter stats] [--save] [--max-ratio 1.25]
+
+С --max-ratio процесс завершается с кодом 1, если какой-то случай медленнее
+базовой линии больше чем в заданное число раз. Базовая линия имеет смысл
+только для той же машины и версии Python — они записываются в файл и
+сверяются при сравнении.
+"""
+from collections import Counter
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from random import Random
+from typing import Callable, Dict, List, Optional, Tuple
+import argparse
+import json
+import platform
+import statistics
+import sys
+import timeit
+
+BASELINES_PATH = Path(__file__).with_name("baselines.json")
+REPEAT = 7
+STATS_SIZES = (1_000, 10_000, 100_000)
+HISTORY_TURNS = 20
+
+# имя случая -> фабрика, которая готовит данные и возвращает замеряемую функцию
+Case = Callable[[], Callable[[], object]]
+CASES: Dict[str, Case] = {}
+
+
+def case(name: str) -> Callable[[Case], Case]:
+    def register(factory: Case) -> Case:
+        CASES[name] = factory
+        return factory
+    return register
+
+
+@case("texts.get_text")
+def bench_get_text():
+    from utils.texts import LANGUAGE_RU, get_text
+
+    return lambda: get_text("start_prompt", LANGUAGE_RU)
+
+
+@case("texts.render_text")
+def bench_render_text():
+    from utils.texts import LANGUAGE_RU, render_text
+
+    return lambda: render_text("mood_saved", LANGUAGE_RU, score=7)
+
+
+@case("texts.get_quiz")
+def bench_get_quiz():
+    from utils.texts import LANGUAGE_RU, get_quiz, get_quiz_button_map
+
+    quiz_key = sorted(get_quiz_button_map(LANGUAGE_RU).values())[0]
+    return lambda: get_quiz(LANGUAGE_RU, quiz_key)
+
+
+@case("keyboards.main_menu")
+def bench_main_menu():
+    from bot.keyboards import build_keyboards, main_menu_keyboard
+    from utils.texts import LANGUAGE_RU
+
+    build_keyboards()
+    return lambda: main_menu_keyboard(LANGUAGE_RU)
+
+
+@case("keyboards.mood+form")
+def bench_mood_form():
+    from aiogram import Bot
+    from aiogram.methods import SendMessage
+    from bot.keyboards import build_keyboards, mood_keyboard
+    from bot.session import BotSession
+    from utils.texts import LANGUAGE_RU
+
+    build_keyboards()
+    bot = Bot("42:benchmark")
+    session = BotSession()
+    return lambda: session.build_form_data(
+        bot, SendMessage(chat_id=1, text="benchmark", reply_markup=mood_keyboard(LANGUAGE_RU))
+    )
+
+
+@case("keyboards.sequence_controls")
+def bench_sequence_keyboard():
+    from bot.keyboards import build_keyboards, sequence_keyboard
+    from utils.texts import LANGUAGE_RU
+
+    build_keyboards()
+    return lambda: sequence_keyboard(LANGUAGE_RU, paused=True)
+
+
+def _history(turns: int) -> List[Dict[str, object]]:
+    rng = Random(1)
+    history = []
+    for index in range(turns):
+        text = " ".join(rng.choice(["мен", "бүгін", "шаршадым", "тревожно", "спасибо", "ұйқы"]) for _ in range(40))
+        history.append({"role": "user" if index % 2 == 0 else "model", "text": text, "tokens": len(text) // 3 + 4})
+    return history
+
+
+@case(f"gemini._format_history[{HISTORY_TURNS}]")
+def bench_format_history():
+    from services.gemini import _format_history
+
+    history = _history(HISTORY_TURNS)
+    return lambda: _format_history(history)
+
+
+@case(f"gemini._build_contents[{HISTORY_TURNS}]")
+def bench_build_contents():
+    from config import settings
+    from services.gemini import _build_contents
+
+    history = _history(HISTORY_TURNS)
+    return lambda: _build_contents(history, "Как перестать думать о плохом?", settings.SYSTEM_PROMPT)
+
+
+@case("handlers.quiz_result_text")
+def bench_quiz_result():
+    from bot.handlers import quiz_result_text
+    from utils.texts import LANGUAGE_RU, get_quiz, get_quiz_button_map
+
+    quiz_key = sorted(get_quiz_button_map(LANGUAGE_RU).values())[0]
+    total = len(get_quiz(LANGUAGE_RU, quiz_key)["questions"])
+    return lambda: quiz_result_text(quiz_key, total // 2, total, LANGUAGE_RU)
+
+
+def _causes(language: str) -> List[str]:
+    from utils.texts import get_cause_options
+
+    return [value for _, value in get_cause_options(language)]
+
+
+@case("handlers.format_triggers")
+def bench_format_triggers():
+    from bot.handlers import format_triggers
+    from utils.texts import LANGUAGE_RU
+
+    counter = Counter({cause: index % 3 + 1 for index, cause in enumerate(_causes(LANGUAGE_RU))})
+    return lambda: format_triggers(counter, LANGUAGE_RU)
+
+
+def _checkin_rows(size: int) -> List[Tuple[datetime, str, str]]:
+    from database.stats import MOOD_VALUES
+    from utils.texts import LANGUAGE_RU
+
+    rng = Random(size)
+    moods, causes = list(MOOD_VALUES), _causes(LANGUAGE_RU)
+    now = datetime.utcnow()
+    return [
+        (now - timedelta(seconds=rng.randrange(7 * 86400)), rng.choice(moods), rng.choice(causes))
+        for _ in range(size)
+    ]
+
+
+def _fold_checkins(rows: List[Tuple[datetime, str, str]]):
+    """Разбор сырых check-in в Python, как /stats считал до дневных сводок."""
+    from database.stats import DEFAULT_MOOD_VALUE, MOOD_VALUES, summarize_days
+
+    days: Dict[date, List[int]] = {}
+    causes: Counter = Counter()
+    for created, mood, cause in rows:
+        totals = days.setdefault(created.date(), [0, 0])
+        totals[0] += 1
+        totals[1] += MOOD_VALUES.get(mood, DEFAULT_MOOD_VALUE)
+        causes[cause] += 1
+    return summarize_days([(day, count, score) for day, (count, score) in sorted(days.items())], causes)
+
+
+def _stats_rows_case(size: int) -> Case:
+    def factory():
+        rows = _checkin_rows(size)
+        return lambda: _fold_checkins(rows)
+    return factory
+
+
+for _size in STATS_SIZES:
+    case(f"stats.fold_checkins[{_size}]")(_stats_rows_case(_size))
+
+
+@case("stats.summarize_rollups[7d]")
+def bench_summarize_rollups():
+    from database.stats import summarize_days
+    from utils.texts import LANGUAGE_RU
+
+    today = date.today()
+    causes = _causes(LANGUAGE_RU)
+    rollups = [
+        (today - timedelta(days=offset), 5, 15 + offset, {cause: offset % 3 for cause in causes})
+        for offset in range(7)
+    ]
+
+    def run():
+        # Как rollup_stats: свернуть причины и передать дни в summarize_days.
+        counter: Counter = Counter()
+        days = []
+        for day, count, score_sum, day_causes in rollups:
+            days.append((day, count, score_sum))
+            counter.update(day_causes)
+        return summarize_days(days, counter)
+
+    return run
+
+
+@case("stats.message")
+def bench_stats_message():
+    from bot.handlers import format_triggers
+    from utils.texts import LANGUAGE_RU, get_text
+
+    stats = _fold_checkins(_checkin_rows(1_000))
+
+    def run():
+        # Текст ответа /stats, как его собирает cmd_stats.
+        best_day, best_avg = stats["best_day"]
+        worst_day, worst_avg = stats["worst_day"]
+        average_label = get_text("stats_average", LANGUAGE_RU)
+        return "\n".join([
+            get_text("stats_title", LANGUAGE_RU),
+            f"{get_text('stats_count', LANGUAGE_RU)} {stats['count']}",
+            f"{average_label} {stats['average']:.2f}",
+            f"{get_text('stats_triggers', LANGUAGE_RU)} {format_triggers(stats['triggers'], LANGUAGE_RU)}",
+            f"{get_text('stats_best_day', LANGUAGE_RU)} {best_day.isoformat()} ({average_label.lower()} {best_avg:.2f})",
+            f"{get_text('stats_worst_day', LANGUAGE_RU)} {worst_day.isoformat()} ({average_label.lower()} {worst_avg:.2f})",
+        ])
+
+    return run
+
+
+def measure(func: Callable[[], object]) -> float:
+    """Медиана времени одного вызова, мкс."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return statistics.median(timer.repeat(repeat=REPEAT, number=number)) / number * 1e6
+
+
+def environment() -> Dict[str, str]:
+    return {"python": platform.python_version(), "machine": platform.machine(), "node": platform.node()}
+
+
+def load_baselines(path: Path) -> Optional[dict]:
+    if not path.exists():
+        return None
+    baselines = json.loads(path.read_text(encoding="utf-8"))
+    if baselines.get("environment") != environment():
+        print(f"baselines in {path} were recorded on {baselines.get('environment')}, ratios are indicative only")
+    return baselines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", default="", help="только случаи, в имени которых есть подстрока")
+    parser.add_argument("--baselines", type=Path, default=BASELINES_PATH)
+    parser.add_argument("--save", action="store_true", help="записать результаты как базовую линию")
+    parser.add_argument("--max-ratio", type=float, default=None, help="упасть, если медленнее базы в N раз")
+    args = parser.parse_args()
+
+    baselines = load_baselines(args.baselines)
+    previous = (baselines or {}).get("results", {})
+    results: Dict[str, float] = {}
+    regressions = []
+    print(f"{'case':36} {'us/call':>10} {'baseline':>10} {'ratio':>7}")
+    for name, factory in CASES.items():
+        if args.filter not in name:
+            continue
+        results[name] = value = measure(factory())
+        base = previous.get(name)
+        if base:
+            ratio = value / base
+            print(f"{name:36} {value:10.2f} {base:10.2f} {ratio:7.2f}")
+            if args.max_ratio is not None and ratio > args.max_ratio:
+                regressions.append(name)
+        else:
+            print(f"{name:36} {value:10.2f} {'-':>10} {'-':>7}")
+
+    if args.save:
+        # Случаи, не попавшие под --filter, сохраняют прежние значения.
+        merged = {**previous, **results}
+        args.baselines.write_text(
+            json.dumps({"environment": environment(), "results": merged}, indent=2, ensure_ascii=False) + "\n",
+            encoding="utf-8",
+        )
+        print(f"saved {len(results)} results to {args.baselines}")
+    if regressions:
+        print(f"slower than {args.max_ratio}x baseline: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Сравнение старой сборки клавиатур на каждое сообщение с реестром bot.keyboards.
+
+    python -m benchmarks.bench_keyboards
+"""
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import SendMessage
+from aiogram.utils.keyboard import InlineKeyboardBuilder, ReplyKeyboardBuilder
+from typing import Callable, Tuple
+import timeit
+import tracemalloc
+
+from bot.keyboards import keyboards, main_menu_keyboard, mood_keyboard
+from bot.session import BotSession
+from utils.texts import LANGUAGE_RU, get_menu_buttons, get_mood_options
+
+ROUNDS = 20000
+
+
+def rebuild_main_menu(language: str):
+    builder = ReplyKeyboardBuilder()
+    for text in get_menu_buttons(language):
+        builder.button(text=text)
+    builder.adjust(1)
+    return builder.as_markup(resize_keyboard=True)
+
+
+def rebuild_mood(language: str):
+    builder = InlineKeyboardBuilder()
+    for text, value in get_mood_options(language):
+        builder.button(text=text, callback_data=f"mood:{value}")
+    builder.adjust(2)
+    return builder.as_markup()
+
+
+def send_form(session: AiohttpSession, bot: Bot, markup) -> object:
+    """Форма запроса sendMessage так, как её собирает сессия перед отправкой."""
+    return session.build_form_data(bot, SendMessage(chat_id=1, text="benchmark", reply_markup=markup))
+
+
+def measure(func: Callable[[], object], rounds: int = ROUNDS) -> Tuple[float, float]:
+    """Время (мкс) и выделенная память (байт) на один вызов."""
+    seconds = timeit.timeit(func, number=rounds)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for _ in range(1000):
+        func()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename") if stat.size_diff > 0)
+    return seconds / rounds * 1e6, allocated / 1000
+
+
+def main() -> None:
+    keyboards.build()
+    bot = Bot("42:benchmark")
+    plain_session = AiohttpSession()
+    prepared_session = BotSession()
+    cases = [
+        ("main_menu build", lambda: rebuild_main_menu(LANGUAGE_RU), lambda: main_menu_keyboard(LANGUAGE_RU)),
+        ("mood build", lambda: rebuild_mood(LANGUAGE_RU), lambda: mood_keyboard(LANGUAGE_RU)),
+        (
+            "main_menu build+form",
+            lambda: send_form(plain_session, bot, rebuild_main_menu(LANGUAGE_RU)),
+            lambda: send_form(prepared_session, bot, main_menu_keyboard(LANGUAGE_RU)),
+        ),
+        (
+            "mood build+form",
+            lambda: send_form(plain_session, bot, rebuild_mood(LANGUAGE_RU)),
+            lambda: send_form(prepared_session, bot, mood_keyboard(LANGUAGE_RU)),
+        ),
+        (
+            "mood form only",
+            lambda: send_form(plain_session, bot, mood_keyboard(LANGUAGE_RU)),
+            lambda: send_form(prepared_session, bot, mood_keyboard(LANGUAGE_RU)),
+        ),
+    ]
+    print(f"{'case':28} {'before us':>10} {'after us':>10} {'before B':>10} {'after B':>10}")
+    for name, before, after in cases:
+        before_time, before_bytes = measure(before)
+        after_time, after_bytes = measure(after)
+        print(f"{name:28} {before_time:10.2f} {after_time:10.2f} {before_bytes:10.0f} {after_bytes:10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Холодный старт: от запуска интерпретатора до первого обработанного апдейта.
+
+Каждый прогон — отдельный процесс. Внутри замеряются фазы: импорт main,
+сборка Bot и Dispatcher, startup-хуки (индексы, клавиатуры, прогрев кеша)
+и обработка одного /start. Запросы к Telegram не уходят — их перехватывает
+сессия-заглушка, но MongoDB из MONGO_URL должна быть доступна.
+
+    python -m benchmarks.bench_startup [--runs 5] [--importtime]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PHASES = ("import", "build", "startup", "first_update", "process")
+BENCH_USER_ID = 1
+
+
+def _start_update():
+    from datetime import datetime
+    from aiogram.types import Chat, Message, Update, User
+
+    user = User(id=BENCH_USER_ID, is_bot=False, first_name="Bench")
+    return Update(
+        update_id=1,
+        message=Message(
+            message_id=1,
+            date=datetime.now(),
+            chat=Chat(id=BENCH_USER_ID, type="private"),
+            from_user=user,
+            text="/start",
+        ),
+    )
+
+
+async def _cold_start() -> dict:
+    began = time.perf_counter()
+    marks = {}
+
+    import main as app
+    from aiogram import Bot
+    from bot.session import BotSession
+    from config import settings
+
+    marks["import"] = time.perf_counter()
+
+    class RecordingSession(BotSession):
+        """Сериализует запрос как настоящая сессия, но никуда его не отправляет."""
+
+        def __init__(self) -> None:
+            super().__init__()
+            self.methods = []
+
+        async def make_request(self, bot, method, timeout=None):
+            self.build_form_data(bot, method)
+            self.methods.append(method.__api_method__)
+            return True
+
+    session = RecordingSession()
+    bot = Bot(token=settings.BOT_TOKEN, session=session)
+    dp = app.build_dispatcher()
+    marks["build"] = time.perf_counter()
+
+    await dp.emit_startup(bot=bot, bots=[bot], dispatcher=dp)
+    marks["startup"] = time.perf_counter()
+
+    await dp.feed_update(bot, _start_update())
+    marks["first_update"] = time.perf_counter()
+
+    await dp.emit_shutdown(bot=bot, bots=[bot], dispatcher=dp)
+    result = {phase: (at - began) * 1000 for phase, at in marks.items()}
+    result["sent"] = session.methods
+    result["genai_imported"] = "google.genai" in sys.modules
+    result["modules"] = len(sys.modules)
+    return result
+
+
+def _child() -> None:
+    import asyncio
+
+    print(json.dumps(asyncio.run(_cold_start())))
+
+
+def _run_once(extra_flags=()) -> tuple:
+    env = dict(os.environ)
+    # Токен-заглушка: бенчмарк не должен трогать настоящего бота.
+    env["BOT_TOKEN"] = "123456:BENCHMARK"
+    env.setdefault("GEMINI_API_KEY", "benchmark")
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, *extra_flags, "-m", "benchmarks.bench_startup", "--child"],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    elapsed = (time.perf_counter() - started) * 1000
+    if completed.returncode != 0:
+        sys.stderr.write(completed.stderr)
+        raise SystemExit(f"child run failed with code {completed.returncode}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["process"] = elapsed
+    return result, completed.stderr
+
+
+def _print_importtime(stderr: str, top: int = 15) -> None:
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+    print(f"\nTop {top} imports by self time:")
+    print(f"{'self ms':>8} {'cumul ms':>9}  module")
+    for self_us, cumulative_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"{self_us / 1000:8.1f} {cumulative_us / 1000:9.1f}  {name}")
+
+
+def main() -> None:
+    if "--child" in sys.argv:
+        _child()
+        return
+    runs = int(sys.argv[sys.argv.index("--runs") + 1]) if "--runs" in sys.argv else 5
+
+    results = [_run_once()[0] for _ in range(runs)]
+    print(f"{runs} cold starts, ms since the child began importing the bot")
+    print("(process = wall clock of the whole child, incl. interpreter start and exit)")
+    print(f"{'phase':14} {'median':>9} {'min':>9} {'max':>9}")
+    for phase in PHASES:
+        values = [result[phase] for result in results]
+        print(f"{phase:14} {statistics.median(values):9.1f} {min(values):9.1f} {max(values):9.1f}")
+    last = results[-1]
+    print(f"\nmodules loaded: {last['modules']}, google.genai imported: {last['genai_imported']}")
+    print(f"requests sent for /start: {', '.join(last['sent']) or '-'}")
+
+    if "--importtime" in sys.argv:
+        _, stderr = _run_once(("-X", "importtime"))
+        _print_importtime(stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,14 +3,19 @@ from aiogram.filters import Command
 from aiogram.types import Message
 from bot.states import AppStates
 from aiogram import F, Router
+from typing import List
 import asyncio
 
 # --- ОБНОВЛЕННЫЕ ИМПОРТЫ ---
-from services.gemini import generate_gemini
+from services.ai_cache import make_key, response_cache
+from services.chat_history import make_turn, trim_history
+from services.gemini import MODEL, generate_gemini, is_error_reply, stream_gemini
 from utils.language import resolve_language
-from utils.texts import get_text
+from utils.texts import get_text, render_text
 from config import get_settings  # Для SYSTEM_PROMPT
 from bot.keyboards import main_menu_keyboard  # Для клавиатуры после ответа
+from bot.streaming import answer_streaming  # Потоковый вывод ответа
+from bot.conversation import CHAT_SESSION, begin_chat_session, chat_session, conversations, merge_texts  # Очередь ходов чата
 
 # ---------------------------
 
@@ -18,18 +23,35 @@ router = Router()
 settings = get_settings()
 
 
-# Вспомогательная функция, которая теперь использует пустой список истории
-async def _ask_gemini(user_text: str, language: str) -> str:
-    # 1. Формируем prompt для одноразового запроса
-    prompt = get_text("ai_chat_prompt", language).format(user_text=user_text)
-    prompt = f"{prompt}\n{get_text('fallback_prompt', language)}"
+# Одноразовый (stateless) запрос: ответ зависит только от языка, команды,
+# текста пользователя, системного промпта и модели, поэтому его можно кешировать.
+async def _ask_stateless(command: str, template: str, user_text: str, language: str) -> str:
+    prompt = template.format(user_text=user_text)
+    use_cache = response_cache.enabled_for(command)
+    if use_cache:
+        key = make_key(language, command, template, user_text, settings.SYSTEM_PROMPT, MODEL)
+        cached = await response_cache.get(key)
+        if cached is not None:
+            return cached
 
-    # 2. Вызываем новую функцию generate_gemini с ПУСТОЙ историей (stateless)
-    return await generate_gemini(
+    # Вызываем generate_gemini с ПУСТОЙ историей (stateless)
+    reply = await generate_gemini(
         history=[],
         new_prompt=prompt,
-        system_prompt=settings.SYSTEM_PROMPT
+        system_prompt=settings.SYSTEM_PROMPT,
+        command=command,
+        language=language,
     )
+    if use_cache and not is_error_reply(reply):
+        await response_cache.set(key, reply)
+    return reply
+
+
+# Вспомогательная функция для /ai
+async def _ask_gemini(user_text: str, language: str) -> str:
+    # Формируем шаблон prompt для одноразового запроса
+    template = f"{get_text('ai_chat_prompt', language)}\n{get_text('fallback_prompt', language)}"
+    return await _ask_stateless("ai", template, user_text, language)
 
 
 async def _ensure_chat_mode(message: Message, state: FSMContext, language: str) -> bool:
@@ -43,6 +65,7 @@ async def _ensure_chat_mode(message: Message, state: FSMContext, language: str)
     if current_state != AppStates.chat.state:
         # Убираем "start_chat_first" и переводим в чат-режим
         await state.set_state(AppStates.chat)
+        await begin_chat_session(state)
         await message.answer(get_text("chat_started", language), reply_markup=main_menu_keyboard(language))
         return True  # Разрешаем продолжить, т.к. только что переключились
     return True
@@ -64,7 +87,7 @@ async def cmd_ai(message: Message, state: FSMContext) -> None:
 
 
 # Все остальные команды обновляются по тому же принципу:
-# вызываем generate_gemini с пустой историей [] и settings.SYSTEM_PROMPT
+# вызываем _ask_stateless (пустая история [] и settings.SYSTEM_PROMPT, с кешем)
 
 @router.message(Command("emo"))
 async def cmd_emotion(message: Message, state: FSMContext) -> None:
@@ -75,14 +98,9 @@ async def cmd_emotion(message: Message, state: FSMContext) -> None:
         await message.answer(get_text("emotion_usage", language))
         return
     user_text = message.text.split(maxsplit=1)[1]
-    prompt = get_text("emotion_prompt", language).format(user_text=user_text)
 
-    # Вызов с пустой историей
-    reply = await generate_gemini(
-        history=[],
-        new_prompt=prompt,
-        system_prompt=settings.SYSTEM_PROMPT
-    )
+    # Вызов с пустой историей (через кеш)
+    reply = await _ask_stateless("emo", get_text("emotion_prompt", language), user_text, language)
     await message.answer(reply)
 
 
@@ -95,14 +113,9 @@ async def cmd_reframe(message: Message, state: FSMContext) -> None:
         await message.answer(get_text("reframe_usage", language))
         return
     user_text = message.text.split(maxsplit=1)[1]
-    prompt = get_text("reframe_prompt", language).format(user_text=user_text)
 
-    # Вызов с пустой историей
-    reply = await generate_gemini(
-        history=[],
-        new_prompt=prompt,
-        system_prompt=settings.SYSTEM_PROMPT
-    )
+    # Вызов с пустой историей (через кеш)
+    reply = await _ask_stateless("reframe", get_text("reframe_prompt", language), user_text, language)
     await message.answer(reply)
 
 
@@ -115,14 +128,9 @@ async def cmd_decision(message: Message, state: FSMContext) -> None:
         await message.answer(get_text("decision_usage", language))
         return
     user_text = message.text.split(maxsplit=1)[1]
-    prompt = get_text("decision_prompt", language).format(user_text=user_text)
 
-    # Вызов с пустой историей
-    reply = await generate_gemini(
-        history=[],
-        new_prompt=prompt,
-        system_prompt=settings.SYSTEM_PROMPT
-    )
+    # Вызов с пустой историей (через кеш)
+    reply = await _ask_stateless("decision", get_text("decision_prompt", language), user_text, language)
     await message.answer(reply)
 
 
@@ -135,14 +143,9 @@ async def cmd_stress_ai(message: Message, state: FSMContext) -> None:
         await message.answer(get_text("stress_ai_usage", language))
         return
     user_text = message.text.split(maxsplit=1)[1]
-    prompt = get_text("stress_ai_prompt", language).format(user_text=user_text)
 
-    # Вызов с пустой историей
-    reply = await generate_gemini(
-        history=[],
-        new_prompt=prompt,
-        system_prompt=settings.SYSTEM_PROMPT
-    )
+    # Вызов с пустой историей (через кеш)
+    reply = await _ask_stateless("stress_ai", get_text("stress_ai_prompt", language), user_text, language)
     await message.answer(reply)
 
 
@@ -155,14 +158,9 @@ async def cmd_mental_ai(message: Message, state: FSMContext) -> None:
         await message.answer(get_text("mental_ai_usage", language))
         return
     user_text = message.text.split(maxsplit=1)[1]
-    prompt = get_text("mental_ai_prompt", language).format(user_text=user_text)
 
-    # Вызов с пустой историей
-    reply = await generate_gemini(
-        history=[],
-        new_prompt=prompt,
-        system_prompt=settings.SYSTEM_PROMPT
-    )
+    # Вызов с пустой историей (через кеш)
+    reply = await _ask_stateless("mental_ai", get_text("mental_ai_prompt", language), user_text, language)
     await message.answer(reply)
 
 
@@ -170,35 +168,59 @@ async def cmd_mental_ai(message: Message, state: FSMContext) -> None:
 @router.message(AppStates.chat, F.text)
 async def fallback_ai(message: Message, state: FSMContext) -> None:
     language = await resolve_language(state, message.from_user.id)
+    # Сообщения, присланные подряд, получают один общий ответ (см. bot/conversation.py)
+    await conversations.submit(message, state, language, _reply_fallback_ai)
 
-    # Отправляем "печатает..."
-    await message.bot.send_chat_action(chat_id=message.from_user.id, action="typing")
+
+async def _reply_fallback_ai(messages: List[Message], state: FSMContext, language: str) -> None:
+    message = messages[-1]
 
     data = await state.get_data()
     # history - это список объектов: [{"role": "user", "text": "..."}, {"role": "model", "text": "..."}]
     history = data.get("chat_history", [])
-    user_prompt = message.text
+    session = data.get(CHAT_SESSION)
+    user_prompt = merge_texts(messages)
 
     # 1. Формируем prompt (в данном случае, просто текст пользователя)
     # Используем `ai_chat_prompt` и `fallback_prompt` для общей беседы, как в вашей старой логике
     final_prompt = (
-        f"{get_text('ai_chat_prompt', language).format(user_text=message.text)}\n"
+        f"{render_text('ai_chat_prompt', language, user_text=user_prompt)}\n"
         f"{get_text('fallback_prompt', language)}"
     )
 
     # 2. Вызываем Gemini, передавая ИСТОРИЮ
-    ai_response_text = await generate_gemini(
-        history=history,
-        new_prompt=final_prompt,
-        system_prompt=settings.SYSTEM_PROMPT
-    )
-
-    # 3. Обновляем историю для следующего сообщения
-    history.append({"role": "user", "text": user_prompt})  # Сохраняем чистый текст пользователя
-    history.append({"role": "model", "text": ai_response_text})
-
-    # Ограничиваем историю до последних 20 сообщений
-    await state.update_data(chat_history=history[-20:])
-
-    # 4. Отправляем ответ пользователю
-    await message.answer(ai_response_text, reply_markup=main_menu_keyboard(language))
\ No newline at end of file
+    if settings.GEMINI_STREAMING:
+        # Ответ показывается по мере генерации, "печатает..." отправляет answer_streaming
+        ai_response_text = await answer_streaming(
+            message,
+            stream_gemini(
+                history=history, new_prompt=final_prompt, system_prompt=settings.SYSTEM_PROMPT, language=language
+            ),
+            reply_markup=main_menu_keyboard(language),
+        )
+    else:
+        # Отправляем "печатает..."
+        await message.bot.send_chat_action(chat_id=message.chat.id, action="typing")
+        ai_response_text = await generate_gemini(
+            history=history,
+            new_prompt=final_prompt,
+            system_prompt=settings.SYSTEM_PROMPT,
+            language=language,
+        )
+
+    # 3. Обновляем историю для следующего сообщения (заглушку вместо ответа не сохраняем),
+    # если пользователь, пока готовился ответ, не вышел из чата и не начал новый разговор
+    if (
+        not is_error_reply(ai_response_text)
+        and await state.get_state() == AppStates.chat.state
+        and await chat_session(state) == session
+    ):
+        history.append(await make_turn("user", user_prompt, MODEL))  # Сохраняем чистый текст пользователя
+        history.append(await make_turn("model", ai_response_text, MODEL))
+
+        # Ограничиваем историю бюджетом токенов модели
+        await state.update_data(chat_history=trim_history(history, MODEL))
+
+    # 4. Отправляем ответ пользователю (в потоковом режиме он уже показан)
+    if not settings.GEMINI_STREAMING:
+        await message.answer(ai_response_text, reply_markup=main_menu_keyboard(language))
@@ -0,0 +1,27 @@
+from aiogram.filters.callback_data import CallbackData
+
+# Префиксы из одной буквы: callback_data ограничен 64 байтами и уходит с каждым нажатием.
+
+
+class MoodCallback(CallbackData, prefix="m"):
+    value: str
+
+
+class CauseCallback(CallbackData, prefix="c"):
+    value: str
+
+
+class StressCallback(CallbackData, prefix="s"):
+    value: str
+
+
+class QuizAnswerCallback(CallbackData, prefix="q"):
+    value: str
+
+
+class LanguageCallback(CallbackData, prefix="l"):
+    code: str
+
+
+class SequenceCallback(CallbackData, prefix="x"):
+    action: str  # pause | resume | stop
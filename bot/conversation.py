@@ -0,0 +1,160 @@
+from aiogram.exceptions import TelegramAPIError
+from aiogram.fsm.context import FSMContext
+from aiogram.types import Message
+from typing import Awaitable, Callable, Dict, List, Optional
+import asyncio
+import logging
+import time
+import uuid
+
+from config import get_settings
+from utils.texts import get_text
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Отвечает на пачку сообщений пользователя одним ходом диалога.
+Responder = Callable[[List[Message], FSMContext, str], Awaitable[None]]
+
+# Ключ данных FSM: номер разговора CHAT AI. Каждый вход в чат начинает новый,
+# и ответ, начатый в старом разговоре, не пишет в него историю.
+CHAT_SESSION = "chat_session"
+
+
+async def begin_chat_session(state: FSMContext) -> None:
+    await state.update_data({CHAT_SESSION: uuid.uuid4().hex})
+
+
+async def chat_session(state: FSMContext) -> Optional[str]:
+    return (await state.get_data()).get(CHAT_SESSION)
+
+
+def merge_texts(messages: List[Message]) -> str:
+    """Несколько коротких сообщений подряд — один запрос к модели."""
+    return "\n".join(message.text for message in messages if message.text)
+
+
+class _Conversation:
+    __slots__ = (
+        "messages", "state", "mode", "session", "language", "responder", "arrived", "first_arrived", "busy",
+        "notified", "worker",
+    )
+
+    def __init__(self, state: FSMContext, language: str, responder: Responder) -> None:
+        self.messages: List[Message] = []
+        self.state = state
+        self.mode: Optional[str] = None  # состояние FSM, в котором пришли сообщения
+        self.session: Optional[str] = None  # и разговор (CHAT_SESSION)
+        self.language = language
+        self.responder = responder
+        self.arrived = asyncio.Event()
+        self.first_arrived = 0.0
+        self.busy = False  # ответ на предыдущую пачку ещё готовится
+        self.notified = False  # о том, что ответ в работе, уже сказали
+        self.worker: Optional[asyncio.Task] = None
+
+
+class ConversationQueue:
+    """
+    Очередь ходов CHAT AI по чатам.
+
+    Обработчик сообщения только кладёт его в очередь своего чата и сразу
+    возвращается, не занимая шард диспетчера на время ответа модели. На чат
+    работает одна задача: она ждёт, пока пользователь перестанет писать
+    (CHAT_DEBOUNCE секунд тишины, но не дольше CHAT_DEBOUNCE_MAX от первого
+    сообщения), склеивает пачку в один запрос и отвечает. Ходы одного чата
+    идут строго по очереди, поэтому chat_history не перезаписывается
+    параллельными ответами. Сообщение, пришедшее, пока ответ ещё готовится,
+    попадает в следующий ход, а пользователь один раз получает chat_pending.
+    Если к началу хода пользователь уже в другом состоянии FSM (вышел из
+    чата, начал тест) или начал новый разговор, накопленная пачка
+    отбрасывается.
+    """
+
+    def __init__(self) -> None:
+        self._conversations: Dict[int, _Conversation] = {}
+
+    def pending(self) -> int:
+        return sum(len(conversation.messages) for conversation in self._conversations.values())
+
+    def active(self) -> int:
+        return len(self._conversations)
+
+    async def submit(self, message: Message, state: FSMContext, language: str, responder: Responder) -> None:
+        chat_id = message.chat.id
+        mode = await state.get_state()
+        session = await chat_session(state)
+        conversation = self._conversations.get(chat_id)
+        if conversation is None:
+            conversation = self._conversations[chat_id] = _Conversation(state, language, responder)
+        conversation.mode = mode
+        conversation.session = session
+        conversation.language = language
+        conversation.responder = responder
+        if len(conversation.messages) >= settings.CHAT_QUEUE_MAX:
+            logger.info("Chat %s: conversation queue full, message %s dropped", chat_id, message.message_id)
+            return
+        if not conversation.messages:
+            conversation.first_arrived = time.monotonic()
+        conversation.messages.append(message)
+        conversation.arrived.set()
+        if conversation.worker is None:
+            conversation.worker = asyncio.create_task(self._run(chat_id, conversation), name=f"chat-{chat_id}")
+        if conversation.busy and not conversation.notified:
+            conversation.notified = True
+            try:
+                await message.answer(get_text("chat_pending", language))
+            except TelegramAPIError as e:
+                logger.info("Chat %s: pending notice not sent: %s", chat_id, e)
+
+    async def _debounce(self, conversation: _Conversation) -> None:
+        while True:
+            conversation.arrived.clear()
+            left = conversation.first_arrived + settings.CHAT_DEBOUNCE_MAX - time.monotonic()
+            if left <= 0:
+                return
+            try:
+                await asyncio.wait_for(conversation.arrived.wait(), timeout=min(settings.CHAT_DEBOUNCE, left))
+            except asyncio.TimeoutError:
+                return
+
+    async def _run(self, chat_id: int, conversation: _Conversation) -> None:
+        try:
+            while conversation.messages:
+                await self._debounce(conversation)
+                batch, conversation.messages = conversation.messages, []
+                if (
+                    await conversation.state.get_state() != conversation.mode
+                    or await chat_session(conversation.state) != conversation.session
+                ):
+                    logger.info("Chat %s: left the conversation, %d queued message(s) dropped", chat_id, len(batch))
+                    continue
+                conversation.busy = True
+                conversation.notified = False
+                try:
+                    await conversation.responder(batch, conversation.state, conversation.language)
+                except Exception:
+                    logger.exception("Chat %s: reply to %d message(s) failed", chat_id, len(batch))
+                finally:
+                    conversation.busy = False
+                if conversation.messages:
+                    # Пользователь уже ждал, пока готовился ответ, — следующую пачку не задерживаем.
+                    conversation.first_arrived = 0.0
+        finally:
+            if self._conversations.get(chat_id) is conversation:
+                del self._conversations[chat_id]
+
+    async def idle(self, chat_id: int) -> None:
+        """Дожидается, пока на все сообщения чата, уже стоящие в очереди, будет дан ответ."""
+        conversation = self._conversations.get(chat_id)
+        if conversation is not None and conversation.worker is not None:
+            await asyncio.wait({conversation.worker})
+
+    async def close(self) -> None:
+        """Дожидается начатых ответов при остановке бота."""
+        workers = [conversation.worker for conversation in self._conversations.values() if conversation.worker]
+        if workers:
+            await asyncio.gather(*workers, return_exceptions=True)
+
+
+conversations = ConversationQueue()
@@ -0,0 +1,101 @@
+from aiogram import Router
+from aiogram.filters import Filter
+from aiogram.filters.callback_data import CallbackData
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State
+from aiogram.types import CallbackQuery, Message
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple, Type, Union
+
+TextHandler = Callable[[Message, FSMContext], Awaitable[Any]]
+CallbackHandler = Callable[[CallbackQuery, FSMContext, Any], Awaitable[Any]]
+
+# префикс -> (фабрика, обработчик, требуемое состояние)
+CallbackRoute = Tuple[Type[CallbackData], CallbackHandler, Optional[str]]
+
+
+class _TextFilter(Filter):
+    def __init__(self, table: "DispatchTable") -> None:
+        self.table = table
+
+    async def __call__(self, message: Message) -> Union[bool, Dict[str, Any]]:
+        handler = self.table.texts.get(message.text) if message.text else None
+        if handler is None:
+            return False
+        return {"route": handler}
+
+
+class _CallbackFilter(Filter):
+    def __init__(self, table: "DispatchTable") -> None:
+        self.table = table
+
+    async def __call__(self, callback: CallbackQuery, raw_state: Optional[str] = None) -> Union[bool, Dict[str, Any]]:
+        if not callback.data:
+            return False
+        prefix, _, rest = callback.data.partition(":")
+        route = self.table.callbacks.get(prefix)
+        if route is None:
+            return False
+        factory, handler, state = route
+        if state is not None and raw_state != state:
+            return False
+        try:
+            # Старые клавиатуры в чатах присылают длинный префикс — подменяем его на новый.
+            callback_data = factory.unpack(f"{factory.__prefix__}{factory.__separator__}{rest}")
+        except (TypeError, ValueError):
+            return False
+        return {"route": handler, "callback_data": callback_data}
+
+
+class DispatchTable:
+    """
+    Кнопки reply-клавиатур и callback-префиксы, разрешаемые через словарь.
+
+    Вместо цепочки фильтров F.text == ... / F.data.startswith(...), которую
+    aiogram проверяет по одному для каждого сообщения, на роутер вешается
+    по одному обработчику на сообщения и callback-и: текст кнопки или
+    префикс callback_data ищется в таблице за O(1), независимо от числа меню.
+    """
+
+    def __init__(self) -> None:
+        self.texts: Dict[str, TextHandler] = {}
+        self.callbacks: Dict[str, CallbackRoute] = {}
+
+    def attach(self, router: Router) -> None:
+        """Регистрирует обработчики таблицы; вызывать до остальных обработчиков роутера."""
+
+        @router.message(_TextFilter(self))
+        async def dispatch_text(message: Message, state: FSMContext, route: TextHandler) -> Any:
+            return await route(message, state)
+
+        @router.callback_query(_CallbackFilter(self))
+        async def dispatch_callback(
+            callback: CallbackQuery, state: FSMContext, route: CallbackHandler, callback_data: CallbackData
+        ) -> Any:
+            return await route(callback, state, callback_data)
+
+    def text(self, *labels: Union[str, Iterable[str]]) -> Callable[[TextHandler], TextHandler]:
+        def register(handler: TextHandler) -> TextHandler:
+            for label in labels:
+                for text in [label] if isinstance(label, str) else label:
+                    if text in self.texts and self.texts[text] is not handler:
+                        raise ValueError(f"Button {text!r} is already routed to {self.texts[text].__name__}")
+                    self.texts[text] = handler
+            return handler
+
+        return register
+
+    def callback(
+        self,
+        factory: Type[CallbackData],
+        state: Optional[State] = None,
+        legacy_prefix: Optional[str] = None,
+    ) -> Callable[[CallbackHandler], CallbackHandler]:
+        def register(handler: CallbackHandler) -> CallbackHandler:
+            route = (factory, handler, state.state if state is not None else None)
+            for prefix in filter(None, (factory.__prefix__, legacy_prefix)):
+                if prefix in self.callbacks:
+                    raise ValueError(f"Callback prefix {prefix!r} is already routed")
+                self.callbacks[prefix] = route
+            return handler
+
+        return register
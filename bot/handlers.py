@@ -1,28 +1,43 @@
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import CallbackQuery, Message
-from collections import Counter, defaultdict
+from collections import Counter
 from aiogram.fsm.context import FSMContext
-from datetime import datetime, timedelta
 from aiogram.filters import Command
-from aiogram import F, Router
-import asyncio
-
+from aiogram import Router
+from aiogram.exceptions import TelegramBadRequest
+from typing import List
+
+from bot.callbacks import (
+    CauseCallback,
+    LanguageCallback,
+    MoodCallback,
+    QuizAnswerCallback,
+    SequenceCallback,
+    StressCallback,
+)
+from bot.conversation import CHAT_SESSION, begin_chat_session, chat_session, conversations, merge_texts
+from bot.dispatch import DispatchTable
 from bot.keyboards import (
     cause_keyboard,
     language_keyboard,
     main_menu_keyboard,
     mood_keyboard,
     quiz_answer_keyboard,
+    sequence_keyboard,
     stress_keyboard,
     cause_labels,
     stress_labels,
 )
+from bot.sequences import sequence_scheduler
 from bot.states import AppStates
-from database.db import checkins_collection, stress_collection
+from bot.streaming import answer_streaming
 from database.models import CheckIn, StressTestResult
+from database.stats import weekly_stats
+from database.write_queue import write_queue
 from utils.language import resolve_language, update_language
 from config import get_settings
-from services.gemini import generate_gemini
+from services.chat_history import make_turn, trim_history
+from services.gemini import MODEL, generate_gemini, is_error_reply, stream_gemini
 from utils.texts import (
     get_language_label,
     get_list,
@@ -32,9 +47,13 @@ from utils.texts import (
     get_text,
     language_button_labels,
     get_random_quote,
+    render_text,
 )
 
 router = Router()
+# Кнопки меню и callback-и: один поиск по словарю вместо перебора фильтров.
+buttons = DispatchTable()
+buttons.attach(router)
 
 
 class CheckInStates(StatesGroup):
@@ -49,16 +68,6 @@ class StressTestStates(StatesGroup):
 QUIZ_BUTTON_MAP = get_quiz_button_map()
 LANGUAGE_BUTTONS = set(language_button_labels())
 
-MOOD_VALUES = {
-    "great": 5,
-    "fine": 4,
-    "okay": 3,
-    "bad": 2,
-    "tired": 2,
-    "angry": 1,
-}
-
-
 def format_triggers(counter: Counter, language: str) -> str:
     if not counter:
         return get_text("triggers_empty", language)
@@ -91,14 +100,14 @@ def quiz_result_text(quiz_key: str, score: int, total: int, language: str) -> st
         if score <= max_score:
             break
     return (
-        f"{get_text('quiz_completed', language).format(quiz_header=quiz_header(quiz))}\n"
+        f"{render_text('quiz_completed', language, quiz_header=quiz_header(quiz))}\n"
         f"{get_text('score_label', language)} {score}/{total}\n"
         f"{get_text('result_label', language)} {level}\n"
         f"{get_text('advice_label', language)} {advice}"
     )
 
 
-@router.message(F.text.in_(["✨ Қолдау цитатасы", "✨ Цитата поддержки"]))
+@buttons.text("✨ Қолдау цитатасы", "✨ Цитата поддержки")
 async def send_support_quote(message: Message, state: FSMContext) -> None:
     language = await resolve_language(state, message.from_user.id)
     quote = get_random_quote(language)
@@ -122,7 +131,7 @@ async def cmd_menu(message: Message, state: FSMContext) -> None:
     await cmd_start(message, state)
 
 
-@router.message(F.text == "💡 Автор идеи")
+@buttons.text("💡 Автор идеи")
 async def show_idea_author(message: Message, state: FSMContext) -> None:
     language = await resolve_language(state, message.from_user.id)
     await message.answer(
@@ -140,24 +149,23 @@ async def cmd_checkin(message: Message, state: FSMContext) -> None:
 
 
 @router.message(Command("language"))
-@router.message(F.text.in_(LANGUAGE_BUTTONS))
+@buttons.text(LANGUAGE_BUTTONS)
 async def choose_language(message: Message, state: FSMContext) -> None:
     language = await resolve_language(state, message.from_user.id)
     await message.answer(get_text("language_prompt", language), reply_markup=language_keyboard())
 
 
-@router.callback_query(F.data.startswith("lang:"))
-async def apply_language(callback: CallbackQuery, state: FSMContext) -> None:
-    language_code = callback.data.split(":", 1)[1]
-    language = await update_language(state, callback.from_user.id, language_code)
+@buttons.callback(LanguageCallback, legacy_prefix="lang")
+async def apply_language(callback: CallbackQuery, state: FSMContext, callback_data: LanguageCallback) -> None:
+    language = await update_language(state, callback.from_user.id, callback_data.code)
     await callback.message.answer(
-        get_text("language_updated", language).format(language=get_language_label(language)),
+        render_text("language_updated", language, language=get_language_label(language)),
         reply_markup=main_menu_keyboard(language),
     )
     await callback.answer()
 
 
-@router.message(F.text == "🤖 CHAT AI")
+@buttons.text("🤖 CHAT AI")
 async def start_chat(message: Message, state: FSMContext) -> None:
     language = await resolve_language(state, message.from_user.id)
     current_state = await state.get_state()
@@ -167,13 +175,14 @@ async def start_chat(message: Message, state: FSMContext) -> None:
     await state.clear()
     await state.set_state(AppStates.chat)
     await state.update_data(language=language)
+    await begin_chat_session(state)
     await message.answer(
         get_text("chat_started", language),
         reply_markup=main_menu_keyboard(language),
     )
 
 
-@router.message(F.text.in_(QUIZ_BUTTON_MAP))
+@buttons.text(QUIZ_BUTTON_MAP)
 async def start_quiz(message: Message, state: FSMContext) -> None:
     language = await resolve_language(state, message.from_user.id)
     quiz_key = QUIZ_BUTTON_MAP.get(message.text)
@@ -184,30 +193,29 @@ async def start_quiz(message: Message, state: FSMContext) -> None:
     await state.update_data(quiz_key=quiz_key, index=0, score=0)
     quiz = get_quiz(language, quiz_key)
     await message.answer(
-        get_text("quiz_intro", language).format(quiz_header=quiz_header(quiz)),
+        render_text("quiz_intro", language, quiz_header=quiz_header(quiz)),
         reply_markup=main_menu_keyboard(language),
     )
     await message.answer(quiz["questions"][0], reply_markup=quiz_answer_keyboard(language))
 
 
-@router.callback_query(CheckInStates.mood, F.data.startswith("mood:"))
-async def handle_mood(callback: CallbackQuery, state: FSMContext) -> None:
+@buttons.callback(MoodCallback, CheckInStates.mood, legacy_prefix="mood")
+async def handle_mood(callback: CallbackQuery, state: FSMContext, callback_data: MoodCallback) -> None:
     language = await resolve_language(state, callback.from_user.id)
-    mood = callback.data.split(":", 1)[1]
-    await state.update_data(mood=mood)
+    await state.update_data(mood=callback_data.value)
     await state.set_state(CheckInStates.cause)
     await callback.message.answer(get_text("checkin_prompt", language), reply_markup=cause_keyboard(language))
     await callback.answer()
 
 
-@router.callback_query(CheckInStates.cause, F.data.startswith("cause:"))
-async def handle_cause(callback: CallbackQuery, state: FSMContext) -> None:
+@buttons.callback(CauseCallback, CheckInStates.cause, legacy_prefix="cause")
+async def handle_cause(callback: CallbackQuery, state: FSMContext, callback_data: CauseCallback) -> None:
     language = await resolve_language(state, callback.from_user.id)
-    cause = callback.data.split(":", 1)[1]
+    cause = callback_data.value
     data = await state.get_data()
     mood = data.get("mood")
     checkin = CheckIn(user_id=callback.from_user.id, mood=mood, cause=cause)
-    await checkins_collection.insert_one(checkin.dict())
+    await write_queue.put_checkin(checkin)
     await state.clear()
     await state.set_state(AppStates.idle)
     await state.update_data(language=language)
@@ -215,8 +223,8 @@ async def handle_cause(callback: CallbackQuery, state: FSMContext) -> None:
     await callback.answer()
 
 
-@router.callback_query(AppStates.quiz, F.data.startswith("quiz_answer:"))
-async def handle_quiz_answer(callback: CallbackQuery, state: FSMContext) -> None:
+@buttons.callback(QuizAnswerCallback, AppStates.quiz, legacy_prefix="quiz_answer")
+async def handle_quiz_answer(callback: CallbackQuery, state: FSMContext, callback_data: QuizAnswerCallback) -> None:
     language = await resolve_language(state, callback.from_user.id)
     data = await state.get_data()
     quiz_key: str = data.get("quiz_key")
@@ -228,8 +236,7 @@ async def handle_quiz_answer(callback: CallbackQuery, state: FSMContext) -> None
         await callback.answer()
         return
     quiz = get_quiz(language, quiz_key)
-    answer_value = callback.data.split(":", 1)[1]
-    if answer_value == "yes":
+    if callback_data.value == "yes":
         score += 1
     index += 1
     total = len(quiz["questions"])
@@ -258,73 +265,77 @@ settings = get_settings()
 @router.message(AppStates.chat)
 async def handle_chat_message(message: Message, state: FSMContext) -> None:
     """
-    Обрабатывает сообщения в режиме CHAT AI, вызывает Gemini с историей
-    и обновляет историю.
+    Сообщение в режиме CHAT AI ставится в очередь чата (bot/conversation.py):
+    ответ на него и соседние сообщения даёт reply_chat.
     """
     if not message.text:
         return
+    language = await resolve_language(state, message.from_user.id)
+    await conversations.submit(message, state, language, reply_chat)
 
-    user_id = message.from_user.id
 
-    await message.bot.send_chat_action(chat_id=user_id, action="typing")
+async def reply_chat(messages: List[Message], state: FSMContext, language: str) -> None:
+    """Вызывает Gemini с историей на пачку сообщений и обновляет историю."""
+    message = messages[-1]
 
     data = await state.get_data()
 
     history = data.get("chat_history", [])
+    session = data.get(CHAT_SESSION)
 
-    user_prompt = message.text
+    user_prompt = merge_texts(messages)
 
-    ai_response_text = await generate_gemini(
-        history=history,
-        new_prompt=user_prompt,
-        system_prompt=settings.SYSTEM_PROMPT
-    )
+    if settings.GEMINI_STREAMING:
+        ai_response_text = await answer_streaming(
+            message,
+            stream_gemini(
+                history=history, new_prompt=user_prompt, system_prompt=settings.SYSTEM_PROMPT, language=language
+            ),
+            reply_markup=main_menu_keyboard(language),
+        )
+    else:
+        await message.bot.send_chat_action(chat_id=message.chat.id, action="typing")
+
+        ai_response_text = await generate_gemini(
+            history=history,
+            new_prompt=user_prompt,
+            system_prompt=settings.SYSTEM_PROMPT,
+            language=language,
+        )
 
-    history.append({"role": "user", "text": user_prompt})
-    history.append({"role": "model", "text": ai_response_text})
+    # Заглушку вместо ответа модели в историю не добавляем. Пока готовился ответ,
+    # пользователь мог выйти из чата или начать новый разговор — тогда не трогаем
+    # ни данные нового режима, ни историю нового разговора.
+    if (
+        not is_error_reply(ai_response_text)
+        and await state.get_state() == AppStates.chat.state
+        and await chat_session(state) == session
+    ):
+        history.append(await make_turn("user", user_prompt, MODEL))
+        history.append(await make_turn("model", ai_response_text, MODEL))
 
-    await state.update_data(chat_history=history[-20:])
+        await state.update_data(chat_history=trim_history(history, MODEL))
 
-    await message.answer(ai_response_text, reply_markup=main_menu_keyboard(data.get("language")))
+    if not settings.GEMINI_STREAMING:
+        await message.answer(ai_response_text, reply_markup=main_menu_keyboard(language))
 
 
 @router.message(Command("stats"))
 async def cmd_stats(message: Message, state: FSMContext) -> None:
     language = await resolve_language(state, message.from_user.id)
-    since = datetime.utcnow() - timedelta(days=7)
-    cursor = checkins_collection.find({"user_id": message.from_user.id, "date": {"$gte": since}})
-    entries = await cursor.to_list(length=1000)
-    if not entries:
+    stats = await weekly_stats(message.from_user.id)
+    if not stats:
         await message.answer(get_text("stats_empty", language))
         return
-    scores = []
-    triggers = Counter()
-    daily = defaultdict(list)
-    for entry in entries:
-        score = entry.get("mood_score")
-        if score is None:
-            mood = entry.get("mood")
-            score = MOOD_VALUES.get(mood, 3)
-        scores.append(score)
-        triggers[entry.get("cause")] += 1
-        day = entry.get("date")
-        if isinstance(day, datetime):
-            day_key = day.date()
-        else:
-            day_key = datetime.fromisoformat(day).date()
-        daily[day_key].append(score)
-    average = sum(scores) / len(scores)
-    best_day = max(daily.items(), key=lambda item: sum(item[1]) / len(item[1]))
-    worst_day = min(daily.items(), key=lambda item: sum(item[1]) / len(item[1]))
-    best_avg = sum(best_day[1]) / len(best_day[1])
-    worst_avg = sum(worst_day[1]) / len(worst_day[1])
+    best_day, best_avg = stats["best_day"]
+    worst_day, worst_avg = stats["worst_day"]
     lines = [
         get_text("stats_title", language),
-        f"{get_text('stats_count', language)} {len(entries)}",
-        f"{get_text('stats_average', language)} {average:.2f}",
-        f"{get_text('stats_triggers', language)} {format_triggers(triggers, language)}",
-        f"{get_text('stats_best_day', language)} {best_day[0].isoformat()} ({get_text('stats_average', language).lower()} {best_avg:.2f})",
-        f"{get_text('stats_worst_day', language)} {worst_day[0].isoformat()} ({get_text('stats_average', language).lower()} {worst_avg:.2f})",
+        f"{get_text('stats_count', language)} {stats['count']}",
+        f"{get_text('stats_average', language)} {stats['average']:.2f}",
+        f"{get_text('stats_triggers', language)} {format_triggers(stats['triggers'], language)}",
+        f"{get_text('stats_best_day', language)} {best_day.isoformat()} ({get_text('stats_average', language).lower()} {best_avg:.2f})",
+        f"{get_text('stats_worst_day', language)} {worst_day.isoformat()} ({get_text('stats_average', language).lower()} {worst_avg:.2f})",
     ]
     await message.answer("\n".join(lines), reply_markup=main_menu_keyboard(language))
 
@@ -344,8 +355,8 @@ async def cmd_mood_scale(message: Message, state: FSMContext) -> None:
         await message.answer(get_text("mood_range", language))
         return
     checkin = CheckIn(user_id=message.from_user.id, mood="scale", cause="scale", mood_score=score)
-    await checkins_collection.insert_one(checkin.dict())
-    await message.answer(get_text("mood_saved", language).format(score=score))
+    await write_queue.put_checkin(checkin)
+    await message.answer(render_text("mood_saved", language, score=score))
 
 
 @router.message(Command("stress_test"))
@@ -358,10 +369,10 @@ async def cmd_stress_test(message: Message, state: FSMContext) -> None:
     await message.answer(questions[0], reply_markup=stress_keyboard(language))
 
 
-@router.callback_query(StressTestStates.question, F.data.startswith("stress:"))
-async def handle_stress(callback: CallbackQuery, state: FSMContext) -> None:
+@buttons.callback(StressCallback, StressTestStates.question, legacy_prefix="stress")
+async def handle_stress(callback: CallbackQuery, state: FSMContext, callback_data: StressCallback) -> None:
     language = await resolve_language(state, callback.from_user.id)
-    value = callback.data.split(":", 1)[1]
+    value = callback_data.value
     data = await state.get_data()
     index = data.get("index", 0)
     score = data.get("score", 0)
@@ -381,7 +392,7 @@ async def handle_stress(callback: CallbackQuery, state: FSMContext) -> None:
             level=level,
             details=details,
         )
-        await stress_collection.insert_one(result.dict())
+        await write_queue.put_stress_result(result)
         await callback.message.answer(
             f"{get_text('stress_completed', language)}\n"
             f"{get_text('stress_score_label', language)} {score}/{len(questions)}\n"
@@ -398,22 +409,52 @@ async def handle_stress(callback: CallbackQuery, state: FSMContext) -> None:
     await callback.answer()
 
 
+async def start_sequence(message: Message, language: str, kind: str, intro_key: str, step_keys: List[str]) -> None:
+    """Отправляет вступление с кнопками управления, шаги уходят в фоне через sequence_scheduler."""
+    steps = [
+        (settings.SEQUENCE_STEP_DELAY, step)
+        for key in step_keys
+        for step in get_list(key, language)
+    ]
+    await message.answer(get_text(intro_key, language), reply_markup=sequence_keyboard(language))
+    await sequence_scheduler.schedule(message.chat.id, message.from_user.id, kind, steps)
+
+
 @router.message(Command("panic"))
 async def cmd_panic(message: Message, state: FSMContext) -> None:
     language = await resolve_language(state, message.from_user.id)
-    await message.answer(get_text("panic_intro", language))
-    for step in get_list("panic_breathing_steps", language):
-        await asyncio.sleep(1)
-        await message.answer(step)
-    for step in get_list("panic_grounding_steps", language):
-        await asyncio.sleep(1)
-        await message.answer(step)
+    await start_sequence(
+        message, language, "panic", "panic_intro", ["panic_breathing_steps", "panic_grounding_steps"]
+    )
 
 
 @router.message(Command("breath"))
 async def cmd_breath(message: Message, state: FSMContext) -> None:
     language = await resolve_language(state, message.from_user.id)
-    await message.answer(get_text("breath_intro", language))
-    for step in get_list("breath_steps", language):
-        await asyncio.sleep(1)
-        await message.answer(step)
+    await start_sequence(message, language, "breath", "breath_intro", ["breath_steps"])
+
+
+@router.message(Command("stop"))
+async def cmd_stop(message: Message, state: FSMContext) -> None:
+    language = await resolve_language(state, message.from_user.id)
+    stopped = await sequence_scheduler.cancel(message.chat.id)
+    await message.answer(get_text("sequence_stopped" if stopped else "sequence_not_active", language))
+
+
+@buttons.callback(SequenceCallback)
+async def handle_sequence_control(callback: CallbackQuery, state: FSMContext, callback_data: SequenceCallback) -> None:
+    language = await resolve_language(state, callback.from_user.id)
+    chat_id = callback.message.chat.id
+    if callback_data.action == "pause" and await sequence_scheduler.pause(chat_id):
+        text_key, markup = "sequence_paused", sequence_keyboard(language, paused=True)
+    elif callback_data.action == "resume" and await sequence_scheduler.resume(chat_id):
+        text_key, markup = "sequence_resumed", sequence_keyboard(language)
+    elif callback_data.action == "stop" and await sequence_scheduler.cancel(chat_id):
+        text_key, markup = "sequence_stopped", None
+    else:
+        text_key, markup = "sequence_not_active", None
+    try:
+        await callback.message.edit_reply_markup(reply_markup=markup)
+    except TelegramBadRequest:
+        pass  # сообщение уже без кнопок или слишком старое для редактирования
+    await callback.answer(get_text(text_key, language))
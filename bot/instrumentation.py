@@ -0,0 +1,142 @@
+from aiogram import BaseMiddleware, Bot, Dispatcher, Router
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import TelegramObject, Update
+from typing import Any, Awaitable, Callable, Dict, Iterable, Set
+import asyncio
+import time
+
+from bot.conversation import conversations
+from bot.sequences import sequence_scheduler
+from bot.sharding import ProcessShardPool, ShardedDispatcher
+from database.storage import MongoStorage
+from database.write_queue import write_queue
+from services.ai_cache import response_cache
+from services.gemini import breaker, inflight
+from services.model_router import router as model_router
+from services.user_settings import profile_cache
+from utils.metrics import handler_latency, registry, update_latency
+
+Handler = Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]]
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Внешний middleware на dp.update: время и исход (handled / unhandled / error) каждого апдейта."""
+
+    async def __call__(self, handler: Handler, event: Update, data: Dict[str, Any]) -> Any:
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await handler(event, data)
+            outcome = "unhandled" if result is UNHANDLED else "handled"
+            return result
+        finally:
+            update_latency.observe(time.perf_counter() - started, event.event_type, outcome)
+
+
+def _handler_name(data: Dict[str, Any]) -> str:
+    # Кнопки и callback-и из DispatchTable приходят через общий обработчик — берём настоящий из route.
+    route = data.get("route")
+    if route is not None:
+        return getattr(route, "__name__", "route")
+    callback = getattr(data.get("handler"), "callback", None)
+    return getattr(callback, "__name__", "unknown")
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Внутренний middleware роутера: время и исход (ok / error) по имени обработчика."""
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: Dict[str, Any]) -> Any:
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await handler(event, data)
+            outcome = "ok"
+            return result
+        finally:
+            handler_latency.observe(time.perf_counter() - started, _handler_name(data), outcome)
+
+
+def _fsm_sessions(storage) -> Dict[tuple, float]:
+    if isinstance(storage, MongoStorage):
+        return {(tier,): size for tier, size in storage.size().items()}
+    if isinstance(storage, MemoryStorage):
+        return {("memory",): len(storage.storage)}
+    return {}
+
+
+def _labelled(values: Dict[str, float]) -> Dict[tuple, float]:
+    return {(str(key),): value for key, value in values.items()}
+
+
+def register_gauges(bot: Bot, dp: Dispatcher) -> None:
+    """Gauge и счётчики состояния процесса; значения читаются в момент запроса /metrics."""
+    registry.gauge("bot_asyncio_tasks", "Tasks in the event loop.", lambda: len(asyncio.all_tasks()))
+    registry.gauge("bot_fsm_sessions", "FSM sessions held by the storage.", lambda: _fsm_sessions(dp.storage), ("tier",))
+    if isinstance(dp, ShardedDispatcher):
+        registry.gauge("bot_update_users_active", "Users with updates being processed.", dp.executor.active)
+        registry.gauge(
+            "bot_update_queue_depth", "Updates waiting for an earlier update of the same user.", dp.executor.waiting
+        )
+    outbound = getattr(bot.session, "outbound", None)
+    if outbound is not None:
+        registry.gauge(
+            "bot_outbound_queue_depth", "Bot API requests waiting in the outbound queue.",
+            lambda: _labelled(outbound.queue_depths()), ("lane",),
+        )
+        registry.counter_function(
+            "bot_outbound_sent_total", "Bot API requests sent through the outbound queue.",
+            lambda: {(lane,): stats["sent"] for lane, stats in outbound.stats.items()}, ("lane",),
+        )
+        registry.counter_function(
+            "bot_outbound_retries_total", "Bot API requests retried after 429.", lambda: outbound.retries
+        )
+    registry.gauge("bot_sequences_active", "Message sequences scheduled in this process.", sequence_scheduler.active)
+    registry.gauge("bot_conversations_active", "Chats with a CHAT AI turn queued or running.", conversations.active)
+    registry.gauge("bot_conversation_messages_pending", "Chat messages waiting for the next turn.", conversations.pending)
+    registry.gauge("bot_write_queue_depth", "Documents waiting in the write-behind queue.", write_queue.depth)
+    registry.gauge("bot_gemini_inflight", "Coalesced Gemini requests in flight.", inflight.in_flight)
+    registry.counter_function(
+        "bot_gemini_coalescing_total", "Single-flight events for Gemini requests.",
+        lambda: _labelled(inflight.stats), ("event",),
+    )
+    registry.gauge(
+        "bot_gemini_circuit_state", "Gemini circuit breaker state (1 for the current one).",
+        lambda: {(state,): float(breaker.state == state) for state in ("closed", "open", "half_open")}, ("state",),
+    )
+    registry.counter_function(
+        "bot_gemini_router_total", "Model router decisions.", lambda: _labelled(model_router.counters), ("event",)
+    )
+    registry.gauge("bot_ai_cache_entries", "Entries in the local AI response cache.", lambda: len(response_cache.local))
+    registry.gauge("bot_ai_cache_bytes", "Size of the local AI response cache.", lambda: response_cache.local.size_bytes)
+    registry.counter_function(
+        "bot_ai_cache_total", "AI response cache lookups and stores.", lambda: _labelled(response_cache.stats), ("result",)
+    )
+    registry.gauge("bot_profile_cache_entries", "Entries in the user profile cache.", lambda: len(profile_cache))
+    registry.counter_function(
+        "bot_profile_cache_total", "User profile cache lookups.", lambda: _labelled(profile_cache.stats), ("result",)
+    )
+
+
+def register_pool_gauges(pool: ProcessShardPool) -> None:
+    """Метрики процесса, который принимает webhook и раздаёт апдейты процессам-шардам."""
+    registry.gauge(
+        "bot_shard_pool_queue_depth", "Updates sent to a shard process and not processed yet.",
+        lambda: _labelled(pool.queue_depths()), ("shard",),
+    )
+    registry.counter_function("bot_shard_pool_restarts_total", "Shard processes restarted after a crash.", lambda: pool.restarts)
+
+
+# Роутеры — модульные синглтоны, а Dispatcher в процессе может собираться не один раз.
+_instrumented: Set[Router] = set()
+
+
+def install(dp: Dispatcher, routers: Iterable[Router]) -> None:
+    dp.update.outer_middleware(UpdateMetricsMiddleware())
+    middleware = HandlerMetricsMiddleware()
+    for router in routers:
+        if router in _instrumented:
+            continue
+        _instrumented.add(router)
+        router.message.middleware(middleware)
+        router.callback_query.middleware(middleware)
@@ -1,8 +1,21 @@
 from aiogram.utils.keyboard import InlineKeyboardBuilder, ReplyKeyboardBuilder
 from aiogram.types import InlineKeyboardMarkup, ReplyKeyboardMarkup
-from typing import Dict
-
+from functools import lru_cache
+from pydantic import BaseModel
+from typing import Any, Callable, Dict, Optional, Tuple, Type, Union
+import json
+
+from bot.callbacks import (
+    CauseCallback,
+    LanguageCallback,
+    MoodCallback,
+    QuizAnswerCallback,
+    SequenceCallback,
+    StressCallback,
+)
 from utils.texts import (
+    DEFAULT_LANGUAGE,
+    SUPPORTED_LANGUAGES,
     get_back_to_menu_label,
     get_cause_options,
     get_language_options,
@@ -14,58 +27,202 @@ from utils.texts import (
 )
 
 
-def main_menu_keyboard(language: str) -> ReplyKeyboardMarkup:
+Markup = Union[InlineKeyboardMarkup, ReplyKeyboardMarkup]
+
+
+def _inline(builder: InlineKeyboardBuilder) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(inline_keyboard=builder.export())
+
+
+def _reply(builder: ReplyKeyboardBuilder) -> ReplyKeyboardMarkup:
+    return ReplyKeyboardMarkup(keyboard=builder.export(), resize_keyboard=True)
+
+
+def _build_main_menu(language: str) -> ReplyKeyboardMarkup:
     builder = ReplyKeyboardBuilder()
     for text in get_menu_buttons(language):
         builder.button(text=text)
     builder.adjust(1)
-    return builder.as_markup(resize_keyboard=True)
+    return _reply(builder)
 
 
-def mood_keyboard(language: str) -> InlineKeyboardMarkup:
+def _build_mood(language: str) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     for text, value in get_mood_options(language):
-        builder.button(text=text, callback_data=f"mood:{value}")
+        builder.button(text=text, callback_data=MoodCallback(value=value))
     builder.adjust(2)
-    return builder.as_markup()
+    return _inline(builder)
 
 
-def cause_keyboard(language: str) -> InlineKeyboardMarkup:
+def _build_cause(language: str) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     for text, value in get_cause_options(language):
-        builder.button(text=text, callback_data=f"cause:{value}")
+        builder.button(text=text, callback_data=CauseCallback(value=value))
     builder.adjust(2)
-    return builder.as_markup()
+    return _inline(builder)
 
 
-def stress_keyboard(language: str) -> InlineKeyboardMarkup:
+def _build_stress(language: str) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     for text, value in get_stress_options(language):
-        builder.button(text=text, callback_data=f"stress:{value}")
+        builder.button(text=text, callback_data=StressCallback(value=value))
     builder.adjust(2)
-    return builder.as_markup()
+    return _inline(builder)
 
 
-def back_to_menu_keyboard(language: str) -> ReplyKeyboardMarkup:
+def _build_back_to_menu(language: str) -> ReplyKeyboardMarkup:
     builder = ReplyKeyboardBuilder()
     builder.button(text=get_back_to_menu_label(language))
-    return builder.as_markup(resize_keyboard=True)
+    return _reply(builder)
 
 
-def quiz_answer_keyboard(language: str) -> InlineKeyboardMarkup:
+def _build_quiz_answer(language: str) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     for text, value in get_quiz_answer_options(language):
-        builder.button(text=text, callback_data=f"quiz_answer:{value}")
+        builder.button(text=text, callback_data=QuizAnswerCallback(value=value))
     builder.adjust(2)
-    return builder.as_markup()
+    return _inline(builder)
 
 
-def language_keyboard() -> InlineKeyboardMarkup:
+def _build_language(language: str) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     for code, label in get_language_options():
-        builder.button(text=label, callback_data=f"lang:{code}")
+        builder.button(text=label, callback_data=LanguageCallback(code=code))
     builder.adjust(1)
-    return builder.as_markup()
+    return _inline(builder)
+
+
+def _build_sequence_controls(language: str, paused: bool) -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder()
+    if paused:
+        builder.button(text=get_text("sequence_resume", language), callback_data=SequenceCallback(action="resume"))
+    else:
+        builder.button(text=get_text("sequence_pause", language), callback_data=SequenceCallback(action="pause"))
+    builder.button(text=get_text("sequence_stop", language), callback_data=SequenceCallback(action="stop"))
+    builder.adjust(2)
+    return _inline(builder)
+
+
+KEYBOARD_BUILDERS: Dict[str, Callable[[str], Markup]] = {
+    "main_menu": _build_main_menu,
+    "mood": _build_mood,
+    "cause": _build_cause,
+    "stress": _build_stress,
+    "back_to_menu": _build_back_to_menu,
+    "quiz_answer": _build_quiz_answer,
+    "language": _build_language,
+    "sequence_running": lambda language: _build_sequence_controls(language, paused=False),
+    "sequence_paused": lambda language: _build_sequence_controls(language, paused=True),
+}
+
+
+class _FrozenList(list):
+    """Список, который нельзя изменить: ряды кнопок общих клавиатур."""
+
+    def _readonly(self, *args: Any, **kwargs: Any) -> None:
+        raise TypeError("keyboards from the registry are shared and read-only")
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+    append = extend = insert = pop = remove = clear = sort = reverse = _readonly
+
+
+@lru_cache(maxsize=None)
+def _frozen_type(cls: Type[BaseModel]) -> Type[BaseModel]:
+    config = {**cls.model_config, "frozen": True, "defer_build": False}
+    return type(cls.__name__, (cls,), {"model_config": config, "__module__": cls.__module__})
+
+
+def _freeze(value: Any) -> Any:
+    """
+    Неизменяемая копия модели aiogram: модели aiogram не заморожены, а
+    клавиатуры из реестра общие для всех сообщений, и запись в одну из
+    них разошлась бы с уже сериализованным JSON.
+    """
+    if isinstance(value, BaseModel):
+        fields = {name: _freeze(getattr(value, name)) for name in type(value).model_fields}
+        return _frozen_type(type(value)).model_construct(_fields_set=value.model_fields_set, **fields)
+    if isinstance(value, list):
+        return _FrozenList(_freeze(item) for item in value)
+    return value
+
+
+class KeyboardRegistry:
+    """
+    Все клавиатуры для всех языков из SUPPORTED_LANGUAGES, собранные и
+    сериализованные один раз. Экземпляры общие для всех сообщений, поэтому
+    реестр хранит замороженные копии (запись атрибута или ряда кнопок
+    бросает исключение), а BotSession отправляет их готовый JSON вместо
+    повторного model_dump на каждую отправку.
+    """
+
+    def __init__(self) -> None:
+        self._markups: Dict[Tuple[str, str], Markup] = {}
+        # id(markup) -> (markup, json)
+        self._prepared: Dict[int, Tuple[Markup, str]] = {}
+
+    def build(self) -> None:
+        if self._markups:
+            return
+        for name, builder in KEYBOARD_BUILDERS.items():
+            for language in SUPPORTED_LANGUAGES:
+                markup = _freeze(builder(language))
+                payload = markup.model_dump(exclude_none=True, mode="json")
+                self._prepared[id(markup)] = (markup, json.dumps(payload))
+                self._markups[(name, language)] = markup
+
+    def get(self, name: str, language: str) -> Markup:
+        if not self._markups:
+            self.build()
+        markup = self._markups.get((name, language))
+        if markup is None:
+            markup = self._markups[(name, DEFAULT_LANGUAGE)]
+        return markup
+
+    def prepared(self, value: Any) -> Optional[str]:
+        """Готовый JSON, если value — клавиатура из реестра."""
+        item = self._prepared.get(id(value))
+        if item is None or item[0] is not value:
+            return None
+        return item[1]
+
+
+keyboards = KeyboardRegistry()
+
+
+def build_keyboards() -> None:
+    keyboards.build()
+
+
+def main_menu_keyboard(language: str) -> ReplyKeyboardMarkup:
+    return keyboards.get("main_menu", language)
+
+
+def mood_keyboard(language: str) -> InlineKeyboardMarkup:
+    return keyboards.get("mood", language)
+
+
+def cause_keyboard(language: str) -> InlineKeyboardMarkup:
+    return keyboards.get("cause", language)
+
+
+def stress_keyboard(language: str) -> InlineKeyboardMarkup:
+    return keyboards.get("stress", language)
+
+
+def back_to_menu_keyboard(language: str) -> ReplyKeyboardMarkup:
+    return keyboards.get("back_to_menu", language)
+
+
+def quiz_answer_keyboard(language: str) -> InlineKeyboardMarkup:
+    return keyboards.get("quiz_answer", language)
+
+
+def language_keyboard() -> InlineKeyboardMarkup:
+    return keyboards.get("language", DEFAULT_LANGUAGE)
+
+
+def sequence_keyboard(language: str, paused: bool = False) -> InlineKeyboardMarkup:
+    return keyboards.get("sequence_paused" if paused else "sequence_running", language)
 
 
 def cause_labels(language: str) -> Dict[str, str]:
@@ -0,0 +1,237 @@
+from aiogram.exceptions import TelegramRetryAfter
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple, Union
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+from bot.sharding import pool_size
+from config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+ChatId = Union[int, str]
+
+
+class Lane(IntEnum):
+    """Приоритет исходящих сообщений: меньше — раньше."""
+
+    INTERACTIVE = 0  # ответы на действия пользователя
+    BULK = 1  # фоновые и запланированные рассылки
+
+
+_lane: ContextVar[Lane] = ContextVar("outbound_lane", default=Lane.INTERACTIVE)
+
+
+@contextmanager
+def send_lane(lane: Lane) -> Iterator[None]:
+    """Все запросы к Bot API внутри блока идут в указанной полосе."""
+    token = _lane.set(lane)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Через сколько секунд будет доступен токен (0 — уже есть)."""
+        now = time.monotonic()
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+    async def acquire(self) -> None:
+        while True:
+            delay = self.delay()
+            if delay <= 0:
+                self.take()
+                return
+            await asyncio.sleep(delay)
+
+    def block(self, seconds: float) -> None:
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+    def idle(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity
+
+
+class _Chat:
+    __slots__ = ("bucket", "lock", "users")
+
+    def __init__(self, bucket: TokenBucket) -> None:
+        self.bucket = bucket
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class OutboundQueue:
+    """
+    Очередь исходящих запросов к Bot API с лимитами Telegram.
+
+    Запрос в чат сначала ждёт токен бакета этого чата (OUTBOUND_CHAT_RATE
+    в личке, OUTBOUND_GROUP_RATE в группах) — под замком чата, чтобы
+    сообщения одного чата уходили по порядку. Затем он ждёт токен общего
+    бакета (OUTBOUND_GLOBAL_RATE): общие токены раздаются по полосам, и
+    ответы пользователям (Lane.INTERACTIVE) обходят рассылки (Lane.BULK).
+    На 429 чат (а если чат до этого молчал — и общий бакет) блокируется на
+    retry_after, и запрос повторяется до OUTBOUND_MAX_RETRIES раз; на время
+    ожидания замок чата отпускается.
+
+    Процессы ProcessShardPool делят OUTBOUND_GLOBAL_RATE поровну, и доля
+    пересчитывается, когда пул меняет размер.
+    """
+
+    def __init__(self) -> None:
+        # Лимит Telegram общий на бота: процессы-шарды делят его поровну.
+        self._workers = pool_size()
+        global_rate = settings.OUTBOUND_GLOBAL_RATE / self._workers
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self._chats: "OrderedDict[ChatId, _Chat]" = OrderedDict()
+        self._waiting: List[Tuple[int, int, asyncio.Future]] = []  # (полоса, порядковый номер, future)
+        self._counter = itertools.count()
+        self._wake = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self.stats: Dict[str, Dict[str, float]] = {
+            lane.name.lower(): {"sent": 0, "wait_total": 0.0, "wait_max": 0.0} for lane in Lane
+        }
+        self.retries = 0
+
+    def _chat(self, chat_id: ChatId) -> _Chat:
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            if isinstance(chat_id, int) and chat_id < 0:
+                bucket = TokenBucket(settings.OUTBOUND_GROUP_RATE, settings.OUTBOUND_GROUP_BURST)
+            else:
+                bucket = TokenBucket(settings.OUTBOUND_CHAT_RATE, settings.OUTBOUND_CHAT_BURST)
+            chat = self._chats[chat_id] = _Chat(bucket)
+            self._prune()
+        self._chats.move_to_end(chat_id)
+        return chat
+
+    def _prune(self) -> None:
+        # Бакет без ожидающих и с полным запасом токенов ничего не помнит — его можно выбросить.
+        excess = len(self._chats) - settings.OUTBOUND_CHAT_BUCKETS
+        for chat_id in list(self._chats):
+            if excess <= 0:
+                break
+            chat = self._chats[chat_id]
+            if chat.users == 0 and chat.bucket.idle():
+                del self._chats[chat_id]
+                excess -= 1
+
+    async def _global_permit(self, lane: Lane) -> None:
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch(), name="outbound-dispatch")
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (int(lane), next(self._counter), future))
+        self._wake.set()
+        await future
+
+    def _rescale(self) -> None:
+        workers = pool_size()
+        if workers == self._workers:
+            return
+        self._workers = workers
+        bucket = self.global_bucket
+        bucket.rate = bucket.capacity = settings.OUTBOUND_GLOBAL_RATE / workers
+        bucket.tokens = min(bucket.tokens, bucket.capacity)
+
+    async def _dispatch(self) -> None:
+        while True:
+            while not self._waiting:
+                self._wake.clear()
+                await self._wake.wait()
+            self._rescale()
+            delay = self.global_bucket.delay()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            _, _, future = heapq.heappop(self._waiting)
+            if future.done():
+                continue  # вызывающий отменён
+            self.global_bucket.take()
+            future.set_result(None)
+
+    async def send(self, chat_id: ChatId, request: Callable[[], Awaitable[Any]]) -> Any:
+        lane = _lane.get()
+        stats = self.stats[lane.name.lower()]
+        chat = self._chat(chat_id)
+        chat.users += 1
+        queued = time.monotonic()
+        try:
+            for attempt in range(settings.OUTBOUND_MAX_RETRIES + 1):
+                async with chat.lock:
+                    # Чат с полным бакетом давно ничего не отправлял: 429 на его
+                    # запрос — это общий лимит бота, а не лимит чата.
+                    rested = chat.bucket.idle()
+                    await chat.bucket.acquire()
+                    await self._global_permit(lane)
+                    if attempt == 0:
+                        waited = time.monotonic() - queued
+                        stats["wait_total"] += waited
+                        stats["wait_max"] = max(stats["wait_max"], waited)
+                    try:
+                        result = await request()
+                    except TelegramRetryAfter as e:
+                        if attempt == settings.OUTBOUND_MAX_RETRIES:
+                            raise
+                        retry_after = e.retry_after
+                        chat.bucket.block(retry_after)
+                        if rested:
+                            self.global_bucket.block(retry_after)
+                    else:
+                        stats["sent"] += 1
+                        return result
+                self.retries += 1
+                logger.warning(
+                    "Outbound: 429 for chat %s (%s limit), retrying in %ss",
+                    chat_id, "global" if rested else "chat", retry_after,
+                )
+                # Ждём без замка чата: он нужен только на время отправки.
+                await asyncio.sleep(retry_after)
+        finally:
+            chat.users -= 1
+
+    def queue_depths(self) -> Dict[str, int]:
+        depths = {lane.name.lower(): 0 for lane in Lane}
+        for lane, _, future in self._waiting:
+            if not future.done():
+                depths[Lane(lane).name.lower()] += 1
+        # Ожидающие своей очереди в чате (замок или бакет чата).
+        depths["chat_waiting"] = sum(max(chat.users - 1, 0) for chat in self._chats.values())
+        return depths
+
+    def metrics(self) -> Dict[str, Any]:
+        lanes = {}
+        for name, stats in self.stats.items():
+            sent = stats["sent"]
+            lanes[name] = {
+                "sent": sent,
+                "wait_avg": stats["wait_total"] / sent if sent else 0.0,
+                "wait_max": stats["wait_max"],
+            }
+        return {"lanes": lanes, "queue": self.queue_depths(), "retries": self.retries, "chats": len(self._chats)}
@@ -0,0 +1,331 @@
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+from datetime import datetime, timezone
+from pymongo import DeleteOne, ReturnDocument, UpdateOne
+from typing import Dict, List, Optional, Set, Tuple
+import asyncio
+import heapq
+import logging
+import os
+import time
+import uuid
+
+from config import get_settings
+from bot.outbound import Lane, TokenBucket, send_lane
+from database.db import get_collection
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+COLLECTION = "message_sequences"
+CLAIM_BATCH = 500
+
+# (задержка перед шагом в секундах, текст)
+Step = Tuple[float, str]
+
+
+def _timestamp(value: datetime) -> float:
+    # Motor возвращает naive datetime в UTC.
+    return value.replace(tzinfo=timezone.utc).timestamp() if value.tzinfo is None else value.timestamp()
+
+
+class _Sequence:
+    __slots__ = ("chat_id", "user_id", "kind", "steps", "index", "due", "remaining", "paused", "sending", "version")
+
+    def __init__(self, chat_id: int, user_id: int, kind: str, steps: List[Step], index: int = 0) -> None:
+        self.chat_id = chat_id
+        self.user_id = user_id
+        self.kind = kind
+        self.steps = steps
+        self.index = index
+        self.due = 0.0  # время по time.time(), когда отправить steps[index]
+        self.remaining = 0.0  # сколько осталось ждать, пока последовательность на паузе
+        self.paused = False
+        self.sending = False
+        self.version = 0
+
+
+class SequenceScheduler:
+    """
+    Фоновая отправка последовательностей сообщений (/panic, /breath).
+
+    Все шаги всех последовательностей процесса лежат в одной куче по времени
+    отправки, и её обслуживает одна задача-таймер; обработчик команды только
+    ставит последовательность в очередь и сразу освобождается. Отправка идёт
+    не быстрее SEQUENCE_SEND_RATE сообщений в секунду в полосе Lane.BULK
+    исходящей очереди (см. bot/outbound.py), TelegramRetryAfter переносит шаг. В чате активна одна последовательность; её можно
+    поставить на паузу, продолжить или остановить.
+
+    Состояние хранится в коллекции message_sequences: постановка, пауза и
+    остановка пишутся сразу, прогресс — пачкой раз в SEQUENCE_FLUSH_INTERVAL
+    секунд. Каждый процесс держит аренду (lease) на свои записи; записи
+    упавшего процесса подхватывает другой, когда аренда истекает. После
+    рестарта последовательности, опоздавшие больше чем на
+    SEQUENCE_MAX_LATENESS секунд, не продолжаются.
+    """
+
+    def __init__(self) -> None:
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._bot: Optional[Bot] = None
+        self._sequences: Dict[int, _Sequence] = {}
+        self._heap: List[Tuple[float, int, int]] = []  # (due, version, chat_id)
+        self._wake = asyncio.Event()
+        self._bucket = TokenBucket(settings.SEQUENCE_SEND_RATE, settings.SEQUENCE_SEND_RATE)
+        self._dirty: Set[int] = set()
+        self._finished: Set[int] = set()
+        self._sends: Set[asyncio.Task] = set()
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def collection(self):
+        return get_collection(COLLECTION)
+
+    def active(self) -> int:
+        return len(self._sequences)
+
+    async def start(self, bot: Bot) -> None:
+        if self._tasks:
+            return
+        self._bot = bot
+        await self._claim()
+        self._tasks = [
+            asyncio.create_task(self._run(), name="sequence-timer"),
+            asyncio.create_task(self._flush_loop(), name="sequence-flush"),
+        ]
+
+    def _push(self, sequence: _Sequence) -> None:
+        heapq.heappush(self._heap, (sequence.due, sequence.version, sequence.chat_id))
+        self._wake.set()
+
+    def _document(self, sequence: _Sequence) -> Dict:
+        return {
+            "user_id": sequence.user_id,
+            "kind": sequence.kind,
+            "steps": [list(step) for step in sequence.steps],
+            "index": sequence.index,
+            "due": datetime.utcfromtimestamp(sequence.due),
+            "remaining": sequence.remaining,
+            "paused": sequence.paused,
+            "owner": self.owner,
+            "lease_until": datetime.utcfromtimestamp(time.time() + settings.SEQUENCE_LEASE),
+        }
+
+    async def schedule(self, chat_id: int, user_id: int, kind: str, steps: List[Step]) -> None:
+        """Запускает последовательность в чате, заменяя текущую."""
+        if not steps:
+            return
+        self._drop(chat_id)
+        sequence = _Sequence(chat_id, user_id, kind, steps)
+        sequence.due = time.time() + steps[0][0]
+        self._sequences[chat_id] = sequence
+        self._finished.discard(chat_id)
+        await self.collection.replace_one({"_id": chat_id}, self._document(sequence), upsert=True)
+        self._push(sequence)
+
+    def _drop(self, chat_id: int) -> Optional[_Sequence]:
+        sequence = self._sequences.pop(chat_id, None)
+        if sequence is not None:
+            sequence.version += 1
+            self._dirty.discard(chat_id)
+        return sequence
+
+    async def cancel(self, chat_id: int) -> bool:
+        if self._drop(chat_id) is not None:
+            await self.collection.delete_one({"_id": chat_id, "owner": self.owner})
+            return True
+        # Последовательность могла остаться у другого процесса: он заметит удаление при flush.
+        result = await self.collection.delete_one({"_id": chat_id})
+        return result.deleted_count > 0
+
+    async def pause(self, chat_id: int) -> bool:
+        sequence = self._sequences.get(chat_id)
+        if sequence is None or sequence.paused:
+            return False
+        sequence.paused = True
+        if not sequence.sending:
+            sequence.remaining = max(0.0, sequence.due - time.time())
+            sequence.version += 1
+        await self._save(sequence)
+        return True
+
+    async def resume(self, chat_id: int) -> bool:
+        sequence = self._sequences.get(chat_id)
+        if sequence is None or not sequence.paused:
+            return False
+        sequence.paused = False
+        if not sequence.sending:
+            sequence.due = time.time() + sequence.remaining
+            sequence.version += 1
+            self._push(sequence)
+        await self._save(sequence)
+        return True
+
+    async def _save(self, sequence: _Sequence) -> None:
+        self._dirty.discard(sequence.chat_id)
+        await self.collection.update_one(
+            {"_id": sequence.chat_id, "owner": self.owner}, {"$set": self._document(sequence)}
+        )
+
+    async def _run(self) -> None:
+        while True:
+            if not self._heap:
+                await self._wake.wait()
+                self._wake.clear()
+                continue
+            due, version, chat_id = self._heap[0]
+            delay = due - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                continue
+            heapq.heappop(self._heap)
+            sequence = self._sequences.get(chat_id)
+            if sequence is None or sequence.version != version or sequence.paused:
+                continue  # запись устарела: отмена, пауза или перенос
+            await self._bucket.acquire()
+            sequence.sending = True
+            task = asyncio.create_task(self._send_step(sequence))
+            self._sends.add(task)
+            task.add_done_callback(self._sends.discard)
+
+    async def _send_step(self, sequence: _Sequence) -> None:
+        try:
+            with send_lane(Lane.BULK):
+                await self._bot.send_message(sequence.chat_id, sequence.steps[sequence.index][1])
+        except TelegramRetryAfter as e:
+            sequence.sending = False
+            sequence.version += 1
+            if sequence.paused:
+                sequence.remaining = e.retry_after
+            else:
+                sequence.due = time.time() + e.retry_after
+                if self._sequences.get(sequence.chat_id) is sequence:
+                    self._push(sequence)
+            return
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            # Бот заблокирован или чат недоступен — продолжать нет смысла.
+            logger.info("Sequence in chat %s stopped: %s", sequence.chat_id, e)
+            sequence.sending = False
+            if self._drop(sequence.chat_id) is not None:
+                self._finished.add(sequence.chat_id)
+            return
+        except Exception:
+            logger.exception("Sequence in chat %s: step %d not sent", sequence.chat_id, sequence.index)
+        sequence.sending = False
+        if self._sequences.get(sequence.chat_id) is not sequence:
+            return  # остановлена во время отправки
+        sequence.index += 1
+        if sequence.index >= len(sequence.steps):
+            self._drop(sequence.chat_id)
+            self._finished.add(sequence.chat_id)
+            return
+        delay = sequence.steps[sequence.index][0]
+        sequence.version += 1
+        if sequence.paused:
+            sequence.remaining = delay
+        else:
+            sequence.due = time.time() + delay
+            self._push(sequence)
+        self._dirty.add(sequence.chat_id)
+
+    def _restore(self, document: Dict) -> None:
+        chat_id = document["_id"]
+        if chat_id in self._sequences:
+            return
+        steps = [(float(delay), text) for delay, text in document["steps"]]
+        sequence = _Sequence(chat_id, document["user_id"], document["kind"], steps, document["index"])
+        sequence.due = _timestamp(document["due"])
+        sequence.remaining = document.get("remaining", 0.0)
+        sequence.paused = document.get("paused", False)
+        if sequence.index >= len(steps) or (
+            not sequence.paused and time.time() - sequence.due > settings.SEQUENCE_MAX_LATENESS
+        ):
+            self._finished.add(chat_id)
+            return
+        self._sequences[chat_id] = sequence
+        if not sequence.paused:
+            self._push(sequence)
+
+    async def _claim(self) -> None:
+        """
+        Забирает чужие записи с истёкшей арендой: процесса, который упал или
+        перезапустился (owner у каждого запуска свой). Свои записи уже в
+        памяти, поэтому фильтр не зависит от числа последовательностей и
+        обслуживается индексом lease_until.
+        """
+        for _ in range(CLAIM_BATCH):
+            now = datetime.utcnow()
+            document = await self.collection.find_one_and_update(
+                {"owner": {"$ne": self.owner}, "lease_until": {"$lt": now}},
+                {"$set": {
+                    "owner": self.owner,
+                    "lease_until": datetime.utcfromtimestamp(time.time() + settings.SEQUENCE_LEASE),
+                }},
+                return_document=ReturnDocument.AFTER,
+            )
+            if document is None:
+                return
+            self._restore(document)
+
+    async def flush(self) -> None:
+        lease_until = datetime.utcfromtimestamp(time.time() + settings.SEQUENCE_LEASE)
+        operations = []
+        for chat_id in self._dirty:
+            sequence = self._sequences.get(chat_id)
+            if sequence is not None:
+                operations.append(UpdateOne(
+                    {"_id": chat_id, "owner": self.owner},
+                    {"$set": {"index": sequence.index, "due": datetime.utcfromtimestamp(sequence.due),
+                              "remaining": sequence.remaining, "paused": sequence.paused}},
+                ))
+        for chat_id in self._finished:
+            operations.append(DeleteOne({"_id": chat_id, "owner": self.owner}))
+        self._dirty.clear()
+        self._finished.clear()
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+        if not self._sequences:
+            return
+        renewed = await self.collection.update_many({"owner": self.owner}, {"$set": {"lease_until": lease_until}})
+        if renewed.matched_count >= len(self._sequences):
+            return
+        # Часть записей остановлена в другом процессе (или перехвачена им) —
+        # только тогда выясняем, какие именно больше не наши.
+        owned = set(await self.collection.distinct("_id", {"owner": self.owner}))
+        for chat_id in [chat_id for chat_id in self._sequences if chat_id not in owned]:
+            self._drop(chat_id)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.SEQUENCE_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+                await self._claim()
+            except Exception:
+                logger.exception("Sequence scheduler: flush failed, retrying later")
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        if self._sends:
+            await asyncio.gather(*self._sends, return_exceptions=True)
+        try:
+            await self.flush()
+            # Отдаём аренду сразу, чтобы после рестарта записи подхватились без ожидания.
+            await self.collection.update_many(
+                {"owner": self.owner}, {"$set": {"lease_until": datetime.utcfromtimestamp(0)}}
+            )
+        except Exception:
+            logger.exception("Sequence scheduler: final flush failed")
+
+
+sequence_scheduler = SequenceScheduler()
@@ -0,0 +1,54 @@
+from aiohttp import FormData
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import InputFile
+from typing import Any, Dict, Optional
+
+from bot.keyboards import keyboards
+from bot.outbound import OutboundQueue
+from config import get_settings
+
+settings = get_settings()
+
+# Запросы с chat_id, которые не расходуют лимит сообщений чата.
+UNTHROTTLED_METHODS = frozenset({"sendChatAction"})
+
+
+class BotSession(AiohttpSession):
+    """
+    HTTP-сессия бота: клавиатуры из реестра отправляются уже сериализованными,
+    а запросы в чаты проходят через OutboundQueue с лимитами Telegram.
+    """
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.outbound = OutboundQueue()
+
+    def build_form_data(self, bot: Bot, method: TelegramMethod[TelegramType]) -> FormData:
+        # AiohttpSession делает model_dump всего метода до prepare_value, поэтому
+        # клавиатуру из реестра нужно узнать здесь, пока это ещё сам объект.
+        serialized = keyboards.prepared(getattr(method, "reply_markup", None))
+        if serialized is None:
+            return super().build_form_data(bot, method)
+        form = FormData(quote_fields=False)
+        files: Dict[str, InputFile] = {}
+        for key, value in method.model_dump(warnings=False, exclude={"reply_markup"}).items():
+            value = self.prepare_value(value, bot=bot, files=files)
+            if not value:
+                continue
+            form.add_field(key, value)
+        form.add_field("reply_markup", serialized)
+        for key, value in files.items():
+            form.add_field(key, value.read(bot), filename=value.filename or key)
+        return form
+
+    async def make_request(
+        self, bot: Bot, method: TelegramMethod[TelegramType], timeout: Optional[int] = None
+    ) -> TelegramType:
+        chat_id = getattr(method, "chat_id", None)
+        request = super().make_request
+        if not settings.OUTBOUND_QUEUE or chat_id is None or method.__api_method__ in UNTHROTTLED_METHODS:
+            return await request(bot, method, timeout)
+        return await self.outbound.send(chat_id, lambda: request(bot, method, timeout))
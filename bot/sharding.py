@@ -0,0 +1,368 @@
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, Optional, Tuple
+import asyncio
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import signal
+
+logger = logging.getLogger(__name__)
+
+# Вместо апдейта в очереди шарда: сбросить кеш FSM, пользователи сейчас переедут.
+RELEASE = None
+
+# Собирает Bot и Dispatcher внутри процесса-шарда; получает номер процесса.
+ShardFactory = Callable[[int], Tuple[Bot, Dispatcher]]
+
+WATCH_INTERVAL = 1.0  # секунд между проверками процессов-шардов
+
+# Текущее число процессов пула (общий Value); в процессе-шарде его выставляет _serve_shard.
+_pool_size = None
+
+
+def pool_size() -> int:
+    """Сколько процессов ProcessShardPool сейчас работает; вне пула — 1."""
+    return _pool_size.value if _pool_size is not None else 1
+
+
+def _hash(value: str) -> int:
+    # hash() в Python рандомизирован по процессам, а шард должен совпадать везде.
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Консистентное хеширование пользователей по шардам. При изменении числа
+    шардов переезжает только ~1/N пользователей, остальные остаются на месте.
+    """
+
+    def __init__(self, nodes: Iterable[int], replicas: int = 64) -> None:
+        points = sorted((_hash(f"{node}:{replica}"), node) for node in nodes for replica in range(replicas))
+        if not points:
+            raise ValueError("HashRing needs at least one node")
+        self._points = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def lookup(self, key: int) -> int:
+        index = bisect.bisect(self._points, _hash(str(key))) % len(self._points)
+        return self._nodes[index]
+
+
+def update_shard_key(update: Update) -> int:
+    """Ключ шардирования апдейта: id пользователя, иначе id чата, иначе update_id."""
+    try:
+        event = update.event
+    except Exception:
+        return update.update_id
+    user = getattr(event, "from_user", None) or getattr(event, "user", None)
+    if user is not None:
+        return user.id
+    chat = getattr(event, "chat", None)
+    if chat is not None:
+        return chat.id
+    return update.update_id
+
+
+def raw_update_shard_key(raw: Dict[str, Any]) -> int:
+    """То же самое для JSON апдейта, без разбора в pydantic-модель."""
+    for name, event in raw.items():
+        if name == "update_id" or not isinstance(event, dict):
+            continue
+        source = event.get("from") or event.get("user") or event.get("chat")
+        if isinstance(source, dict) and "id" in source:
+            return source["id"]
+    return raw.get("update_id", 0)
+
+
+class _Chain:
+    __slots__ = ("pending", "worker")
+
+    def __init__(self) -> None:
+        self.pending: Deque[Tuple[Callable[[], Awaitable[Any]], "asyncio.Future[Any]"]] = deque()
+        self.worker: Optional[asyncio.Task] = None
+
+
+class KeyedExecutor:
+    """
+    Выполняет задачи одного ключа (пользователя) строго по очереди, а задачи
+    разных ключей — параллельно, без общих очередей: долгий обработчик
+    задерживает только следующие апдейты того же пользователя. Цепочка
+    задач создаётся при первой задаче ключа и удаляется, как только
+    опустеет.
+    """
+
+    def __init__(self) -> None:
+        self._chains: Dict[int, _Chain] = {}
+
+    def submit(self, key: int, factory: Callable[[], Awaitable[Any]]) -> "asyncio.Future[Any]":
+        future = asyncio.get_running_loop().create_future()
+        chain = self._chains.get(key)
+        if chain is None:
+            chain = self._chains[key] = _Chain()
+            chain.worker = asyncio.create_task(self._drain(key, chain), name=f"user-{key}")
+        chain.pending.append((factory, future))
+        return future
+
+    async def _drain(self, key: int, chain: _Chain) -> None:
+        try:
+            while chain.pending:
+                factory, future = chain.pending.popleft()
+                if future.cancelled():
+                    continue
+                try:
+                    result = await factory()
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+        finally:
+            # Между проверкой pending и удалением нет await, так что новая задача не потеряется.
+            if self._chains.get(key) is chain:
+                del self._chains[key]
+            for _, future in chain.pending:  # остаются, только если отменили саму цепочку
+                future.cancel()
+
+    def active(self) -> int:
+        """Пользователей, у которых сейчас есть задачи."""
+        return len(self._chains)
+
+    def waiting(self) -> int:
+        """Задач, ждущих окончания предыдущей задачи того же пользователя."""
+        return sum(len(chain.pending) for chain in self._chains.values())
+
+    def queue_depths(self) -> Dict[str, int]:
+        return {"users": self.active(), "waiting": self.waiting()}
+
+
+class ShardedDispatcher(Dispatcher):
+    """Dispatcher, который обрабатывает апдейты одного пользователя последовательно."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.executor = KeyedExecutor()
+
+    async def feed_update(self, bot: Bot, update: Update, **kwargs: Any) -> Any:
+        feed = super().feed_update
+        return await self.executor.submit(update_shard_key(update), lambda: feed(bot, update, **kwargs))
+
+
+async def _feed_raw(dp: Dispatcher, bot: Bot, raw: Dict[str, Any], processed) -> None:
+    try:
+        await dp.feed_raw_update(bot, raw)
+    except Exception:
+        logger.exception("Shard: update %s failed", raw.get("update_id"))
+    finally:
+        with processed.get_lock():
+            processed.value += 1
+
+
+async def _release_storage(dp: Dispatcher, processed) -> None:
+    release = getattr(dp.storage, "release", None)
+    try:
+        if release is not None:
+            await release()
+    except Exception:
+        logger.exception("Shard: storage release failed")
+    finally:
+        with processed.get_lock():
+            processed.value += 1
+
+
+async def _serve_shard(factory: ShardFactory, index: int, queue, read, processed, size) -> None:
+    global _pool_size
+    _pool_size = size
+    bot, dp = factory(index)
+    workflow_data = {"dispatcher": dp, "bots": [bot], "bot": bot}
+    await dp.emit_startup(**workflow_data)
+    loop = asyncio.get_running_loop()
+    reader = ThreadPoolExecutor(max_workers=1)
+    tasks: set = set()
+    try:
+        while True:
+            item = await loop.run_in_executor(reader, queue.get)
+            if item is None:
+                break
+            seq, raw = item
+            read.value = seq
+            if raw is RELEASE:
+                if tasks:
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                await _release_storage(dp, processed)
+                continue
+            task = asyncio.create_task(_feed_raw(dp, bot, raw, processed))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        await dp.emit_shutdown(**workflow_data)
+        await bot.session.close()
+        reader.shutdown(wait=False)
+
+
+def _shard_process(factory: ShardFactory, index: int, queue, read, processed, size) -> None:
+    logging.basicConfig(level=logging.INFO)
+    # Останавливает процесс только родитель (через None в очереди), чтобы
+    # очередь была дочитана до конца.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_serve_shard(factory, index, queue, read, processed, size))
+
+
+class _ProcessShard:
+    def __init__(self, context, factory: ShardFactory, index: int, size) -> None:
+        self.queue = context.Queue()
+        self.read = context.Value("q", 0)  # номер последнего апдейта, взятого процессом из очереди
+        self.processed = context.Value("q", 0)
+        self.submitted = 0
+        # Отправленные, но ещё не взятые процессом апдейты: если процесс упадёт,
+        # их можно передать новому.
+        self.unread: Deque[Tuple[int, Optional[Dict[str, Any]]]] = deque()
+        self.process = context.Process(
+            target=_shard_process,
+            args=(factory, index, self.queue, self.read, self.processed, size),
+            name=f"shard-process-{index}",
+        )
+        self.process.start()
+
+    def send(self, raw: Optional[Dict[str, Any]]) -> None:
+        self.submitted += 1
+        self.unread.append((self.submitted, raw))
+        self.queue.put((self.submitted, raw))
+        self.forget_read()
+
+    def forget_read(self) -> None:
+        read = self.read.value
+        while self.unread and self.unread[0][0] <= read:
+            self.unread.popleft()
+
+    def lost(self) -> int:
+        """Апдейты, которые процесс взял из очереди, но не обработал."""
+        return self.read.value - self.processed.value
+
+    def abandon(self) -> None:
+        # Очередь упавшего процесса больше не читают: не ждём её фонового потока при выходе.
+        self.queue.cancel_join_thread()
+        self.queue.close()
+
+    @property
+    def depth(self) -> int:
+        return self.submitted - self.processed.value
+
+
+class ProcessShardPool:
+    """
+    Распределяет сырые апдейты по N процессам по хешу пользователя. Каждый
+    процесс запускает свой Bot и ShardedDispatcher из factory(номер
+    процесса), так что разные пользователи обрабатываются на разных ядрах,
+    а один пользователь всегда попадает в один процесс.
+
+    Упавший процесс перезапускается с тем же номером (раз в WATCH_INTERVAL
+    секунд проверяется exitcode), и новому процессу по порядку передаются
+    апдейты, которые старый не успел взять из очереди. Апдейты, которые
+    он взял, но не обработал, теряются — их число пишется в лог.
+    """
+
+    def __init__(self, factory: ShardFactory, processes: int) -> None:
+        self._factory = factory
+        self._context = multiprocessing.get_context("spawn")
+        self._shards: Dict[int, _ProcessShard] = {}
+        self._ring = HashRing(range(processes))
+        self._size = self._context.Value("i", processes)  # его читают процессы-шарды, см. pool_size()
+        self._intake: Optional[asyncio.Event] = None
+        self._watcher: Optional[asyncio.Task] = None
+        self.size = processes
+        self.restarts = 0
+
+    def start(self) -> None:
+        self._intake = asyncio.Event()
+        self._intake.set()
+        for index in range(self.size):
+            self._shards[index] = _ProcessShard(self._context, self._factory, index, self._size)
+        self._watcher = asyncio.create_task(self._watch(), name="shard-pool-watch")
+
+    async def submit(self, raw: Dict[str, Any]) -> None:
+        await self._intake.wait()
+        self._shards[self._ring.lookup(raw_update_shard_key(raw))].send(raw)
+
+    def queue_depths(self) -> Dict[int, int]:
+        return {index: shard.depth for index, shard in self._shards.items()}
+
+    def _respawn(self, index: int) -> None:
+        old = self._shards[index]
+        old.forget_read()
+        logger.error(
+            "Shard process %d exited with code %s: restarting, %d queued updates handed over, %d lost",
+            index, old.process.exitcode, len(old.unread), old.lost(),
+        )
+        old.abandon()
+        shard = self._shards[index] = _ProcessShard(self._context, self._factory, index, self._size)
+        # Без await между созданием и пересылкой: новые апдейты встанут после старых.
+        for _, raw in old.unread:
+            shard.send(raw)
+        self.restarts += 1
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(WATCH_INTERVAL)
+            for index, shard in list(self._shards.items()):
+                if shard.process.exitcode is not None:
+                    self._respawn(index)
+                else:
+                    shard.forget_read()
+
+    async def _drain(self) -> None:
+        while any(depth > 0 for depth in self.queue_depths().values()):
+            await asyncio.sleep(0.05)
+
+    async def _stop_shard(self, index: int) -> None:
+        shard = self._shards.pop(index)
+        shard.queue.put(None)
+        await asyncio.get_running_loop().run_in_executor(None, shard.process.join)
+
+    async def resize(self, processes: int) -> None:
+        """
+        Меняет число процессов. Приём новых апдейтов приостанавливается, пока
+        все очереди не опустеют, поэтому порядок по пользователю сохраняется.
+        Лишние процессы останавливаются, а оставшиеся сбрасывают FSM в базу и
+        забывают кеш (RELEASE) — только потом пользователи переезжают.
+        Новый размер сразу виден шардам через pool_size().
+        """
+        if processes < 1 or processes == self.size:
+            return
+        self._intake.clear()
+        try:
+            await self._drain()
+            self._size.value = processes
+            for index in range(processes, self.size):
+                await self._stop_shard(index)
+            for shard in self._shards.values():
+                shard.send(RELEASE)
+            await self._drain()
+            for index in range(self.size, processes):
+                self._shards[index] = _ProcessShard(self._context, self._factory, index, self._size)
+            self._ring = HashRing(range(processes))
+            self.size = processes
+            logger.info("Shard pool resized to %d processes", processes)
+        finally:
+            self._intake.set()
+
+    async def stop(self) -> None:
+        if self._watcher is not None:
+            self._watcher.cancel()
+        for index in list(self._shards):
+            await self._stop_shard(index)
+
+
+async def report_queue_depths(source, interval: float, label: str = "Shard queue depths") -> None:
+    """Периодически пишет в лог глубину очередей по шардам."""
+    while True:
+        await asyncio.sleep(interval)
+        depths = {shard: depth for shard, depth in source.queue_depths().items() if depth}
+        if depths:
+            logger.info("%s: %s", label, depths)
@@ -0,0 +1,141 @@
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.types import Message
+from typing import AsyncIterator, Optional
+import asyncio
+import logging
+import time
+
+from config import get_settings
+from services.gemini import EMPTY_REPLY
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Лимит длины одного сообщения Telegram.
+MESSAGE_LIMIT = 4096
+# Telegram сбрасывает индикатор "печатает..." примерно через 5 секунд.
+TYPING_INTERVAL = 4.0
+
+
+async def _keep_typing(message: Message, first_chunk: asyncio.Event) -> None:
+    while not first_chunk.is_set():
+        try:
+            await message.bot.send_chat_action(chat_id=message.chat.id, action="typing")
+        except TelegramRetryAfter as e:
+            await asyncio.sleep(e.retry_after)
+            continue
+        try:
+            await asyncio.wait_for(first_chunk.wait(), timeout=TYPING_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def _edit(sent: Message, text: str) -> bool:
+    """False — сообщение больше нельзя редактировать (удалено, текст отклонён)."""
+    try:
+        await sent.edit_text(text, parse_mode=None)
+    except TelegramRetryAfter as e:
+        await asyncio.sleep(e.retry_after)
+        return await _edit(sent, text)
+    except TelegramBadRequest as e:
+        if "message is not modified" in str(e):
+            return True
+        logger.warning("Streaming: editing message %s failed, keeping the text already sent: %s", sent.message_id, e)
+        return False
+    return True
+
+
+async def _send(message: Message, text: str, reply_markup=None) -> Optional[Message]:
+    """None — Telegram отклонил сообщение, как и при неудачном _edit."""
+    try:
+        return await message.answer(text, parse_mode=None, reply_markup=reply_markup)
+    except TelegramRetryAfter as e:
+        await asyncio.sleep(e.retry_after)
+        return await _send(message, text, reply_markup)
+    except TelegramBadRequest as e:
+        logger.warning("Streaming: sending a reply to chat %s failed: %s", message.chat.id, e)
+        return None
+
+
+async def answer_streaming(
+    message: Message,
+    chunks: AsyncIterator[str],
+    reply_markup=None,
+) -> str:
+    """
+    Показывает ответ модели по мере генерации: первое сообщение отправляется,
+    как только набрался непустой текст, дальше оно редактируется не чаще,
+    чем раз в STREAM_EDIT_INTERVAL секунд. Текст модели отправляется без
+    parse_mode: оборванный на полуслове фрагмент не должен разбираться как
+    HTML. Возвращает полный текст ответа, а если сообщение перестало
+    отправляться или редактироваться — тот текст, который пользователь
+    уже видит.
+    """
+    first_chunk = asyncio.Event()
+    typing_task = asyncio.create_task(_keep_typing(message, first_chunk))
+
+    text = ""
+    offset = 0  # начало текста, который показывается в текущем сообщении
+    shown = ""
+    sent: Optional[Message] = None
+    last_edit = 0.0
+    stalled = False
+    try:
+        async for chunk in chunks:
+            text += chunk
+            if sent is None:
+                # Пустое сообщение Telegram отклонит — ждём непустой текст.
+                shown = text[offset:offset + MESSAGE_LIMIT]
+                if not shown.strip():
+                    continue
+                first_chunk.set()
+                sent = await _send(message, shown, reply_markup if offset == 0 else None)
+                if sent is None:
+                    shown = ""
+                    stalled = True
+                    break
+                last_edit = time.monotonic()
+                continue
+
+            segment = text[offset:]
+            if len(segment) > MESSAGE_LIMIT:
+                # Текущее сообщение заполнено — дописываем его, следующее
+                # отправится, когда наберётся непустой текст.
+                if not await _edit(sent, segment[:MESSAGE_LIMIT]):
+                    stalled = True
+                    break
+                offset += MESSAGE_LIMIT
+                shown = ""
+                sent = None
+                continue
+
+            now = time.monotonic()
+            if (
+                now - last_edit >= settings.STREAM_EDIT_INTERVAL
+                and len(segment) - len(shown) >= settings.STREAM_MIN_CHUNK
+            ):
+                if not await _edit(sent, segment):
+                    stalled = True
+                    break
+                shown = segment
+                last_edit = now
+    finally:
+        first_chunk.set()
+        typing_task.cancel()
+        # Остаток ответа не нужен (или уже прочитан) — освобождаем поток модели.
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+    if stalled:
+        visible = text[:offset] + shown
+        return visible if visible.strip() else EMPTY_REPLY
+
+    if sent is None and offset == 0:
+        await message.answer(EMPTY_REPLY, reply_markup=reply_markup)
+        return EMPTY_REPLY
+
+    segment = text[offset:]
+    if sent is not None and segment != shown and not await _edit(sent, segment):
+        return text[:offset] + shown
+    return text
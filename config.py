@@ -1,13 +1,110 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 from pydantic import Field
+from typing import Dict, List
 
 
 class Settings(BaseSettings):
     BOT_TOKEN: str = Field("", env="BOT_TOKEN")
+    TELEGRAM_API_URL: str = Field("", env="TELEGRAM_API_URL")  # пусто — api.telegram.org
     MONGO_URL: str = Field("mongodb://localhost:27017", env="MONGO_URL")
     DB_NAME: str = Field("mental_bot", env="DB_NAME")
+    SCHEMA_PLAN_CHECK: str = Field("warn", env="SCHEMA_PLAN_CHECK")  # warn | fail | off
+    STATS_SOURCE: str = Field("rollups", env="STATS_SOURCE")  # rollups | aggregate
+    STATS_BACKFILL_ON_START: bool = Field(False, env="STATS_BACKFILL_ON_START")  # пустые сводки собираются и без него
+
+    WRITE_DURABILITY: str = Field("enqueue", env="WRITE_DURABILITY")  # enqueue | flush
+    WRITE_QUEUE_MAX: int = Field(10000, env="WRITE_QUEUE_MAX")
+    WRITE_QUEUE_BATCH: int = Field(500, env="WRITE_QUEUE_BATCH")
+    WRITE_QUEUE_INTERVAL: float = Field(0.5, env="WRITE_QUEUE_INTERVAL")
+    WRITE_QUEUE_RETRIES: int = Field(3, env="WRITE_QUEUE_RETRIES")
     GEMINI_API_KEY: str = Field("", env="GEMINI_API_KEY")
+    GEMINI_BASE_URL: str = Field("", env="GEMINI_BASE_URL")  # пусто — адрес по умолчанию из SDK
+
+    BOT_MODE: str = Field("polling", env="BOT_MODE")  # polling | webhook
+    WEBHOOK_URL: str = Field("", env="WEBHOOK_URL")
+    WEBHOOK_PATH: str = Field("/webhook", env="WEBHOOK_PATH")
+    WEBHOOK_SECRET: str = Field("", env="WEBHOOK_SECRET")
+    WEBHOOK_HOST: str = Field("0.0.0.0", env="WEBHOOK_HOST")
+    WEBHOOK_PORT: int = Field(8080, env="WEBHOOK_PORT")
+    WEBHOOK_WORKERS: int = Field(1, env="WEBHOOK_WORKERS")
+    SHARD_REPORT_INTERVAL: float = Field(60.0, env="SHARD_REPORT_INTERVAL")
+    METRICS_PORT: int = Field(0, env="METRICS_PORT")  # 0 — /metrics выключен; шард i — на METRICS_PORT + 1 + i
+    METRICS_HOST: str = Field("127.0.0.1", env="METRICS_HOST")
+
+    OUTBOUND_QUEUE: bool = Field(True, env="OUTBOUND_QUEUE")
+    OUTBOUND_GLOBAL_RATE: float = Field(30.0, env="OUTBOUND_GLOBAL_RATE")  # сообщений в секунду на бота
+    OUTBOUND_CHAT_RATE: float = Field(1.0, env="OUTBOUND_CHAT_RATE")
+    OUTBOUND_CHAT_BURST: float = Field(3.0, env="OUTBOUND_CHAT_BURST")
+    OUTBOUND_GROUP_RATE: float = Field(20 / 60, env="OUTBOUND_GROUP_RATE")
+    OUTBOUND_GROUP_BURST: float = Field(3.0, env="OUTBOUND_GROUP_BURST")
+    OUTBOUND_MAX_RETRIES: int = Field(3, env="OUTBOUND_MAX_RETRIES")
+    OUTBOUND_CHAT_BUCKETS: int = Field(10000, env="OUTBOUND_CHAT_BUCKETS")
+
+    SEQUENCE_STEP_DELAY: float = Field(1.0, env="SEQUENCE_STEP_DELAY")
+    SEQUENCE_SEND_RATE: float = Field(25.0, env="SEQUENCE_SEND_RATE")  # сообщений в секунду на процесс
+    SEQUENCE_FLUSH_INTERVAL: float = Field(2.0, env="SEQUENCE_FLUSH_INTERVAL")
+    SEQUENCE_LEASE: int = Field(30, env="SEQUENCE_LEASE")
+    SEQUENCE_MAX_LATENESS: int = Field(300, env="SEQUENCE_MAX_LATENESS")
+
+    GEMINI_CONCURRENCY: int = Field(64, env="GEMINI_CONCURRENCY")
+    GEMINI_COALESCE: bool = Field(True, env="GEMINI_COALESCE")
+    GEMINI_TIMEOUT: float = Field(30.0, env="GEMINI_TIMEOUT")  # на попытку; в потоке — на каждый фрагмент
+    GEMINI_DEADLINE: float = Field(60.0, env="GEMINI_DEADLINE")  # на запрос со всеми повторами
+    GEMINI_RETRIES: int = Field(2, env="GEMINI_RETRIES")
+    GEMINI_RETRY_BASE: float = Field(0.5, env="GEMINI_RETRY_BASE")
+    GEMINI_RETRY_MAX: float = Field(4.0, env="GEMINI_RETRY_MAX")
+    GEMINI_BREAKER_THRESHOLD: int = Field(5, env="GEMINI_BREAKER_THRESHOLD")
+    GEMINI_BREAKER_COOLDOWN: float = Field(30.0, env="GEMINI_BREAKER_COOLDOWN")
+    # Модели — ключи GEMINI_MODELS из services/gemini_models.py или полные имена.
+    GEMINI_MODEL: str = Field("flash_v2_0", env="GEMINI_MODEL")
+    GEMINI_ROUTER_MODELS: List[str] = Field(["flash_v2_0"], env="GEMINI_ROUTER_MODELS")
+    GEMINI_COMMAND_MODELS: Dict[str, str] = Field({}, env="GEMINI_COMMAND_MODELS")  # команда -> модель
+    GEMINI_LATENCY_BUDGET: float = Field(10.0, env="GEMINI_LATENCY_BUDGET")
+    GEMINI_LATENCY_BUDGETS: Dict[str, float] = Field({}, env="GEMINI_LATENCY_BUDGETS")  # команда -> секунды
+    GEMINI_LARGE_PROMPT_TOKENS: int = Field(2000, env="GEMINI_LARGE_PROMPT_TOKENS")
+    GEMINI_ROUTER_WINDOW: int = Field(200, env="GEMINI_ROUTER_WINDOW")
+    GEMINI_ROUTER_MIN_SAMPLES: int = Field(20, env="GEMINI_ROUTER_MIN_SAMPLES")
+    GEMINI_ROUTER_MAX_ERROR_RATE: float = Field(0.5, env="GEMINI_ROUTER_MAX_ERROR_RATE")
+    GEMINI_HEDGE: bool = Field(True, env="GEMINI_HEDGE")
+    GEMINI_HEDGE_PERCENTILE: float = Field(0.95, env="GEMINI_HEDGE_PERCENTILE")
+    GEMINI_HEDGE_MAX_SHARE: float = Field(0.1, env="GEMINI_HEDGE_MAX_SHARE")  # доля запросов с запасным
+    GEMINI_MODELS_CACHE_PATH: str = Field(".cache/gemini_models.json", env="GEMINI_MODELS_CACHE_PATH")
+    GEMINI_MODELS_CACHE_TTL: int = Field(86400, env="GEMINI_MODELS_CACHE_TTL")
+    GEMINI_CONTEXT_CACHE: bool = Field(True, env="GEMINI_CONTEXT_CACHE")
+    GEMINI_CONTEXT_CACHE_TTL: int = Field(3600, env="GEMINI_CONTEXT_CACHE_TTL")
+    GEMINI_CONTEXT_CACHE_REFRESH: int = Field(600, env="GEMINI_CONTEXT_CACHE_REFRESH")
+    GEMINI_CONTEXT_CACHE_RETRY: int = Field(1800, env="GEMINI_CONTEXT_CACHE_RETRY")
+    GEMINI_STREAMING: bool = Field(True, env="GEMINI_STREAMING")
+    STREAM_EDIT_INTERVAL: float = Field(1.0, env="STREAM_EDIT_INTERVAL")
+    STREAM_MIN_CHUNK: int = Field(20, env="STREAM_MIN_CHUNK")
+    CHAT_DEBOUNCE: float = Field(1.0, env="CHAT_DEBOUNCE")  # тишина, после которой пачка сообщений уходит в модель
+    CHAT_DEBOUNCE_MAX: float = Field(3.0, env="CHAT_DEBOUNCE_MAX")
+    CHAT_QUEUE_MAX: int = Field(20, env="CHAT_QUEUE_MAX")  # сообщений в одной пачке
+
+    AI_CACHE_ENABLED: bool = Field(True, env="AI_CACHE_ENABLED")
+    AI_CACHE_SHARED: bool = Field(False, env="AI_CACHE_SHARED")
+    AI_CACHE_TTL: int = Field(6 * 3600, env="AI_CACHE_TTL")
+    AI_CACHE_MAX_ENTRIES: int = Field(5000, env="AI_CACHE_MAX_ENTRIES")
+    AI_CACHE_MAX_BYTES: int = Field(16 * 1024 * 1024, env="AI_CACHE_MAX_BYTES")
+    AI_CACHE_DISABLED_COMMANDS: List[str] = Field([], env="AI_CACHE_DISABLED_COMMANDS")
+
+    HISTORY_TOKEN_BUDGET: int = Field(6000, env="HISTORY_TOKEN_BUDGET")
+    HISTORY_TOKEN_BUDGETS: Dict[str, int] = Field({}, env="HISTORY_TOKEN_BUDGETS")
+    HISTORY_COMPRESSED_CHARS: int = Field(400, env="HISTORY_COMPRESSED_CHARS")
+    HISTORY_EXACT_TOKENS: bool = Field(False, env="HISTORY_EXACT_TOKENS")
+
+    PROFILE_CACHE_MAX_ENTRIES: int = Field(100000, env="PROFILE_CACHE_MAX_ENTRIES")
+    PROFILE_CACHE_TTL: float = Field(3600.0, env="PROFILE_CACHE_TTL")
+    PROFILE_CACHE_NEGATIVE_TTL: float = Field(300.0, env="PROFILE_CACHE_NEGATIVE_TTL")
+    PROFILE_WARMUP_DAYS: int = Field(7, env="PROFILE_WARMUP_DAYS")
+
+    FSM_STORAGE: str = Field("mongo", env="FSM_STORAGE")  # mongo | memory
+    FSM_SESSION_TTL: int = Field(30 * 24 * 3600, env="FSM_SESSION_TTL")
+    FSM_CACHE_TTL: float = Field(30.0, env="FSM_CACHE_TTL")  # 0 — читать сессии из базы на каждый апдейт
+    FSM_CACHE_MAX_ENTRIES: int = Field(50000, env="FSM_CACHE_MAX_ENTRIES")
+    FSM_FLUSH_INTERVAL: float = Field(0.5, env="FSM_FLUSH_INTERVAL")
+    FSM_FLUSH_BATCH: int = Field(500, env="FSM_FLUSH_BATCH")
 
     SYSTEM_PROMPT: str = Field(
         """
@@ -1,7 +1,56 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
 from config import settings
 
-client = AsyncIOMotorClient(settings.MONGO_URL)
-database = client[settings.DB_NAME]
-checkins_collection = database["checkins"]
-stress_collection = database["stress_tests"]
+if TYPE_CHECKING:
+    from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection, AsyncIOMotorDatabase
+
+
+def _command_timer():
+    """
+    Слушатель команд pymongo: время каждой команды Motor (find, update, bulk
+    write, ...) попадает в bot_mongo_seconds без обёрток вокруг вызовов.
+    События приходят из потоков pymongo.
+    """
+    from pymongo import monitoring
+
+    from utils.metrics import mongo_latency
+
+    class CommandTimer(monitoring.CommandListener):
+        def started(self, event: "monitoring.CommandStartedEvent") -> None:
+            pass
+
+        def succeeded(self, event: "monitoring.CommandSucceededEvent") -> None:
+            mongo_latency.observe(event.duration_micros / 1e6, event.command_name, "ok")
+
+        def failed(self, event: "monitoring.CommandFailedEvent") -> None:
+            mongo_latency.observe(event.duration_micros / 1e6, event.command_name, "error")
+
+    return CommandTimer()
+
+
+@lru_cache()
+def get_client() -> "AsyncIOMotorClient":
+    """Клиент Motor создаётся при первом обращении к базе, а не при импорте модуля."""
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    return AsyncIOMotorClient(settings.MONGO_URL, event_listeners=[_command_timer()])
+
+
+@lru_cache()
+def get_database() -> "AsyncIOMotorDatabase":
+    return get_client()[settings.DB_NAME]
+
+
+@lru_cache(maxsize=None)
+def get_collection(name: str) -> "AsyncIOMotorCollection":
+    return get_database()[name]
+
+
+async def close_database() -> None:
+    if get_client.cache_info().currsize:
+        get_client().close()
+    get_collection.cache_clear()
+    get_database.cache_clear()
+    get_client.cache_clear()
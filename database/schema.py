@@ -0,0 +1,122 @@
+from datetime import datetime
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Tuple
+import logging
+
+from config import get_settings
+
+if TYPE_CHECKING:
+    from motor.motor_asyncio import AsyncIOMotorDatabase
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Коды MongoDB для индекса с тем же именем/ключами, но другими опциями.
+INDEX_CONFLICT_CODES = (85, 86)
+
+
+def declared_indexes() -> Dict[str, List[IndexModel]]:
+    """Индексы по коллекциям. Добавляя новый запрос на горячем пути, добавьте индекс сюда."""
+    return {
+        "checkins": [
+            IndexModel([("user_id", ASCENDING), ("date", DESCENDING)], name="user_id_date"),
+            IndexModel([("date", DESCENDING)], name="date"),
+        ],
+        "stress_tests": [
+            IndexModel([("user_id", ASCENDING), ("date", DESCENDING)], name="user_id_date"),
+        ],
+        "daily_mood_rollups": [
+            IndexModel([("user_id", ASCENDING), ("day", ASCENDING)], name="user_id_day"),
+        ],
+        "user_settings": [
+            IndexModel([("user_id", ASCENDING)], name="user_id", unique=True),
+        ],
+        "fsm_sessions": [
+            IndexModel(
+                [("updated_at", ASCENDING)],
+                name="updated_at_ttl",
+                expireAfterSeconds=settings.FSM_SESSION_TTL,
+            ),
+        ],
+        "message_sequences": [
+            IndexModel([("owner", ASCENDING)], name="owner"),
+            IndexModel([("lease_until", ASCENDING)], name="lease_until"),
+        ],
+        "ai_response_cache": [
+            IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+        ],
+    }
+
+
+def hot_queries() -> List[Tuple[str, Dict[str, Any]]]:
+    """Запросы с горячего пути, план которых проверяется при старте."""
+    now = datetime.utcnow()
+    return [
+        ("daily_mood_rollups", {"user_id": 0, "day": {"$gte": now}}),  # /stats
+        ("checkins", {"user_id": 0, "date": {"$gte": now}}),  # /stats (STATS_SOURCE=aggregate)
+        ("checkins", {"date": {"$gte": now}}),  # прогрев кеша профилей
+        ("user_settings", {"user_id": 0}),  # get_user_language
+        ("message_sequences", {"owner": ""}),  # продление аренды /panic и /breath
+    ]
+
+
+async def _apply(database: "AsyncIOMotorDatabase", collection_name: str, index: IndexModel) -> None:
+    collection = database[collection_name]
+    try:
+        await collection.create_indexes([index])
+    except OperationFailure as e:
+        ttl = index.document.get("expireAfterSeconds")
+        if e.code not in INDEX_CONFLICT_CODES or ttl is None:
+            raise
+        # Изменился только TTL — меняем его на месте, без пересоздания индекса.
+        await database.command({
+            "collMod": collection_name,
+            "index": {"keyPattern": index.document["key"], "expireAfterSeconds": ttl},
+        })
+        logger.info("Schema: updated TTL of %s.%s to %ss", collection_name, index.document["name"], ttl)
+
+
+async def ensure_indexes(database: "AsyncIOMotorDatabase") -> None:
+    """Создаёт объявленные индексы. Повторный запуск ничего не меняет."""
+    for collection_name, indexes in declared_indexes().items():
+        for index in indexes:
+            try:
+                await _apply(database, collection_name, index)
+            except OperationFailure:
+                logger.exception("Schema: cannot create %s.%s", collection_name, index.document["name"])
+                if settings.SCHEMA_PLAN_CHECK == "fail":
+                    raise
+
+
+def _stages(plan: Any) -> Iterator[str]:
+    if isinstance(plan, dict):
+        stage = plan.get("stage")
+        if isinstance(stage, str):
+            yield stage
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _stages(item)
+
+
+async def verify_query_plans(database: "AsyncIOMotorDatabase") -> List[str]:
+    """Проверяет через explain(), что горячие запросы не скатились в COLLSCAN."""
+    problems = []
+    for collection_name, query in hot_queries():
+        explanation = await database[collection_name].find(query).explain()
+        winning_plan = explanation.get("queryPlanner", {}).get("winningPlan", {})
+        if "COLLSCAN" in set(_stages(winning_plan)):
+            problems.append(f"{collection_name} {sorted(query)}: COLLSCAN")
+    for problem in problems:
+        logger.warning("Schema: query plan regression — %s", problem)
+    if problems and settings.SCHEMA_PLAN_CHECK == "fail":
+        raise RuntimeError("Query plan regression: " + "; ".join(problems))
+    return problems
+
+
+async def bootstrap_schema(database: "AsyncIOMotorDatabase") -> None:
+    await ensure_indexes(database)
+    if settings.SCHEMA_PLAN_CHECK != "off":
+        await verify_query_plans(database)
@@ -0,0 +1,192 @@
+from collections import Counter
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+import logging
+
+from config import get_settings
+from database.db import get_collection
+from database.models import CheckIn
+from utils.texts import SUPPORTED_LANGUAGES, get_cause_options
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+MOOD_VALUES = {
+    "great": 5,
+    "fine": 4,
+    "okay": 3,
+    "bad": 2,
+    "tired": 2,
+    "angry": 1,
+}
+DEFAULT_MOOD_VALUE = 3
+SCALE_CAUSE = "scale"  # check-in по шкале 1–10, без причины
+UNKNOWN_CAUSE = "unknown"
+
+MoodStats = Dict[str, Any]
+
+
+def checkin_score(checkin: CheckIn) -> int:
+    if checkin.mood_score is not None:
+        return checkin.mood_score
+    return MOOD_VALUES.get(checkin.mood, DEFAULT_MOOD_VALUE)
+
+
+@lru_cache()
+def known_causes() -> FrozenSet[str]:
+    """Причины из кнопок всех языков: только они становятся ключами causes в сводке."""
+    causes = {value for language in SUPPORTED_LANGUAGES for _, value in get_cause_options(language)}
+    return frozenset(causes | {SCALE_CAUSE})
+
+
+def rollup_cause(cause: Optional[str]) -> str:
+    # Причина приходит из callback data, которую присылает клиент: "a.b" или "$x"
+    # в пути поля сломали бы $inc.
+    return cause if cause in known_causes() else UNKNOWN_CAUSE
+
+
+def _day_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, value.day)
+
+
+def rollup_update(checkin: CheckIn) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Фильтр и $inc-обновление дневной сводки для одного check-in."""
+    day = _day_start(checkin.date)
+    return (
+        {"_id": f"{checkin.user_id}:{day.date().isoformat()}"},
+        {
+            "$inc": {"count": 1, "score_sum": checkin_score(checkin), f"causes.{rollup_cause(checkin.cause)}": 1},
+            "$setOnInsert": {"user_id": checkin.user_id, "day": day},
+        },
+    )
+
+
+def summarize_days(days: List[Tuple[date, int, int]], causes: Counter) -> Optional[MoodStats]:
+    """Итог по дням: [(день, число записей, сумма баллов)] и счётчик причин."""
+    days = [item for item in days if item[1]]
+    if not days:
+        return None
+    count = sum(item[1] for item in days)
+    score_sum = sum(item[2] for item in days)
+    averages = [(day, day_sum / day_count) for day, day_count, day_sum in days]
+    return {
+        "count": count,
+        "average": score_sum / count,
+        "triggers": causes,
+        "best_day": max(averages, key=lambda item: item[1]),
+        "worst_day": min(averages, key=lambda item: item[1]),
+    }
+
+
+async def rollup_stats(user_id: int, since: datetime) -> Optional[MoodStats]:
+    """Статистика из дневных сводок: читается не больше одной записи на день."""
+    cursor = get_collection("daily_mood_rollups").find({"user_id": user_id, "day": {"$gte": _day_start(since)}}).sort("day", 1)
+    days = []
+    causes: Counter = Counter()
+    async for rollup in cursor:
+        days.append((rollup["day"].date(), rollup.get("count", 0), rollup.get("score_sum", 0)))
+        causes.update(rollup.get("causes") or {})
+    return summarize_days(days, causes)
+
+
+def _score_expression() -> Dict[str, Any]:
+    branches = [{"case": {"$eq": ["$mood", mood]}, "then": value} for mood, value in MOOD_VALUES.items()]
+    return {"$ifNull": ["$mood_score", {"$switch": {"branches": branches, "default": DEFAULT_MOOD_VALUE}}]}
+
+
+def _cause_expression(field: str) -> Dict[str, Any]:
+    """rollup_cause в агрегации."""
+    return {"$cond": [{"$in": [field, sorted(known_causes())]}, field, UNKNOWN_CAUSE]}
+
+
+def checkin_stats_pipeline(user_id: int, since: datetime) -> List[Dict[str, Any]]:
+    # Как и rollup_stats, считаем целыми днями (UTC) с начала дня since.
+    return [
+        {"$match": {"user_id": user_id, "date": {"$gte": _day_start(since)}}},
+        {"$project": {
+            "cause": _cause_expression("$cause"),
+            "score": _score_expression(),
+            "day": {"$dateToString": {"format": "%Y-%m-%d", "date": {"$toDate": "$date"}}},
+        }},
+        {"$facet": {
+            "causes": [{"$group": {"_id": "$cause", "count": {"$sum": 1}}}],
+            "days": [
+                {"$group": {"_id": "$day", "count": {"$sum": 1}, "score_sum": {"$sum": "$score"}}},
+                {"$sort": {"_id": 1}},
+            ],
+        }},
+    ]
+
+
+async def checkin_stats(user_id: int, since: datetime) -> Optional[MoodStats]:
+    """Та же статистика агрегацией по сырым check-in — без выгрузки документов."""
+    result = await get_collection("checkins").aggregate(checkin_stats_pipeline(user_id, since)).to_list(length=1)
+    if not result:
+        return None
+    facets = result[0]
+    days = [(date.fromisoformat(item["_id"]), item["count"], item["score_sum"]) for item in facets["days"]]
+    causes = Counter({item["_id"]: item["count"] for item in facets["causes"]})
+    return summarize_days(days, causes)
+
+
+async def weekly_stats(user_id: int) -> Optional[MoodStats]:
+    since = datetime.utcnow() - timedelta(days=7)
+    if settings.STATS_SOURCE == "aggregate":
+        return await checkin_stats(user_id, since)
+    return await rollup_stats(user_id, since)
+
+
+async def backfill_rollups() -> None:
+    """Пересобирает daily_mood_rollups из всех check-in (разово, после деплоя)."""
+    pipeline = [
+        {"$project": {
+            "user_id": 1,
+            "cause": _cause_expression("$cause"),
+            "score": _score_expression(),
+            "day": {"$dateTrunc": {"date": {"$toDate": "$date"}, "unit": "day"}},
+        }},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "day": "$day", "cause": "$cause"},
+            "count": {"$sum": 1},
+            "score_sum": {"$sum": "$score"},
+        }},
+        {"$group": {
+            "_id": {"user_id": "$_id.user_id", "day": "$_id.day"},
+            "count": {"$sum": "$count"},
+            "score_sum": {"$sum": "$score_sum"},
+            "causes": {"$push": {"k": "$_id.cause", "v": "$count"}},
+        }},
+        {"$project": {
+            "_id": {"$concat": [
+                {"$toString": "$_id.user_id"}, ":",
+                {"$dateToString": {"format": "%Y-%m-%d", "date": "$_id.day"}},
+            ]},
+            "user_id": "$_id.user_id",
+            "day": "$_id.day",
+            "count": 1,
+            "score_sum": 1,
+            "causes": {"$arrayToObject": "$causes"},
+        }},
+        {"$merge": {"into": "daily_mood_rollups", "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+    await get_collection("checkins").aggregate(pipeline).to_list(length=None)
+
+
+async def ensure_rollups() -> None:
+    """
+    Собирает daily_mood_rollups перед запуском бота: всегда при
+    STATS_BACKFILL_ON_START, а при STATS_SOURCE=rollups — если сводок ещё
+    нет, но check-in уже есть (первый деплой сводок), иначе /stats был бы
+    пуст. Вызывается один раз на запуск: в ProcessShardPool — родительским
+    процессом до старта шардов.
+    """
+    if not settings.STATS_BACKFILL_ON_START:
+        if settings.STATS_SOURCE != "rollups":
+            return
+        if await get_collection("daily_mood_rollups").find_one({}, {"_id": 1}) is not None:
+            return
+        if await get_collection("checkins").find_one({}, {"_id": 1}) is None:
+            return
+    logger.info("Stats: rebuilding daily_mood_rollups from check-ins")
+    await backfill_rollups()
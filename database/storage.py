@@ -0,0 +1,190 @@
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from pymongo import UpdateOne
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Optional
+import asyncio
+import copy
+import logging
+import time
+
+from config import get_settings
+
+if TYPE_CHECKING:
+    from motor.motor_asyncio import AsyncIOMotorDatabase
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def _key(key: StorageKey) -> str:
+    parts = [str(key.bot_id), str(key.chat_id), str(key.user_id)]
+    thread_id = getattr(key, "thread_id", None)
+    business_connection_id = getattr(key, "business_connection_id", None)
+    if thread_id:
+        parts.append(f"t{thread_id}")
+    if business_connection_id:
+        parts.append(f"b{business_connection_id}")
+    parts.append(key.destiny)
+    return ":".join(parts)
+
+
+def _versioned_set(field: str, value: Any, ts: int) -> Dict[str, Any]:
+    """
+    Обновляет поле, только если запись новее сохранённой. Так при нескольких
+    процессах поздний flush со старыми данными не затрёт более свежие.
+    """
+    stored_ts = {"$ifNull": [f"${field}_ts", 0]}
+    return {
+        field: {"$cond": [{"$gt": [ts, stored_ts]}, {"$literal": value}, f"${field}"]},
+        f"{field}_ts": {"$max": [ts, stored_ts]},
+    }
+
+
+class _Entry:
+    __slots__ = ("state", "data", "loaded_at")
+
+    def __init__(self, state: Optional[str], data: Dict[str, Any]) -> None:
+        self.state = state
+        self.data = data
+        self.loaded_at = time.monotonic()
+
+
+class MongoStorage(BaseStorage):
+    """
+    FSM-хранилище в MongoDB с локальным кешем и отложенной записью.
+
+    Чтения обслуживаются из кеша процесса (не старше FSM_CACHE_TTL секунд),
+    поэтому апдейты одного пользователя должны идти в один процесс: так
+    устроены polling, webhook с одним воркером и ProcessShardPool, который
+    при смене числа процессов вызывает release(). Если пользователи делятся
+    между процессами иначе, кеш нужно выключить: FSM_CACHE_TTL=0.
+    Записи по одному ключу склеиваются и сбрасываются пачкой через bulk_write
+    раз в FSM_FLUSH_INTERVAL секунд или при накоплении FSM_FLUSH_BATCH ключей.
+    Неактивные сессии удаляются TTL-индексом по updated_at (см. database/schema.py).
+    """
+
+    def __init__(self, database: "AsyncIOMotorDatabase", collection_name: str = "fsm_sessions") -> None:
+        self.collection = database[collection_name]
+        self._cache: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_now = asyncio.Event()
+        self._closed = False
+
+    def size(self) -> Dict[str, int]:
+        """Сессий в локальном кеше и сессий, ждущих записи в базу."""
+        return {"cached": len(self._cache), "pending": len(self._pending)}
+
+    async def _load(self, key: str) -> _Entry:
+        entry = self._cache.get(key)
+        if entry is not None and (
+            key in self._pending or time.monotonic() - entry.loaded_at < settings.FSM_CACHE_TTL
+        ):
+            self._cache.move_to_end(key)
+            return entry
+        record = await self.collection.find_one({"_id": key}, {"state": 1, "data": 1})
+        # Пока шёл запрос, мог появиться локальный pending — он новее базы.
+        if key in self._pending and key in self._cache:
+            return self._cache[key]
+        entry = _Entry(record.get("state") if record else None, (record or {}).get("data") or {})
+        self._remember(key, entry)
+        return entry
+
+    def _remember(self, key: str, entry: _Entry) -> None:
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        if len(self._cache) <= settings.FSM_CACHE_MAX_ENTRIES:
+            return
+        for old_key in list(self._cache):
+            if len(self._cache) <= settings.FSM_CACHE_MAX_ENTRIES:
+                break
+            if old_key not in self._pending:
+                del self._cache[old_key]
+
+    def _schedule(self, key: str, field: str, value: Any) -> None:
+        self._pending.setdefault(key, {})[field] = (value, time.time_ns())
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+        if len(self._pending) >= settings.FSM_FLUSH_BATCH:
+            self._flush_now.set()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        name = _key(key)
+        value = state.state if isinstance(state, State) else state
+        entry = await self._load(name)
+        entry.state = value
+        self._schedule(name, "state", value)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        entry = await self._load(_key(key))
+        return entry.state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        name = _key(key)
+        value = copy.deepcopy(data)
+        entry = await self._load(name)
+        entry.data = value
+        self._schedule(name, "data", value)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        entry = await self._load(_key(key))
+        return copy.deepcopy(entry.data)
+
+    async def _flush_loop(self) -> None:
+        # После close() последний flush делает сам close.
+        while self._pending and not self._closed:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), timeout=settings.FSM_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_now.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        operations = []
+        for key, fields in pending.items():
+            update: Dict[str, Any] = {"updated_at": "$$NOW"}
+            for field, (value, ts) in fields.items():
+                update.update(_versioned_set(field, value, ts))
+            operations.append(UpdateOne({"_id": key}, [{"$set": update}], upsert=True))
+        try:
+            await self.collection.bulk_write(operations, ordered=False)
+        except asyncio.CancelledError:
+            self._restore(pending)
+            raise
+        except Exception:
+            logger.exception("FSM storage: flush of %d sessions failed, retrying later", len(operations))
+            self._restore(pending)
+            if not self._closed:
+                await asyncio.sleep(settings.FSM_FLUSH_INTERVAL)
+
+    def _restore(self, pending: Dict[str, Dict[str, Any]]) -> None:
+        """Возвращает несохранённое, не затирая более свежие записи."""
+        for key, fields in pending.items():
+            merged = dict(fields)
+            merged.update(self._pending.get(key, {}))
+            self._pending[key] = merged
+
+    async def release(self) -> None:
+        """
+        Сбрасывает записи в базу и забывает закешированные сессии: после
+        этого часть пользователей может перейти в другой процесс.
+        """
+        await self.flush()
+        for key in list(self._cache):
+            if key not in self._pending:  # несохранённое остаётся до следующего flush
+                del self._cache[key]
+
+    async def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self._flush_task is not None:
+            # Не отменяем: запись, уже отправленная в базу, должна завершиться.
+            self._flush_now.set()
+            await self._flush_task
+        await self.flush()
@@ -0,0 +1,171 @@
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+import asyncio
+import logging
+
+from config import get_settings
+from database.db import get_database
+from database.models import CheckIn, StressTestResult
+from database.stats import rollup_update
+
+if TYPE_CHECKING:
+    from motor.motor_asyncio import AsyncIOMotorDatabase
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+# (коллекция, документ, future для режима "flush" или None)
+_Item = Tuple[str, Dict[str, Any], Optional["asyncio.Future[None]"]]
+
+
+def _merge_rollups(checkins: List[Dict[str, Any]]) -> List[UpdateOne]:
+    """Склеивает $inc для одинаковых дневных сводок в одну операцию."""
+    merged: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+    for document in checkins:
+        query, update = rollup_update(CheckIn(**document))
+        if query["_id"] not in merged:
+            merged[query["_id"]] = (query, update)
+            continue
+        increments = merged[query["_id"]][1]["$inc"]
+        for field, value in update["$inc"].items():
+            increments[field] = increments.get(field, 0) + value
+    return [UpdateOne(query, update, upsert=True) for query, update in merged.values()]
+
+
+class WriteQueue:
+    """
+    Фоновая очередь записи check-in и результатов стресс-теста.
+
+    Документы копятся и пишутся через insert_many, когда набирается
+    WRITE_QUEUE_BATCH штук или проходит WRITE_QUEUE_INTERVAL секунд.
+    Когда в очереди WRITE_QUEUE_MAX документов, put() ждёт (backpressure).
+    WRITE_DURABILITY: "enqueue" — put() возвращается сразу после постановки
+    в очередь, "flush" — после записи пачки в базу. close() дописывает всё.
+    """
+
+    def __init__(self, database: Optional["AsyncIOMotorDatabase"] = None) -> None:
+        self._database = database
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def database(self) -> "AsyncIOMotorDatabase":
+        return self._database if self._database is not None else get_database()
+
+    def _ensure_started(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=settings.WRITE_QUEUE_MAX)
+            self._task = asyncio.create_task(self._run(), name="write-queue")
+        return self._queue
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def put_checkin(self, checkin: CheckIn) -> None:
+        await self._put("checkins", checkin.dict())
+
+    async def put_stress_result(self, result: StressTestResult) -> None:
+        await self._put("stress_tests", result.dict())
+
+    async def _put(self, collection: str, document: Dict[str, Any]) -> None:
+        queue = self._ensure_started()
+        # _id задаётся заранее, чтобы повтор insert_many после сбоя не создал дублей.
+        document["_id"] = ObjectId()
+        future = None
+        if settings.WRITE_DURABILITY == "flush":
+            future = asyncio.get_running_loop().create_future()
+        await queue.put((collection, document, future))
+        if future is not None:
+            await future
+
+    async def _next_batch(self, queue: asyncio.Queue) -> Tuple[List[_Item], bool]:
+        first = await queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.WRITE_QUEUE_INTERVAL
+        while len(batch) < settings.WRITE_QUEUE_BATCH:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _run(self) -> None:
+        queue = self._queue
+        closing = False
+        while not closing:
+            batch, closing = await self._next_batch(queue)
+            if batch:
+                await self._write(batch)
+        # Дописываем то, что успели положить после сигнала остановки.
+        rest = []
+        while not queue.empty():
+            item = queue.get_nowait()
+            if item is not None:
+                rest.append(item)
+        if rest:
+            await self._write(rest)
+
+    async def _insert(self, collection: str, documents: List[Dict[str, Any]]) -> None:
+        for attempt in range(settings.WRITE_QUEUE_RETRIES + 1):
+            try:
+                await self.database[collection].insert_many(documents, ordered=False)
+                return
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                if errors and all(error.get("code") == DUPLICATE_KEY for error in errors):
+                    return  # уже записано предыдущей попыткой
+                if attempt == settings.WRITE_QUEUE_RETRIES:
+                    raise
+            except Exception:
+                if attempt == settings.WRITE_QUEUE_RETRIES:
+                    raise
+            await asyncio.sleep(0.2 * 2 ** attempt)
+
+    async def _write(self, batch: List[_Item]) -> None:
+        grouped: Dict[str, List[_Item]] = {}
+        for item in batch:
+            grouped.setdefault(item[0], []).append(item)
+        for collection, items in grouped.items():
+            documents = [document for _, document, _ in items]
+            error: Optional[Exception] = None
+            try:
+                await self._insert(collection, documents)
+            except Exception as e:
+                error = e
+                logger.exception("Write queue: lost %d documents for %s", len(documents), collection)
+            if error is None and collection == "checkins":
+                try:
+                    await self.database["daily_mood_rollups"].bulk_write(_merge_rollups(documents), ordered=False)
+                except Exception:
+                    logger.exception("Write queue: rollup update failed, run backfill_rollups()")
+            for _, _, future in items:
+                if future is None or future.done():
+                    continue
+                if error is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(error)
+
+    async def close(self) -> None:
+        if self._queue is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._queue = None
+        self._task = None
+
+
+write_queue = WriteQueue()
@@ -0,0 +1,150 @@
+"""
+Заглушка Gemini API (REST generativelanguage) для нагрузочного теста:
+generateContent, streamGenerateContent (SSE), countTokens, cachedContents
+и список моделей. Задержка до первого токена, число и темп фрагментов
+задаются параметрами.
+
+    python -m loadtest.fake_gemini --port 8082 [--latency 0.8] [--chunks 6] [--chunk-delay 0.15]
+"""
+from aiohttp import web
+from collections import Counter
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+REPLY = (
+    "Сіздің сезіміңіз түсінікті. Бір сәт тоқтап, терең тыныс алыңыз. "
+    "Қазір сізге не көмектесер еді: қысқа серуен, досыңызбен сөйлесу немесе "
+    "бірнеше минут тыныштықта отыру? Кішкентай қадамның өзі маңызды. "
+)
+
+
+class FakeGemini:
+    def __init__(self, latency: float, jitter: float, chunks: int, chunk_delay: float, reply_chars: int, error_rate: float) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.chunks = max(chunks, 1)
+        self.chunk_delay = chunk_delay
+        self.reply = (REPLY * (reply_chars // len(REPLY) + 1))[:reply_chars]
+        self.error_rate = error_rate
+        self.calls: Counter = Counter()
+
+    async def _wait_first_token(self) -> None:
+        await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+    @staticmethod
+    def _candidate(text: str, finished: bool) -> dict:
+        candidate = {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+        if finished:
+            candidate["finishReason"] = "STOP"
+        return candidate
+
+    def _usage(self) -> dict:
+        tokens = len(self.reply) // 3
+        return {"promptTokenCount": 500, "candidatesTokenCount": tokens, "totalTokenCount": 500 + tokens}
+
+    @staticmethod
+    def _error() -> web.Response:
+        return web.json_response(
+            {"error": {"code": 503, "message": "The model is overloaded.", "status": "UNAVAILABLE"}}, status=503
+        )
+
+    async def generate(self, request: web.Request) -> web.Response:
+        await request.read()
+        await self._wait_first_token()
+        if random.random() < self.error_rate:
+            self.calls["errors"] += 1
+            return self._error()
+        await asyncio.sleep(self.chunk_delay * (self.chunks - 1))
+        return web.json_response({"candidates": [self._candidate(self.reply, True)], "usageMetadata": self._usage()})
+
+    async def stream(self, request: web.Request) -> web.StreamResponse:
+        await request.read()
+        await self._wait_first_token()
+        if random.random() < self.error_rate:
+            self.calls["errors"] += 1
+            return self._error()
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        size = -(-len(self.reply) // self.chunks)
+        parts = [self.reply[i:i + size] for i in range(0, len(self.reply), size)]
+        for index, part in enumerate(parts):
+            if index:
+                await asyncio.sleep(self.chunk_delay)
+            last = index == len(parts) - 1
+            payload = {"candidates": [self._candidate(part, last)]}
+            if last:
+                payload["usageMetadata"] = self._usage()
+            await response.write(f"data: {json.dumps(payload, ensure_ascii=False)}\r\n\r\n".encode("utf-8"))
+        await response.write_eof()
+        return response
+
+    async def count_tokens(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        return web.json_response({"totalTokens": max(len(body) // 3, 1)})
+
+    async def create_cache(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        expire = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() + 3600))
+        return web.json_response({"name": f"cachedContents/{uuid.uuid4().hex}", "model": body.get("model"), "expireTime": expire})
+
+    async def update_cache(self, request: web.Request) -> web.Response:
+        return web.json_response({"name": f"cachedContents/{request.match_info['cache']}"})
+
+    async def list_models(self, request: web.Request) -> web.Response:
+        return web.json_response({"models": [{"name": "models/gemini-2.0-flash"}, {"name": "models/gemini-1.5-flash"}]})
+
+    async def route(self, request: web.Request) -> web.StreamResponse:
+        action = request.match_info["action"]
+        self.calls[action] += 1
+        if action == "streamGenerateContent":
+            return await self.stream(request)
+        if action == "generateContent":
+            return await self.generate(request)
+        if action == "countTokens":
+            return await self.count_tokens(request)
+        raise web.HTTPNotFound()
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response({"calls": dict(self.calls)})
+
+
+def build_app(
+    latency: float = 0.8,
+    jitter: float = 0.2,
+    chunks: int = 6,
+    chunk_delay: float = 0.15,
+    reply_chars: int = 600,
+    error_rate: float = 0.0,
+) -> web.Application:
+    fake = FakeGemini(latency, jitter, chunks, chunk_delay, reply_chars, error_rate)
+    app = web.Application()
+    app.router.add_get("/_stats", fake.stats)
+    app.router.add_post("/{version}/models/{model}:{action}", fake.route)
+    app.router.add_get("/{version}/models", fake.list_models)
+    app.router.add_post("/{version}/cachedContents", fake.create_cache)
+    app.router.add_patch("/{version}/cachedContents/{cache}", fake.update_cache)
+    app.router.add_delete("/{version}/cachedContents/{cache}", fake.update_cache)
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--latency", type=float, default=0.8, help="задержка до первого токена, с")
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--chunks", type=int, default=6, help="фрагментов в потоковом ответе")
+    parser.add_argument("--chunk-delay", type=float, default=0.15)
+    parser.add_argument("--reply-chars", type=int, default=600)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 503")
+    args = parser.parse_args()
+    app = build_app(args.latency, args.jitter, args.chunks, args.chunk_delay, args.reply_chars, args.error_rate)
+    web.run_app(app, host=args.host, port=args.port, print=None, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
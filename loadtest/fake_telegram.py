@@ -0,0 +1,102 @@
+"""
+Заглушка Bot API для нагрузочного теста: отвечает на методы, которые
+вызывает бот, с заданной задержкой и считает вызовы.
+
+    python -m loadtest.fake_telegram --port 8081 [--latency 0.03] [--rate-limited 0.0]
+"""
+from aiohttp import web
+from collections import Counter
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+
+BOT_USER = {"id": 123456, "is_bot": True, "first_name": "LoadTest", "username": "loadtest_bot"}
+MESSAGE_METHODS = {"sendMessage", "editMessageText", "editMessageReplyMarkup", "sendPhoto", "sendDocument"}
+
+
+class FakeTelegram:
+    def __init__(self, latency: float, jitter: float, rate_limited: float) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limited = rate_limited
+        self.calls: Counter = Counter()
+        self.rejected: Counter = Counter()
+        self._message_ids = itertools.count(1)
+
+    def _message(self, params) -> dict:
+        chat_id = int(params.get("chat_id", 0))
+        message = {
+            "message_id": int(params.get("message_id") or next(self._message_ids)),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "group"},
+            "from": BOT_USER,
+        }
+        if "text" in params:
+            message["text"] = params["text"]
+        if params.get("reply_markup"):
+            markup = json.loads(params["reply_markup"])
+            if "inline_keyboard" in markup:
+                message["reply_markup"] = markup
+        return message
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = await request.post()
+        await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+        if method in MESSAGE_METHODS and random.random() < self.rate_limited:
+            self.rejected[method] += 1
+            return web.json_response(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": "Too Many Requests: retry after 1",
+                    "parameters": {"retry_after": 1},
+                },
+                status=429,
+            )
+        self.calls[method] += 1
+        if method == "getMe":
+            result = BOT_USER
+        elif method in MESSAGE_METHODS:
+            result = self._message(params)
+        elif method == "getUpdates":
+            await asyncio.sleep(float(params.get("timeout") or 0))
+            result = []
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response({"calls": dict(self.calls), "rejected": dict(self.rejected)})
+
+
+def build_app(latency: float = 0.03, jitter: float = 0.01, rate_limited: float = 0.0) -> web.Application:
+    fake = FakeTelegram(latency, jitter, rate_limited)
+    app = web.Application(client_max_size=50 * 1024 * 1024)
+    app.router.add_get("/_stats", fake.stats)
+    app.router.add_post("/bot{token}/{method}", fake.handle)
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.03, help="задержка ответа, с")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--rate-limited", type=float, default=0.0, help="доля отправок, получающих 429")
+    args = parser.parse_args()
+    web.run_app(
+        build_app(args.latency, args.jitter, args.rate_limited),
+        host=args.host,
+        port=args.port,
+        print=None,
+        access_log=None,
+    )
+
+
+if __name__ == "__main__":
+    main()
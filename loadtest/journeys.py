@@ -0,0 +1,84 @@
+"""Сценарии виртуальных пользователей: последовательности апдейтов с именами шагов."""
+from aiogram.types import CallbackQuery, Chat, Message, Update, User
+from datetime import datetime
+from random import Random
+from typing import Callable, Dict, Iterator, Tuple
+import itertools
+
+from bot.callbacks import CauseCallback, MoodCallback, QuizAnswerCallback, StressCallback
+from utils.texts import DEFAULT_LANGUAGE, get_cause_options, get_list, get_mood_options, get_quiz, get_quiz_button_map
+
+Step = Tuple[str, Update]
+Journey = Callable[["VirtualUser", Random], Iterator[Step]]
+
+CHAT_BUTTON = "🤖 CHAT AI"
+CHAT_PHRASES = [
+    "Соңғы кезде ұйқым нашар.",
+    "Жұмыста қатты шаршадым, не істеймін?",
+    "Мне тревожно перед экзаменом.",
+    "Как перестать думать о плохом?",
+    "Досыммен ұрсысып қалдым.",
+]
+
+_update_ids = itertools.count(1)
+_message_ids = itertools.count(1)
+
+
+class VirtualUser:
+    def __init__(self, user_id: int, language: str = DEFAULT_LANGUAGE) -> None:
+        self.language = language
+        self.user = User(id=user_id, is_bot=False, first_name=f"Load{user_id}", language_code=language)
+        self.chat = Chat(id=user_id, type="private")
+
+    def message(self, text: str) -> Update:
+        message = Message(
+            message_id=next(_message_ids), date=datetime.now(), chat=self.chat, from_user=self.user, text=text
+        )
+        return Update(update_id=next(_update_ids), message=message)
+
+    def callback(self, data: str) -> Update:
+        # Сообщение с клавиатурой, на кнопку которого "нажали".
+        message = Message(message_id=next(_message_ids), date=datetime.now(), chat=self.chat, text="…")
+        query = CallbackQuery(
+            id=str(next(_update_ids)), from_user=self.user, chat_instance=str(self.chat.id), message=message, data=data
+        )
+        return Update(update_id=next(_update_ids), callback_query=query)
+
+
+def checkin(user: VirtualUser, rng: Random) -> Iterator[Step]:
+    yield "start", user.message("/start")
+    yield "checkin", user.message("/checkin")
+    mood = rng.choice(get_mood_options(user.language))[1]
+    yield "checkin_mood", user.callback(MoodCallback(value=mood).pack())
+    cause = rng.choice(get_cause_options(user.language))[1]
+    yield "checkin_cause", user.callback(CauseCallback(value=cause).pack())
+
+
+def quiz(user: VirtualUser, rng: Random) -> Iterator[Step]:
+    yield "start", user.message("/start")
+    label, quiz_key = rng.choice(sorted(get_quiz_button_map(user.language).items()))
+    yield "quiz_start", user.message(label)
+    for _ in get_quiz(user.language, quiz_key)["questions"]:
+        yield "quiz_answer", user.callback(QuizAnswerCallback(value=rng.choice(["yes", "no"])).pack())
+
+
+def stress_test(user: VirtualUser, rng: Random) -> Iterator[Step]:
+    yield "start", user.message("/start")
+    yield "stress_start", user.message("/stress_test")
+    for _ in get_list("stress_questions", user.language):
+        yield "stress_answer", user.callback(StressCallback(value=rng.choice(["yes", "no"])).pack())
+
+
+def chat(user: VirtualUser, rng: Random, turns: int = 3) -> Iterator[Step]:
+    yield "start", user.message("/start")
+    yield "chat_start", user.message(CHAT_BUTTON)
+    for _ in range(turns):
+        yield "chat_turn", user.message(rng.choice(CHAT_PHRASES))
+
+
+JOURNEYS: Dict[str, Journey] = {
+    "checkin": checkin,
+    "quiz": quiz,
+    "stress": stress_test,
+    "chat": chat,
+}
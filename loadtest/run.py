@@ -0,0 +1,226 @@
+"""
+Нагрузочный тест бота целиком, без сети: заглушки Bot API и Gemini
+запускаются локальными процессами, бот собирается как в main.py и
+получает апдейты через Dispatcher.feed_update от N виртуальных
+пользователей, которые проходят сценарии из loadtest/journeys.py.
+Нужна локальная MongoDB (MONGO_URL); данные пишутся в базу DB_NAME,
+по умолчанию mental_bot_loadtest.
+
+    python -m loadtest.run --users 1000 --duration 60 [--mix checkin=3,quiz=2,stress=1,chat=4]
+
+Общий лимит Telegram (OUTBOUND_GLOBAL_RATE) на время теста снимается,
+чтобы мерить сам бот; --telegram-limits оставляет его. Лимиты на чат
+действуют всегда, как у реального пользователя.
+"""
+from collections import defaultdict
+from random import Random
+from typing import Dict, List, Tuple
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(module: str, port: int, options: List[str]) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, "-m", module, "--port", str(port), *options])
+
+
+async def _wait_ready(port: int, timeout: float = 15.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"stub server on port {port} did not start")
+            await asyncio.sleep(0.1)
+
+
+def _fetch_stats(port: int) -> dict:
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stats", timeout=5) as response:
+            return json.load(response)
+    except OSError:
+        return {}
+
+
+def _parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, step: str, seconds: float) -> None:
+        self.latencies[step].append(seconds)
+
+    def error(self, step: str) -> None:
+        self.errors[step] += 1
+
+
+def _percentiles(values: List[float]) -> Tuple[float, float, float]:
+    if len(values) < 2:
+        value = values[0] if values else 0.0
+        return value, value, value
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return cuts[49], cuts[94], cuts[98]
+
+
+async def run_user(dp, bot, user, mix: Dict[str, float], deadline: float, think: float, recorder: Recorder, rng: Random) -> None:
+    from bot.conversation import conversations
+    from loadtest.journeys import JOURNEYS
+
+    names, weights = list(mix), list(mix.values())
+    while time.monotonic() < deadline:
+        journey = JOURNEYS[rng.choices(names, weights)[0]]
+        for step, update in journey(user, rng):
+            started = time.perf_counter()
+            try:
+                await dp.feed_update(bot, update)
+                # Сообщения CHAT AI обработчик только ставит в очередь: шаг длится до ответа.
+                await conversations.idle(user.chat.id)
+            except Exception:
+                recorder.error(step)
+            else:
+                recorder.record(step, time.perf_counter() - started)
+            if think:
+                await asyncio.sleep(rng.expovariate(1 / think))
+            if time.monotonic() >= deadline:
+                return
+
+
+async def drive(args: argparse.Namespace) -> None:
+    # Модули бота импортируются только здесь: настройки уже указывают на заглушки.
+    import main as app
+    from loadtest.journeys import JOURNEYS, VirtualUser
+
+    mix = _parse_mix(args.mix)
+    unknown = set(mix) - set(JOURNEYS)
+    if unknown:
+        raise SystemExit(f"unknown journeys: {', '.join(sorted(unknown))}")
+
+    bot = app.build_bot()
+    dp = app.build_dispatcher()
+    await dp.emit_startup(bot=bot, bots=[bot], dispatcher=dp)
+    recorder = Recorder()
+    started = time.monotonic()
+    deadline = started + args.ramp + args.duration
+
+    async def delayed_user(index: int) -> None:
+        await asyncio.sleep(args.ramp * index / args.users)
+        user = VirtualUser(args.first_user_id + index)
+        await run_user(dp, bot, user, mix, deadline, args.think, recorder, Random(args.seed + index))
+
+    try:
+        await asyncio.gather(*(delayed_user(index) for index in range(args.users)))
+    finally:
+        elapsed = time.monotonic() - started
+        outbound = bot.session.outbound.metrics()
+        await dp.emit_shutdown(bot=bot, bots=[bot], dispatcher=dp)
+        await bot.session.close()
+    report(args, recorder, elapsed, outbound)
+
+
+def report(args: argparse.Namespace, recorder: Recorder, elapsed: float, outbound: dict) -> None:
+    total = sum(len(values) for values in recorder.latencies.values())
+    errors = sum(recorder.errors.values())
+    print(f"\n{args.users} users, {elapsed:.1f}s (ramp {args.ramp}s), mix {args.mix}")
+    print(f"updates: {total} ok, {errors} failed, {total / elapsed:.1f} updates/s\n")
+    print(f"{'step':16} {'count':>7} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    all_values: List[float] = []
+    for step in sorted(set(recorder.latencies) | set(recorder.errors)):
+        values = recorder.latencies.get(step, [])
+        all_values.extend(values)
+        p50, p95, p99 = _percentiles(values)
+        print(
+            f"{step:16} {len(values):7} {recorder.errors.get(step, 0):7} "
+            f"{p50 * 1000:8.1f} {p95 * 1000:8.1f} {p99 * 1000:8.1f} {max(values, default=0) * 1000:8.1f}"
+        )
+    p50, p95, p99 = _percentiles(all_values)
+    print(f"{'all':16} {len(all_values):7} {errors:7} {p50 * 1000:8.1f} {p95 * 1000:8.1f} {p99 * 1000:8.1f}")
+    print(f"\noutbound queue: {json.dumps(outbound, default=str)}")
+    print(f"fake Telegram: {json.dumps(_fetch_stats(args.telegram_port))}")
+    print(f"fake Gemini: {json.dumps(_fetch_stats(args.gemini_port))}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=60.0, help="секунд после разгона")
+    parser.add_argument("--ramp", type=float, default=10.0, help="секунд на запуск всех пользователей")
+    parser.add_argument("--think", type=float, default=1.0, help="средняя пауза между шагами, с")
+    parser.add_argument("--mix", default="checkin=3,quiz=2,stress=1,chat=4")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--first-user-id", type=int, default=900_000_000)
+    parser.add_argument("--db-name", default="mental_bot_loadtest")
+    parser.add_argument("--telegram-limits", action="store_true", help="не снимать общий лимит отправки")
+    parser.add_argument("--telegram-latency", type=float, default=0.03)
+    parser.add_argument("--telegram-rate-limited", type=float, default=0.0, help="доля отправок с ответом 429")
+    parser.add_argument("--gemini-latency", type=float, default=0.8, help="до первого токена, с")
+    parser.add_argument("--gemini-chunks", type=int, default=6)
+    parser.add_argument("--gemini-chunk-delay", type=float, default=0.15)
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    parser.add_argument("--no-streaming", action="store_true", help="GEMINI_STREAMING=false")
+    args = parser.parse_args()
+
+    args.telegram_port = _free_port()
+    args.gemini_port = _free_port()
+    servers = [
+        _start_server("loadtest.fake_telegram", args.telegram_port, [
+            "--latency", str(args.telegram_latency),
+            "--rate-limited", str(args.telegram_rate_limited),
+        ]),
+        _start_server("loadtest.fake_gemini", args.gemini_port, [
+            "--latency", str(args.gemini_latency),
+            "--chunks", str(args.gemini_chunks),
+            "--chunk-delay", str(args.gemini_chunk_delay),
+            "--error-rate", str(args.gemini_error_rate),
+        ]),
+    ]
+    os.environ.update({
+        "BOT_TOKEN": "123456:LOADTEST",
+        "TELEGRAM_API_URL": f"http://127.0.0.1:{args.telegram_port}",
+        "GEMINI_API_KEY": "loadtest",
+        "GEMINI_BASE_URL": f"http://127.0.0.1:{args.gemini_port}",
+        "DB_NAME": args.db_name,
+        "GEMINI_STREAMING": "false" if args.no_streaming else "true",
+    })
+    if not args.telegram_limits:
+        os.environ["OUTBOUND_GLOBAL_RATE"] = "1000000"
+
+    async def run() -> None:
+        await _wait_ready(args.telegram_port)
+        await _wait_ready(args.gemini_port)
+        await drive(args)
+
+    try:
+        asyncio.run(run())
+    finally:
+        for server in servers:
+            server.terminate()
+        for server in servers:
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
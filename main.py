@@ -1,35 +1,275 @@
+from typing import List, Optional, Tuple
 import asyncio
 import logging
+import signal
 
+from aiohttp import web
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.telegram import PRODUCTION, TelegramAPIServer
 from aiogram.enums import ParseMode
+from aiogram.fsm.storage.base import BaseStorage
 from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 
+from bot import instrumentation
 from bot.ai_handlers import router as ai_router
+from bot.conversation import conversations
 from bot.handlers import router as wellbeing_router
+from bot.keyboards import build_keyboards
+from bot.sequences import sequence_scheduler
+from bot.session import BotSession
+from bot.sharding import ProcessShardPool, ShardedDispatcher, report_queue_depths
 from config import settings
+from database.db import close_database, get_database
+from database.schema import bootstrap_schema
+from database.stats import ensure_rollups
+from database.write_queue import write_queue
+from database.storage import MongoStorage
+from services.gemini import close_gemini
+from services.user_settings import warm_up_profiles
+from utils.metrics import start_metrics_server
 
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+ROUTERS = (wellbeing_router, ai_router)
 
-async def main() -> None:
-    logging.basicConfig(level=logging.INFO)
+def build_storage() -> BaseStorage:
+    if settings.FSM_STORAGE == "memory":
+        return MemoryStorage()
+    return MongoStorage(get_database())
+
+
+def build_bot() -> Bot:
+    api = TelegramAPIServer.from_base(settings.TELEGRAM_API_URL) if settings.TELEGRAM_API_URL else PRODUCTION
+    return Bot(
+        token=settings.BOT_TOKEN,
+        session=BotSession(api=api),
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+    )
+
+
+async def setup_database() -> None:
+    await bootstrap_schema(get_database())
+
+
+def build_dispatcher(shard: bool = False) -> ShardedDispatcher:
+    """shard — процесс ProcessShardPool: разовые шаги запуска делает родитель."""
+    storage = build_storage()
+    dp = ShardedDispatcher(storage=storage)
+
+    for router in ROUTERS:
+        dp.include_router(router)
+    instrumentation.install(dp, ROUTERS)
+    dp.startup.register(setup_database)
+    if not shard:
+        dp.startup.register(ensure_rollups)
+    dp.startup.register(build_keyboards)
+    dp.startup.register(warm_up_profiles)
+    dp.startup.register(sequence_scheduler.start)
+    dp.shutdown.register(conversations.close)
+    dp.shutdown.register(close_gemini)
+    dp.shutdown.register(sequence_scheduler.close)
+    dp.shutdown.register(write_queue.close)
+    dp.shutdown.register(storage.close)
+    dp.shutdown.register(close_database)
+    return dp
+
+
+def check_settings() -> None:
     if not settings.BOT_TOKEN:
         raise RuntimeError("BOT_TOKEN орнатылмаған.")
     if not settings.GEMINI_API_KEY:
         raise RuntimeError("GEMINI_API_KEY орнатылмаған.")
+    if settings.BOT_MODE == "webhook" and not settings.WEBHOOK_URL:
+        raise RuntimeError("WEBHOOK_URL орнатылмаған.")
+    if settings.WEBHOOK_WORKERS > 1 and settings.FSM_STORAGE == "memory":
+        raise RuntimeError("Бірнеше воркер үшін FSM_STORAGE=mongo қажет.")
 
-    bot = Bot(
-        token=settings.BOT_TOKEN,
-        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+
+def start_reporters(bot: Bot, dp: ShardedDispatcher) -> List[asyncio.Task]:
+    return [
+        asyncio.create_task(report_queue_depths(dp.executor, settings.SHARD_REPORT_INTERVAL, "Update queues")),
+        asyncio.create_task(
+            report_queue_depths(bot.session.outbound, settings.SHARD_REPORT_INTERVAL, "Outbound queue depths")
+        ),
+    ]
+
+
+async def start_metrics(bot: Bot, dp: Dispatcher, port: Optional[int] = None) -> Optional[web.AppRunner]:
+    """GET /metrics на METRICS_HOST:port (по умолчанию METRICS_PORT); при METRICS_PORT=0 не запускается."""
+    if not settings.METRICS_PORT:
+        return None
+    instrumentation.register_gauges(bot, dp)
+    return await start_metrics_server(settings.METRICS_HOST, port or settings.METRICS_PORT)
+
+
+async def run_polling() -> None:
+    bot = build_bot()
+    dp = build_dispatcher()
+    reporters = start_reporters(bot, dp)
+    metrics = await start_metrics(bot, dp)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        for reporter in reporters:
+            reporter.cancel()
+        if metrics is not None:
+            await metrics.cleanup()
+
+
+def used_update_types() -> List[str]:
+    """То же, что dp.resolve_used_update_types(), но без сборки диспетчера с хранилищем FSM."""
+    return sorted({update for router in ROUTERS for update in router.resolve_used_update_types()})
+
+
+async def register_webhook(bot: Bot) -> None:
+    """Регистрирует webhook в Telegram один раз, до запуска воркеров."""
+    await bot.set_webhook(
+        url=f"{settings.WEBHOOK_URL.rstrip('/')}{settings.WEBHOOK_PATH}",
+        secret_token=settings.WEBHOOK_SECRET or None,
+        allowed_updates=used_update_types(),
     )
-    dp = Dispatcher(storage=MemoryStorage())
 
-    dp.include_router(wellbeing_router)
-    dp.include_router(ai_router)
 
-    await dp.start_polling(bot)
+async def register_webhook_once() -> None:
+    bot = build_bot()
+    try:
+        await register_webhook(bot)
+    finally:
+        await bot.session.close()
+
+
+async def prepare_shards() -> None:
+    """Разовые шаги перед запуском процессов-шардов: сводки /stats и регистрация webhook."""
+    try:
+        await ensure_rollups()
+    finally:
+        await close_database()
+    await register_webhook_once()
+
+
+async def serve_webhook(register: bool = False) -> None:
+    """
+    aiohttp-сервер для webhook. SimpleRequestHandler проверяет секретный
+    токен, сразу отвечает Telegram и обрабатывает апдейт в фоне.
+    """
+    bot = build_bot()
+    dp = build_dispatcher()
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=settings.WEBHOOK_SECRET or None,
+        handle_in_background=True,
+    ).register(app, path=settings.WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+    if register:
+        dp.startup.register(register_webhook)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, settings.WEBHOOK_HOST, settings.WEBHOOK_PORT)
+    await site.start()
+    reporters = start_reporters(bot, dp)
+    metrics = await start_metrics(bot, dp)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        for reporter in reporters:
+            reporter.cancel()
+        if metrics is not None:
+            await metrics.cleanup()
+        await runner.cleanup()
+
+
+def build_shard_app(index: int) -> Tuple[Bot, Dispatcher]:
+    """Bot и Dispatcher процесса-шарда; его /metrics — на METRICS_PORT + 1 + index."""
+    bot = build_bot()
+    dp = build_dispatcher(shard=True)
+    reporters: List[asyncio.Task] = []
+    metrics: List[web.AppRunner] = []
+
+    async def start_monitoring() -> None:
+        reporters.extend(start_reporters(bot, dp))
+        runner = await start_metrics(bot, dp, port=settings.METRICS_PORT + 1 + index)
+        if runner is not None:
+            metrics.append(runner)
+
+    async def stop_monitoring() -> None:
+        for reporter in reporters:
+            reporter.cancel()
+        for runner in metrics:
+            await runner.cleanup()
+
+    dp.startup.register(start_monitoring)
+    dp.shutdown.register(stop_monitoring)
+    return bot, dp
+
+
+async def serve_sharded_webhook() -> None:
+    """
+    Несколько процессов за одним портом: этот процесс принимает webhook,
+    проверяет секретный токен, сразу отвечает Telegram и передаёт апдейт в
+    процесс-шард по хешу пользователя. Апдейты одного пользователя всегда
+    попадают в один процесс и обрабатываются по порядку.
+
+    Метрики не сводятся в одном месте: этот процесс отдаёт /metrics пула
+    (очереди и перезапуски шардов) на METRICS_PORT, а шард номер i — свои
+    на METRICS_PORT + 1 + i.
+    """
+    pool = ProcessShardPool(build_shard_app, settings.WEBHOOK_WORKERS)
+    pool.start()
+
+    async def handle_update(request: web.Request) -> web.Response:
+        if settings.WEBHOOK_SECRET and request.headers.get(SECRET_HEADER) != settings.WEBHOOK_SECRET:
+            return web.Response(status=401)
+        await pool.submit(await request.json())
+        return web.Response()
+
+    app = web.Application()
+    app.router.add_post(settings.WEBHOOK_PATH, handle_update)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, settings.WEBHOOK_HOST, settings.WEBHOOK_PORT)
+    await site.start()
+
+    # SIGUSR1 / SIGUSR2 добавляют или убирают один процесс-шард.
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGUSR1, lambda: asyncio.create_task(pool.resize(pool.size + 1)))
+    loop.add_signal_handler(signal.SIGUSR2, lambda: asyncio.create_task(pool.resize(pool.size - 1)))
+    reporter = asyncio.create_task(report_queue_depths(pool, settings.SHARD_REPORT_INTERVAL))
+    metrics = None
+    if settings.METRICS_PORT:
+        instrumentation.register_pool_gauges(pool)
+        metrics = await start_metrics_server(settings.METRICS_HOST, settings.METRICS_PORT)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        reporter.cancel()
+        if metrics is not None:
+            await metrics.cleanup()
+        await runner.cleanup()
+        await pool.stop()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    check_settings()
+
+    if settings.BOT_MODE != "webhook":
+        asyncio.run(run_polling())
+        return
+
+    if settings.WEBHOOK_WORKERS > 1:
+        asyncio.run(prepare_shards())
+        try:
+            asyncio.run(serve_sharded_webhook())
+        except KeyboardInterrupt:
+            pass
+    else:
+        asyncio.run(serve_webhook(register=True))
 
 
 if __name__ == "__main__":
     print("Bot іске қосылуда...")
-    asyncio.run(main())
+    main()
@@ -0,0 +1,137 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+import hashlib
+import logging
+import re
+import time
+import unicodedata
+
+from config import get_settings
+from database.db import get_collection
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCT = re.compile(r"[\s.!?…,;:]+$")
+
+
+def normalize_text(text: str) -> str:
+    """Приводит ввод к общей форме: "I can't sleep!!" и "i can't  sleep" совпадают."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = _WHITESPACE.sub(" ", text).strip()
+    return _TRAILING_PUNCT.sub("", text)
+
+
+def make_key(language: str, command: str, template: str, user_text: str, system_prompt: str, model: str) -> str:
+    raw = "\x1f".join([language, command, template, normalize_text(user_text), system_prompt, model])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LocalLRU:
+    """LRU в памяти процесса с TTL и лимитом по числу записей и размеру."""
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: str) -> Optional[str]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            self._pop(key)
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        if key in self._data:
+            self._pop(key)
+        self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+        self._bytes += size
+        while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+            self._pop(next(iter(self._data)))
+
+    def _pop(self, key: str) -> None:
+        _, value = self._data.pop(key)
+        self._bytes -= len(value.encode("utf-8"))
+
+
+class ResponseCache:
+    def __init__(self) -> None:
+        self.local = LocalLRU(
+            max_entries=settings.AI_CACHE_MAX_ENTRIES,
+            max_bytes=settings.AI_CACHE_MAX_BYTES,
+            ttl=settings.AI_CACHE_TTL,
+        )
+        self.stats: Dict[str, int] = {"local_hits": 0, "shared_hits": 0, "misses": 0, "stores": 0}
+
+    @property
+    def collection(self):
+        return get_collection("ai_response_cache") if settings.AI_CACHE_SHARED else None
+
+    def enabled_for(self, command: str) -> bool:
+        return settings.AI_CACHE_ENABLED and command not in settings.AI_CACHE_DISABLED_COMMANDS
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self.local.get(key)
+        if value is not None:
+            self.stats["local_hits"] += 1
+            return value
+        collection = self.collection
+        if collection is not None:
+            try:
+                record = await collection.find_one(
+                    {"_id": key, "expires_at": {"$gt": datetime.utcnow()}}
+                )
+            except Exception:
+                logger.exception("AI cache: shared tier read failed")
+                record = None
+            if record:
+                self.stats["shared_hits"] += 1
+                remaining = (record["expires_at"] - datetime.utcnow()).total_seconds()
+                self.local.set(key, record["reply"], ttl=max(remaining, 1.0))
+                return record["reply"]
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: str) -> None:
+        self.local.set(key, value)
+        self.stats["stores"] += 1
+        collection = self.collection
+        if collection is not None:
+            try:
+                await collection.update_one(
+                    {"_id": key},
+                    {"$set": {
+                        "reply": value,
+                        "expires_at": datetime.utcnow() + timedelta(seconds=settings.AI_CACHE_TTL),
+                    }},
+                    upsert=True,
+                )
+            except Exception:
+                logger.exception("AI cache: shared tier write failed")
+
+    def hit_rate(self) -> float:
+        hits = self.stats["local_hits"] + self.stats["shared_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,112 @@
+from typing import Dict, List, Optional
+import logging
+import math
+
+from config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Служебные токены на каждую реплику (роль, разделители).
+TURN_OVERHEAD = 4
+# Метка в конце сжатой старой реплики.
+COMPRESSED_MARK = " …"
+
+Turn = Dict[str, object]
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Быстрая локальная оценка: для кириллицы и латиницы токенизатор Gemini
+    выдаёт примерно токен на 3-4 символа, берём 3 — с запасом.
+    """
+    return math.ceil(len(text) / 3) + TURN_OVERHEAD
+
+
+async def count_tokens_exact(text: str, model: str) -> Optional[int]:
+    """Точный подсчёт через API модели; None, если запрос не удался."""
+    from services.gemini_models import get_client
+
+    try:
+        response = await get_client().aio.models.count_tokens(model=model, contents=text)
+    except Exception:
+        logger.exception("count_tokens failed, falling back to estimate")
+        return None
+    return (response.total_tokens or 0) + TURN_OVERHEAD
+
+
+def turn_tokens(turn: Turn) -> int:
+    tokens = turn.get("tokens")
+    if isinstance(tokens, int):
+        return tokens
+    # Старые записи истории без сохранённого счётчика.
+    tokens = estimate_tokens(str(turn.get("text", "")))
+    turn["tokens"] = tokens
+    return tokens
+
+
+async def make_turn(role: str, text: str, model: str) -> Turn:
+    tokens = None
+    if settings.HISTORY_EXACT_TOKENS:
+        tokens = await count_tokens_exact(text, model)
+    return {"role": role, "text": text, "tokens": tokens or estimate_tokens(text)}
+
+
+def token_budget(model: str) -> int:
+    return settings.HISTORY_TOKEN_BUDGETS.get(model, settings.HISTORY_TOKEN_BUDGET)
+
+
+def _compress(turn: Turn) -> Turn:
+    text = str(turn.get("text", ""))
+    limit = settings.HISTORY_COMPRESSED_CHARS
+    if len(text) <= limit:
+        return turn
+    short = text[:limit].rstrip() + COMPRESSED_MARK
+    return {"role": turn.get("role"), "text": short, "tokens": estimate_tokens(short)}
+
+
+def fit_history(history: List[Turn], budget: int) -> List[Turn]:
+    """
+    Оставляет историю в пределах budget токенов: сначала сжимает старые
+    длинные реплики (все, кроме последней пары), затем отбрасывает самые
+    старые пары реплик.
+    """
+    turns = list(history)
+    total = sum(turn_tokens(turn) for turn in turns)
+    if total <= budget:
+        return turns
+
+    for index in range(max(len(turns) - 2, 0)):
+        if total <= budget:
+            break
+        compressed = _compress(turns[index])
+        total -= turn_tokens(turns[index]) - turn_tokens(compressed)
+        turns[index] = compressed
+
+    start = 0
+    while total > budget and start < len(turns):
+        total -= turn_tokens(turns[start])
+        start += 1
+    # История не должна начинаться с ответа модели.
+    while start < len(turns) and turns[start].get("role") != "user":
+        total -= turn_tokens(turns[start])
+        start += 1
+    return turns[start:]
+
+
+def history_for_prompt(history: List[Turn], new_prompt: str, system_prompt: str, model: str) -> List[Turn]:
+    """Урезает историю так, чтобы системный промпт, история и новое сообщение уложились в бюджет модели."""
+    budget = token_budget(model)
+    reserved = estimate_tokens(system_prompt) + estimate_tokens(new_prompt)
+    fitted = fit_history(history, max(budget - reserved, 0))
+    history_tokens = sum(turn_tokens(turn) for turn in fitted)
+    logger.info(
+        "Prompt size: model=%s tokens~%d (history %d in %d/%d turns, reserved %d), budget %d",
+        model, history_tokens + reserved, history_tokens, len(fitted), len(history), reserved, budget,
+    )
+    return fitted
+
+
+def trim_history(history: List[Turn], model: str) -> List[Turn]:
+    """Ограничивает сохраняемую в FSM историю бюджетом модели."""
+    return fit_history(history, token_budget(model))
@@ -0,0 +1,123 @@
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import logging
+import time
+
+from config import get_settings
+
+if TYPE_CHECKING:
+    from google.genai import Client
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class _Handle:
+    __slots__ = ("name", "expires_at")
+
+    def __init__(self, name: str, expires_at: float) -> None:
+        self.name = name
+        self.expires_at = expires_at
+
+
+class SystemPromptCache:
+    """
+    Явный context cache Gemini для статического префикса (системного промпта).
+
+    Для каждой пары (модель, системный промпт) создаётся один CachedContent,
+    его TTL продлевается в фоне, когда до истечения остаётся меньше
+    GEMINI_CONTEXT_CACHE_REFRESH секунд. Если создать кеш нельзя (например,
+    промпт короче минимального размера кеша), ключ запоминается на
+    GEMINI_CONTEXT_CACHE_RETRY секунд и запросы идут с обычным
+    system_instruction.
+    """
+
+    def __init__(self, client_factory: Callable[[], "Client"]) -> None:
+        self._client_factory = client_factory
+        self._handles: Dict[Tuple[str, str], _Handle] = {}
+        self._failed_until: Dict[Tuple[str, str], float] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._refreshing: set = set()
+
+    @property
+    def client(self) -> "Client":
+        return self._client_factory()
+
+    @staticmethod
+    def _key(model: str, system_prompt: str) -> Tuple[str, str]:
+        return model, hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+
+    async def get(self, model: str, system_prompt: str) -> Optional[str]:
+        if not settings.GEMINI_CONTEXT_CACHE or not system_prompt:
+            return None
+        key = self._key(model, system_prompt)
+        now = time.monotonic()
+        handle = self._handles.get(key)
+        if handle is not None and handle.expires_at > now:
+            if handle.expires_at - now < settings.GEMINI_CONTEXT_CACHE_REFRESH and key not in self._refreshing:
+                self._refreshing.add(key)
+                asyncio.create_task(self._refresh(key, handle))
+            return handle.name
+        if self._failed_until.get(key, 0) > now:
+            return None
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            handle = self._handles.get(key)
+            if handle is not None and handle.expires_at > time.monotonic():
+                return handle.name
+            if self._failed_until.get(key, 0) > time.monotonic():
+                return None
+            return await self._create(key, model, system_prompt)
+
+    async def _create(self, key: Tuple[str, str], model: str, system_prompt: str) -> Optional[str]:
+        from google.genai import types
+
+        ttl = settings.GEMINI_CONTEXT_CACHE_TTL
+        try:
+            cached = await self.client.aio.caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(
+                    system_instruction=system_prompt,
+                    display_name=f"system-prompt-{key[1][:12]}",
+                    ttl=f"{ttl}s",
+                ),
+            )
+        except Exception as e:
+            logger.warning("Context cache for %s is unavailable, using system_instruction: %s", model, e)
+            self._failed_until[key] = time.monotonic() + settings.GEMINI_CONTEXT_CACHE_RETRY
+            return None
+        self._handles[key] = _Handle(cached.name, time.monotonic() + ttl)
+        logger.info("Context cache %s created for %s", cached.name, model)
+        return cached.name
+
+    async def _refresh(self, key: Tuple[str, str], handle: _Handle) -> None:
+        from google.genai import types
+
+        ttl = settings.GEMINI_CONTEXT_CACHE_TTL
+        try:
+            await self.client.aio.caches.update(
+                name=handle.name,
+                config=types.UpdateCachedContentConfig(ttl=f"{ttl}s"),
+            )
+            handle.expires_at = time.monotonic() + ttl
+        except Exception as e:
+            # Кеш мог быть удалён на стороне API — при следующем запросе создадим новый.
+            logger.warning("Context cache %s refresh failed: %s", handle.name, e)
+            self._handles.pop(key, None)
+        finally:
+            self._refreshing.discard(key)
+
+    def invalidate(self, name: str) -> None:
+        for key, handle in list(self._handles.items()):
+            if handle.name == name:
+                del self._handles[key]
+
+    async def close(self) -> None:
+        handles, self._handles = self._handles, {}
+        for handle in handles.values():
+            try:
+                await self.client.aio.caches.delete(name=handle.name)
+            except Exception as e:
+                logger.warning("Context cache %s delete failed: %s", handle.name, e)
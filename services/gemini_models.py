@@ -1,7 +1,19 @@
-from google.genai import Client
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
 from config import settings
 
-client = Client(api_key=settings.GEMINI_API_KEY)
+if TYPE_CHECKING:
+    from google.genai import Client
+
+logger = logging.getLogger(__name__)
 
 GEMINI_MODELS = {
     "flash_v1_5": "gemini-1.5-flash-latest",
@@ -14,13 +26,68 @@ GEMINI_MODELS = {
 DEFAULT_MODEL = GEMINI_MODELS["flash_v1_5"]
 
 
-def list_available_models() -> list[str]:
+@lru_cache()
+def get_client() -> "Client":
+    """Один клиент Gemini на процесс; SDK импортируется и клиент создаётся при первом запросе."""
+    from google.genai import Client, types
+
+    http_options = types.HttpOptions(base_url=settings.GEMINI_BASE_URL) if settings.GEMINI_BASE_URL else None
+    return Client(api_key=settings.GEMINI_API_KEY, http_options=http_options)
+
+
+async def close_client() -> None:
+    if not get_client.cache_info().currsize:
+        return
+    aclose = getattr(get_client().aio, "aclose", None)
+    if aclose is not None:
+        await aclose()
+    get_client.cache_clear()
+
+
+def _key_fingerprint() -> str:
+    # Список моделей зависит от ключа: при смене ключа кеш на диске не используется.
+    return hashlib.sha256(settings.GEMINI_API_KEY.encode("utf-8")).hexdigest()[:16]
+
+
+def _read_models_cache(path: Path) -> Optional[List[str]]:
+    try:
+        cached = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if cached.get("key") != _key_fingerprint():
+        return None
+    if time.time() - cached.get("fetched_at", 0) > settings.GEMINI_MODELS_CACHE_TTL:
+        return None
+    return cached.get("models")
+
+
+def _write_models_cache(path: Path, models: List[str]) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            json.dump({"key": _key_fingerprint(), "fetched_at": time.time(), "models": models}, file)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("Cannot write models cache %s: %s", path, e)
+
+
+def list_available_models(refresh: bool = False) -> List[str]:
+    """Список моделей, доступных ключу. Кешируется на диске на GEMINI_MODELS_CACHE_TTL секунд."""
+    path = Path(settings.GEMINI_MODELS_CACHE_PATH)
+    if not refresh:
+        models = _read_models_cache(path)
+        if models is not None:
+            return models
     try:
-        models = client.models.list()
-        return [m.name for m in models]
+        models = [m.name for m in get_client().models.list()]
     except Exception as e:
         return [f"Қате: {e}"]
+    _write_models_cache(path, models)
+    return models
 
 
 def get_model(name: str) -> str:
+    if name in GEMINI_MODELS.values():
+        return name
     return GEMINI_MODELS.get(name, DEFAULT_MODEL)
@@ -0,0 +1,214 @@
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, NamedTuple, Optional, Tuple, TypeVar
+import asyncio
+import logging
+import time
+
+from config import get_settings
+from services.gemini_models import get_model
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+SMALL, LARGE = "small", "large"
+
+
+class ModelStats:
+    """Скользящее окно последних запросов к модели для одного размера промпта."""
+
+    def __init__(self, window: int) -> None:
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)  # True — модель ответила
+
+    def record(self, latency: Optional[float], ok: Optional[bool]) -> None:
+        if latency is not None:
+            self.latencies.append(latency)
+        if ok is not None:
+            self.outcomes.append(ok)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """None, пока замеров меньше GEMINI_ROUTER_MIN_SAMPLES."""
+        if len(self.latencies) < settings.GEMINI_ROUTER_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def healthy(self) -> bool:
+        return (
+            len(self.outcomes) < settings.GEMINI_ROUTER_MIN_SAMPLES
+            or self.error_rate() <= settings.GEMINI_ROUTER_MAX_ERROR_RATE
+        )
+
+
+class Route(NamedTuple):
+    model: str
+    bucket: str
+    hedge_model: Optional[str]
+    hedge_after: Optional[float]  # секунд до запасного запроса; None — без него
+
+
+class ModelRouter:
+    """
+    Выбирает модель Gemini для запроса и страхует медленные ответы.
+
+    Кандидаты — GEMINI_ROUTER_MODELS; первой пробуется модель команды из
+    GEMINI_COMMAND_MODELS (по умолчанию GEMINI_MODEL). По каждой модели и
+    размеру промпта (до и после GEMINI_LARGE_PROMPT_TOKENS) хранится окно
+    последних задержек и ошибок. Выбирается первая здоровая модель, у
+    которой GEMINI_HEDGE_PERCENTILE задержки укладывается в бюджет команды
+    (GEMINI_LATENCY_BUDGETS, иначе GEMINI_LATENCY_BUDGET), а если такой нет —
+    самая быстрая. Если ответ не пришёл за этот перцентиль, отправляется
+    второй запрос в самую быструю из остальных здоровых моделей, и берётся
+    ответ, пришедший первым. В ту же модель запасной запрос не идёт: она и
+    так медленная, а второй запрос только добавил бы ей нагрузки. Запасных
+    запросов не больше GEMINI_HEDGE_MAX_SHARE от последних
+    GEMINI_ROUTER_WINDOW запросов, и каждый занимает слот общего семафора.
+    """
+
+    def __init__(self) -> None:
+        self._stats: Dict[Tuple[str, str], ModelStats] = {}
+        self.counters: Dict[str, int] = {
+            "requests": 0, "rerouted": 0, "hedged": 0, "hedge_wins": 0, "hedge_skipped": 0,
+        }
+        self._hedges: Deque[bool] = deque(maxlen=settings.GEMINI_ROUTER_WINDOW)  # был ли запасной запрос
+
+    def stats(self, model: str, bucket: str) -> ModelStats:
+        stats = self._stats.get((model, bucket))
+        if stats is None:
+            stats = self._stats[(model, bucket)] = ModelStats(settings.GEMINI_ROUTER_WINDOW)
+        return stats
+
+    def candidates(self, preferred: str) -> List[str]:
+        models = [preferred]
+        for name in settings.GEMINI_ROUTER_MODELS:
+            model = get_model(name)
+            if model not in models:
+                models.append(model)
+        return models
+
+    def choose(self, command: str, prompt_tokens: int) -> Route:
+        self.counters["requests"] += 1
+        bucket = LARGE if prompt_tokens > settings.GEMINI_LARGE_PROMPT_TOKENS else SMALL
+        budget = settings.GEMINI_LATENCY_BUDGETS.get(command, settings.GEMINI_LATENCY_BUDGET)
+        preferred = get_model(settings.GEMINI_COMMAND_MODELS.get(command, settings.GEMINI_MODEL))
+        models = self.candidates(preferred)
+        healthy = [model for model in models if self.stats(model, bucket).healthy()] or models
+
+        def tail(model: str) -> Optional[float]:
+            return self.stats(model, bucket).percentile(settings.GEMINI_HEDGE_PERCENTILE)
+
+        model = next((model for model in healthy if (tail(model) or 0.0) <= budget), None)
+        if model is None:
+            model = min(healthy, key=tail)  # все кандидаты медленнее бюджета, у всех есть замеры
+        if model != preferred:
+            self.counters["rerouted"] += 1
+
+        hedge_model, hedge_after = None, None
+        threshold = tail(model)
+        others = [other for other in healthy if other != model]
+        if settings.GEMINI_HEDGE and threshold is not None and others:
+            fastest = min(others, key=lambda other: self._median(other, bucket))
+            median = self.stats(fastest, bucket).percentile(0.5)
+            # Модель без замеров пробуем; заведомо не более быструю — нет.
+            if median is None or median < threshold:
+                hedge_model, hedge_after = fastest, min(threshold, budget)
+        return Route(model, bucket, hedge_model, hedge_after)
+
+    def _median(self, model: str, bucket: str) -> float:
+        median = self.stats(model, bucket).percentile(0.5)
+        return float("inf") if median is None else median
+
+    async def _timed(self, model: str, bucket: str, attempt: Callable[[str], Awaitable[T]]) -> T:
+        stats = self.stats(model, bucket)
+        started = time.monotonic()
+        try:
+            result = await attempt(model)
+        except asyncio.CancelledError:
+            # Отменённый (проигравший) запрос был как минимум настолько медленным.
+            stats.record(time.monotonic() - started, None)
+            raise
+        except Exception:
+            stats.record(None, False)
+            raise
+        stats.record(time.monotonic() - started, True)
+        return result
+
+    def _may_hedge(self, slots: Optional[asyncio.Semaphore]) -> bool:
+        if slots is not None and slots.locked():
+            return False
+        return sum(self._hedges) < settings.GEMINI_HEDGE_MAX_SHARE * max(len(self._hedges), 1)
+
+    async def run(
+        self,
+        route: Route,
+        attempt: Callable[[str], Awaitable[T]],
+        discard: Optional[Callable[[T], Awaitable[Any]]] = None,
+        hedge_slots: Optional[asyncio.Semaphore] = None,
+    ) -> T:
+        """
+        Выполняет attempt(model) по маршруту, с запасным запросом после
+        route.hedge_after. Запасной запрос занимает свой слот hedge_slots и не
+        отправляется, если свободных слотов нет. Проигравший запрос
+        отменяется; если он успел завершиться, его результат передаётся в
+        discard.
+        """
+        primary = asyncio.create_task(self._timed(route.model, route.bucket, attempt))
+        tasks = [primary]
+        winner: Optional[asyncio.Task] = None
+        hedged = False
+        try:
+            if route.hedge_after is not None:
+                done, _ = await asyncio.wait(tasks, timeout=route.hedge_after)
+                if not done and not self._may_hedge(hedge_slots):
+                    self.counters["hedge_skipped"] += 1
+                elif not done:
+                    hedged = True
+                    self.counters["hedged"] += 1
+                    hedge = asyncio.create_task(self._timed(route.hedge_model, route.bucket, attempt))
+                    if hedge_slots is not None:
+                        await hedge_slots.acquire()  # слот свободен — не ждёт
+                        # Через callback: задачу могут отменить ещё до её первого шага.
+                        hedge.add_done_callback(lambda _: hedge_slots.release())
+                    tasks.append(hedge)
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=tasks.index):
+                    if task.exception() is None:
+                        winner = task
+                        if task is not primary:
+                            self.counters["hedge_wins"] += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            self._hedges.append(hedged)
+            for task in tasks:
+                if task is winner:
+                    continue
+                if not task.done():
+                    task.cancel()
+                elif discard is not None and not task.cancelled() and task.exception() is None:
+                    asyncio.create_task(discard(task.result()))
+
+    def metrics(self) -> Dict[str, Any]:
+        models = {}
+        for (model, bucket), stats in self._stats.items():
+            models[f"{model}/{bucket}"] = {
+                "samples": len(stats.latencies),
+                "p50": stats.percentile(0.5),
+                "p95": stats.percentile(0.95),
+                "error_rate": stats.error_rate(),
+            }
+        return {"counters": dict(self.counters), "models": models}
+
+
+router = ModelRouter()
@@ -0,0 +1,116 @@
+from typing import Awaitable, Callable, Dict, TypeVar
+import asyncio
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Вызов отклонён без запроса: предохранитель разомкнут."""
+
+
+class CircuitBreaker:
+    """
+    Предохранитель для внешнего сервиса.
+
+    После threshold неудач подряд он размыкается и cooldown секунд
+    отклоняет вызовы сразу (CircuitOpenError). Затем пропускает один
+    пробный вызов: успех замыкает его, неудача снова размыкает. Неудачей
+    считается только исключение, для которого is_failure(error) истинно, —
+    ошибки в самом запросе (например, 400) о здоровье сервиса не говорят.
+    """
+
+    def __init__(
+        self, name: str, threshold: int, cooldown: float, is_failure: Callable[[BaseException], bool]
+    ) -> None:
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.is_failure = is_failure
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self.stats: Dict[str, int] = {"rejected": 0, "opened": 0}
+
+    def allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+            self.state = HALF_OPEN
+            self._probing = False
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        self.stats["rejected"] += 1
+        return False
+
+    def success(self) -> None:
+        if self.state != CLOSED:
+            logger.info("Circuit %s closed", self.name)
+        self.state = CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.threshold):
+            if self.state == CLOSED:
+                logger.warning("Circuit %s opened after %d failures", self.name, self.failures)
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            self.stats["opened"] += 1
+
+    async def call(self, func: Callable[[], Awaitable[T]]) -> T:
+        if not self.allow():
+            raise CircuitOpenError(self.name)
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            self._probing = False  # пробный вызов не завершился — следующий попробует снова
+            raise
+        except Exception as e:
+            if self.is_failure(e):
+                self.failure()
+            else:
+                self.success()
+            raise
+        self.success()
+        return result
+
+
+async def retry(
+    func: Callable[[], Awaitable[T]],
+    *,
+    retries: int,
+    base: float,
+    cap: float,
+    deadline: float,
+    retryable: Callable[[BaseException], bool],
+) -> T:
+    """
+    Повторяет func при retryable-ошибках не больше retries раз. Пауза —
+    "full jitter": случайная от 0 до min(cap, base * 2**попытка), чтобы
+    клиенты после общего сбоя не возвращались одновременно. Повтор не
+    начинается, если пауза выходит за deadline (по time.monotonic()).
+    """
+    attempt = 0
+    while True:
+        try:
+            return await func()
+        except Exception as e:
+            if attempt >= retries or not retryable(e):
+                raise
+            delay = random.uniform(0, min(cap, base * 2 ** attempt))
+            if time.monotonic() + delay >= deadline:
+                raise
+            attempt += 1
+            logger.info("Retrying after %r in %.2fs (attempt %d of %d)", e, delay, attempt, retries)
+            await asyncio.sleep(delay)
@@ -0,0 +1,68 @@
+from typing import Awaitable, Callable, Dict, TypeVar
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Объединяет одновременные одинаковые вызовы в один.
+
+    Первый вызов с ключом запускает работу отдельной задачей, остальные с тем
+    же ключом ждут её результат (или исключение). Каждый ждёт через
+    asyncio.shield, поэтому отмена одного ожидающего не прерывает общую
+    задачу; её отменяют, только когда не осталось ни одного ожидающего.
+    Результат не запоминается: после завершения следующий вызов снова идёт
+    наверх.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[str, _Call] = {}
+        # leaders — вызовов ушло наверх, coalesced — присоединились к идущему,
+        # cancelled — ожидающих отменено, abandoned — общих вызовов отменено без ожидающих.
+        self.stats: Dict[str, int] = {"leaders": 0, "coalesced": 0, "cancelled": 0, "abandoned": 0}
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = _Call(asyncio.create_task(func()))
+            call.task.add_done_callback(lambda task: self._finish(key, call))
+            self.stats["leaders"] += 1
+        else:
+            self.stats["coalesced"] += 1
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if not call.task.done():
+                self.stats["cancelled"] += 1
+            raise
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Ответ больше никому не нужен. Новые вызовы с этим ключом
+                # не должны присоединиться к отменяемой задаче.
+                self.stats["abandoned"] += 1
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+                call.task.cancel()
+
+    def _finish(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.task.cancelled() and call.task.exception() is not None and call.waiters == 0:
+            logger.warning("Single-flight call %s failed without waiters: %r", key[:12], call.task.exception())
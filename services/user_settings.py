@@ -1,12 +1,87 @@
-from database.db import database
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+import logging
+import time
+
+from config import get_settings
+from database.db import get_collection
 from utils.texts import DEFAULT_LANGUAGE, SUPPORTED_LANGUAGES
 
-user_settings_collection = database["user_settings"]
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+Profile = Dict[str, Any]
+
+
+class UserProfileCache:
+    """
+    Кеш профилей пользователей (язык и другие настройки) в памяти процесса:
+    LRU с ограничением размера, TTL и негативным кешированием — отсутствие
+    записи в базе тоже запоминается, но на более короткий срок.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, negative_ttl: float) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._data: "OrderedDict[int, Tuple[float, Optional[Profile]]]" = OrderedDict()
+        self.stats: Dict[str, int] = {"hits": 0, "negative_hits": 0, "misses": 0, "warmed": 0}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def lookup(self, user_id: int) -> Tuple[bool, Optional[Profile]]:
+        item = self._data.get(user_id)
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                del self._data[user_id]
+            self.stats["misses"] += 1
+            return False, None
+        self._data.move_to_end(user_id)
+        profile = item[1]
+        self.stats["hits" if profile is not None else "negative_hits"] += 1
+        return True, profile
+
+    def store(self, user_id: int, profile: Optional[Profile]) -> None:
+        ttl = self.ttl if profile is not None else self.negative_ttl
+        self._data[user_id] = (time.monotonic() + ttl, profile)
+        self._data.move_to_end(user_id)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def hit_rate(self) -> float:
+        hits = self.stats["hits"] + self.stats["negative_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+
+profile_cache = UserProfileCache(
+    max_entries=settings.PROFILE_CACHE_MAX_ENTRIES,
+    ttl=settings.PROFILE_CACHE_TTL,
+    negative_ttl=settings.PROFILE_CACHE_NEGATIVE_TTL,
+)
+
+
+def _profile(record: Optional[dict]) -> Optional[Profile]:
+    if not record:
+        return None
+    return {key: value for key, value in record.items() if key not in ("_id", "user_id")}
+
+
+async def get_user_profile(user_id: int) -> Profile:
+    found, profile = profile_cache.lookup(user_id)
+    if not found:
+        record = await get_collection("user_settings").find_one({"user_id": user_id})
+        profile = _profile(record)
+        profile_cache.store(user_id, profile)
+    return dict(profile or {})
 
 
 async def get_user_language(user_id: int) -> str:
-    record = await user_settings_collection.find_one({"user_id": user_id})
-    language = record.get("language") if record else None
+    profile = await get_user_profile(user_id)
+    language = profile.get("language")
     if language in SUPPORTED_LANGUAGES:
         return language
     return DEFAULT_LANGUAGE
@@ -15,6 +90,31 @@ async def get_user_language(user_id: int) -> str:
 async def set_user_language(user_id: int, language: str) -> None:
     if language not in SUPPORTED_LANGUAGES:
         language = DEFAULT_LANGUAGE
-    await user_settings_collection.update_one(
+    await get_collection("user_settings").update_one(
         {"user_id": user_id}, {"$set": {"language": language}}, upsert=True
     )
+    found, profile = profile_cache.lookup(user_id)
+    profile = dict(profile or {}) if found else {}
+    profile["language"] = language
+    profile_cache.store(user_id, profile)
+
+
+async def warm_up_profiles() -> None:
+    """Загружает в кеш профили пользователей, отмечавшихся за последние PROFILE_WARMUP_DAYS дней."""
+    since = datetime.utcnow() - timedelta(days=settings.PROFILE_WARMUP_DAYS)
+    try:
+        user_ids = await get_collection("checkins").distinct("user_id", {"date": {"$gte": since}})
+        user_ids = user_ids[: settings.PROFILE_CACHE_MAX_ENTRIES]
+        found = set()
+        cursor = get_collection("user_settings").find({"user_id": {"$in": user_ids}})
+        async for record in cursor:
+            profile_cache.store(record["user_id"], _profile(record))
+            found.add(record["user_id"])
+        for user_id in user_ids:
+            if user_id not in found:
+                profile_cache.store(user_id, None)
+    except Exception:
+        logger.exception("Profile cache warm-up failed")
+        return
+    profile_cache.stats["warmed"] += len(user_ids)
+    logger.info("Profile cache warmed with %d users", len(user_ids))
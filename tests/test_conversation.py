@@ -0,0 +1,40 @@
+import asyncio
+from types import SimpleNamespace
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from bot import handlers
+from bot.conversation import begin_chat_session
+from bot.states import AppStates
+
+
+def test_reply_from_an_old_chat_session_does_not_restore_its_history(monkeypatch):
+    async def run():
+        state = FSMContext(MemoryStorage(), StorageKey(bot_id=1, chat_id=1, user_id=1))
+        await state.set_state(AppStates.chat)
+        await begin_chat_session(state)
+        await state.update_data(chat_history=[{"role": "user", "text": "старый разговор", "tokens": 3}])
+
+        async def generate_gemini(**kwargs):
+            # Пока модель отвечает, пользователь нажимает /start_chat.
+            await state.clear()
+            await state.set_state(AppStates.chat)
+            await begin_chat_session(state)
+            return "ответ"
+
+        async def answer(text, **kwargs):
+            pass
+
+        async def typing(**kwargs):
+            pass
+
+        monkeypatch.setattr(handlers.settings, "GEMINI_STREAMING", False)
+        monkeypatch.setattr(handlers, "generate_gemini", generate_gemini)
+        message = SimpleNamespace(chat=SimpleNamespace(id=1), bot=SimpleNamespace(send_chat_action=typing), answer=answer)
+        await handlers.reply_chat([SimpleNamespace(text="привет", **vars(message))], state, "ru")
+        return await state.get_data()
+
+    data = asyncio.run(run())
+    assert "chat_history" not in data
@@ -0,0 +1,50 @@
+import asyncio
+from types import SimpleNamespace
+
+from google.genai import errors
+
+from services import gemini
+
+
+class _Stream:
+    """Поток как у google-genai: запрос уходит только на первом __anext__."""
+
+    def __init__(self, config, chunks):
+        self.config = config
+        self._chunks = iter(chunks)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.config.cached_content is not None:
+            raise errors.ClientError(404, {"error": {"code": 404, "message": "cache not found", "status": "NOT_FOUND"}})
+        try:
+            return SimpleNamespace(text=next(self._chunks))
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def test_stream_recovers_from_stale_context_cache(monkeypatch):
+    configs = []
+
+    async def generate_content_stream(model, contents, config):
+        configs.append(config)
+        return _Stream(config, ["Сәлем", "!"])
+
+    client = SimpleNamespace(aio=SimpleNamespace(models=SimpleNamespace(generate_content_stream=generate_content_stream)))
+    invalidated = []
+
+    async def cached(model, system_prompt):
+        return "cachedContents/expired"
+
+    monkeypatch.setattr(gemini, "get_client", lambda: client)
+    monkeypatch.setattr(gemini.system_prompt_cache, "get", cached)
+    monkeypatch.setattr(gemini.system_prompt_cache, "invalidate", invalidated.append)
+
+    stream, first = asyncio.run(gemini._open_stream(gemini.MODEL, [], "привет", "system"))
+
+    assert first == "Сәлем"
+    assert invalidated == ["cachedContents/expired"]
+    assert configs[-1].cached_content is None
+    assert configs[-1].system_instruction == "system"
@@ -0,0 +1,33 @@
+import json
+
+import pytest
+from aiogram.types import InlineKeyboardMarkup, ReplyKeyboardMarkup
+from pydantic import ValidationError
+
+from bot.keyboards import KeyboardRegistry, _build_main_menu, _build_mood
+
+
+def test_registry_markups_are_read_only():
+    registry = KeyboardRegistry()
+    menu = registry.get("main_menu", "ru")
+    mood = registry.get("mood", "ru")
+
+    assert isinstance(menu, ReplyKeyboardMarkup)
+    assert isinstance(mood, InlineKeyboardMarkup)
+    with pytest.raises(ValidationError):
+        menu.resize_keyboard = False
+    with pytest.raises(ValidationError):
+        mood.inline_keyboard[0][0].text = "x"
+    with pytest.raises(TypeError):
+        mood.inline_keyboard.append([])
+    with pytest.raises(TypeError):
+        menu.keyboard[0].pop()
+
+
+def test_registry_json_matches_fresh_markup():
+    registry = KeyboardRegistry()
+    for name, build in (("main_menu", _build_main_menu), ("mood", _build_mood)):
+        markup = registry.get(name, "ru")
+        fresh = build("ru").model_dump(exclude_none=True, mode="json")
+        assert json.loads(registry.prepared(markup)) == fresh
+        assert markup.model_dump(exclude_none=True, mode="json") == fresh
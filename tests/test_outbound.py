@@ -0,0 +1,38 @@
+import asyncio
+
+from aiogram.exceptions import TelegramRetryAfter
+
+from bot import outbound
+from bot.outbound import OutboundQueue
+
+
+def test_retry_after_releases_the_chat_lock_and_blocks_the_global_bucket():
+    async def run():
+        queue = OutboundQueue()
+        calls = []
+
+        async def request():
+            calls.append(True)
+            if len(calls) == 1:
+                raise TelegramRetryAfter(method=None, message="Too Many Requests", retry_after=1)
+            return "ok"
+
+        sending = asyncio.create_task(queue.send(1, request))
+        await asyncio.sleep(0.1)
+        chat = queue._chat(1)
+        assert not chat.lock.locked()
+        # Чат до этого молчал — 429 относится ко всему боту.
+        assert queue.global_bucket.delay() > 0.5
+        assert await sending == "ok"
+        return queue.retries
+
+    assert asyncio.run(run()) == 1
+
+
+def test_global_share_follows_the_pool_size(monkeypatch):
+    queue = OutboundQueue()
+    rate = queue.global_bucket.rate
+    monkeypatch.setattr(outbound, "pool_size", lambda: 3)
+    queue._rescale()
+    assert queue.global_bucket.rate == rate / 3
+    assert queue.global_bucket.tokens <= queue.global_bucket.capacity == rate / 3
@@ -0,0 +1,53 @@
+import asyncio
+from types import SimpleNamespace
+
+from bot import sequences
+from bot.sequences import SequenceScheduler, _Sequence
+
+
+class _Leases:
+    """Записи message_sequences: chat_id -> owner."""
+
+    def __init__(self, owners):
+        self.owners = owners
+        self.distinct_calls = 0
+
+    async def bulk_write(self, operations, ordered=True):
+        pass
+
+    async def update_many(self, query, update):
+        return SimpleNamespace(matched_count=sum(owner == query["owner"] for owner in self.owners.values()))
+
+    async def distinct(self, field, query):
+        self.distinct_calls += 1
+        return [chat_id for chat_id, owner in self.owners.items() if owner == query["owner"]]
+
+
+def _scheduler(monkeypatch, collection):
+    monkeypatch.setattr(sequences, "get_collection", lambda name: collection)
+    scheduler = SequenceScheduler()
+    for chat_id in (1, 2):
+        scheduler._sequences[chat_id] = _Sequence(chat_id, chat_id, "panic", [(0.0, "panic_1")])
+    return scheduler
+
+
+def test_flush_renews_leases_without_listing_ids(monkeypatch):
+    collection = _Leases({})
+    scheduler = _scheduler(monkeypatch, collection)
+    collection.owners = {1: scheduler.owner, 2: scheduler.owner}
+
+    asyncio.run(scheduler.flush())
+
+    assert collection.distinct_calls == 0
+    assert scheduler.active() == 2
+
+
+def test_flush_drops_sequences_whose_lease_was_lost(monkeypatch):
+    collection = _Leases({})
+    scheduler = _scheduler(monkeypatch, collection)
+    collection.owners = {1: scheduler.owner, 2: "other-process"}
+
+    asyncio.run(scheduler.flush())
+
+    assert collection.distinct_calls == 1
+    assert list(scheduler._sequences) == [1]
@@ -0,0 +1,39 @@
+import asyncio
+
+from aiogram.fsm.storage.base import StorageKey
+
+from database.storage import MongoStorage
+
+
+class _SlowCollection:
+    def __init__(self):
+        self.writing = asyncio.Event()
+        self.written = []
+
+    async def find_one(self, query, projection=None):
+        return None
+
+    async def bulk_write(self, operations, ordered=True):
+        self.writing.set()
+        await asyncio.sleep(0.05)
+        self.written.extend(operation._filter["_id"] for operation in operations)
+
+
+def test_close_during_slow_flush_keeps_the_batch():
+    async def run():
+        collection = _SlowCollection()
+        storage = MongoStorage({"fsm_sessions": collection})
+        first = StorageKey(bot_id=1, chat_id=1, user_id=1)
+        second = StorageKey(bot_id=1, chat_id=2, user_id=2)
+
+        await storage.set_state(first, "chat")
+        storage._flush_now.set()
+        await collection.writing.wait()
+        # Запись пришла, пока первая пачка ещё пишется в базу.
+        await storage.set_state(second, "chat")
+        await storage.close()
+        return collection.written, storage.size()
+
+    written, size = asyncio.run(run())
+    assert sorted(written) == ["1:1:1:default", "1:2:2:default"]
+    assert size["pending"] == 0
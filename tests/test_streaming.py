@@ -0,0 +1,84 @@
+import asyncio
+from types import SimpleNamespace
+
+from aiogram.exceptions import TelegramBadRequest
+
+from bot import streaming
+from services import gemini
+
+
+class _Chat:
+    def __init__(self, fail_answer=False):
+        self.fail_answer = fail_answer
+        self.answers = []
+        self.bot = SimpleNamespace(send_chat_action=self._typing)
+        self.chat = SimpleNamespace(id=1)
+
+    async def _typing(self, chat_id, action):
+        pass
+
+    async def answer(self, text, parse_mode=None, reply_markup=None):
+        if self.fail_answer or not text.strip():
+            raise TelegramBadRequest(method=None, message="Bad Request: message text is empty")
+        self.answers.append((text, parse_mode))
+        return SimpleNamespace(message_id=len(self.answers), edit_text=self._edit)
+
+    async def _edit(self, text, parse_mode=None):
+        self.answers[-1] = (text, parse_mode)
+
+
+def _chunks(parts, closed):
+    async def generate():
+        try:
+            for part in parts:
+                yield part
+        finally:
+            closed.append(True)
+    return generate()
+
+
+def test_blank_chunks_are_buffered_and_sent_as_plain_text():
+    chat = _Chat()
+    closed = []
+    text = asyncio.run(streaming.answer_streaming(chat, _chunks(["", "  \n", "<b>Сәлем"], closed)))
+
+    assert text == "  \n<b>Сәлем"
+    assert chat.answers == [("  \n<b>Сәлем", None)]
+    assert closed == [True]
+
+
+def test_rejected_first_send_closes_the_stream():
+    chat = _Chat(fail_answer=True)
+    closed = []
+    text = asyncio.run(streaming.answer_streaming(chat, _chunks(["Сәлем", " әлем"], closed)))
+
+    assert text == gemini.EMPTY_REPLY
+    assert closed == [True]
+
+
+def test_stream_releases_the_slot_while_the_consumer_waits(monkeypatch):
+    class Stream:
+        def __init__(self):
+            self.parts = iter(["б", "в"])
+
+        async def __anext__(self):
+            try:
+                return SimpleNamespace(text=next(self.parts))
+            except StopIteration:
+                raise StopAsyncIteration
+
+    async def resilient(command, prompt_tokens, attempt, **options):
+        return Stream(), "а"
+
+    async def run():
+        monkeypatch.setattr(gemini, "_semaphore", asyncio.Semaphore(1))
+        monkeypatch.setattr(gemini, "_resilient", resilient)
+        chunks = gemini.stream_gemini([], "привет", "system")
+        first = await chunks.__anext__()
+        # Потребитель "ждёт Telegram", а модель уже дочитана и слот свободен.
+        await asyncio.sleep(0.01)
+        assert not gemini._semaphore.locked()
+        rest = [chunk async for chunk in chunks]
+        return [first] + rest
+
+    assert asyncio.run(run()) == ["а", "б", "в"]
@@ -0,0 +1,255 @@
+"""
+Скомпилированный каталог текстов.
+
+utils/texts_data.py (вложенные словари по языкам) собирается в плоские
+таблицы: по одной на язык, с уже подставленными запасными значениями из
+языка по умолчанию и заранее разобранными шаблонами форматирования.
+Таблицы лежат в utils/_catalog/<язык>.pickle и загружаются лениво — только
+для языков, которые реально встретились в процессе.
+
+    python -m utils.catalog [--strict]
+"""
+from pathlib import Path
+from string import Formatter
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import logging
+import os
+import pickle
+import sys
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+SOURCE_PATH = Path(__file__).with_name("texts_data.py")
+CATALOG_DIR = Path(__file__).with_name("_catalog")
+MANIFEST_NAME = "manifest.pickle"
+
+# Шаблон: кортеж пар (литерал, имя поля или None).
+Template = Tuple[Tuple[str, Optional[str]], ...]
+Table = Dict[str, Any]
+
+
+def source_hash() -> Optional[str]:
+    try:
+        data = SOURCE_PATH.read_bytes()
+    except OSError:
+        return None  # исходники не поставляются — доверяем собранному каталогу
+    return hashlib.sha256(data + str(FORMAT_VERSION).encode()).hexdigest()
+
+
+def parse_template(text: str) -> Optional[Template]:
+    """Разбирает "{field}"-шаблон один раз. None — если полей нет или формат сложнее простой подстановки."""
+    parts = []
+    has_fields = False
+    try:
+        parsed = list(Formatter().parse(text))
+    except ValueError:
+        return None
+    for literal, field, spec, conversion in parsed:
+        if field is not None:
+            if spec or conversion or not field.isidentifier():
+                return None
+            has_fields = True
+        parts.append((literal, field))
+    return tuple(parts) if has_fields else None
+
+
+class _Report:
+    def __init__(self, languages: List[str]) -> None:
+        self.missing: Dict[str, List[str]] = {language: [] for language in languages}
+        self.gaps: List[str] = []
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"missing": {lang: keys for lang, keys in self.missing.items() if keys}, "gaps": self.gaps}
+
+
+def _keyed_section(name: str, source: Dict[str, Dict[str, Any]], language: str, default: str, report: _Report) -> Dict[str, Any]:
+    keys: Dict[str, None] = {}
+    for values in source.values():
+        keys.update(dict.fromkeys(values))
+    own = source.get(language, {})
+    fallback = source.get(default, {})
+    table = {}
+    for key in keys:
+        value = own.get(key)
+        if not value:
+            report.missing[language].append(f"{name}.{key}")
+            value = fallback.get(key)
+            if not value:
+                report.gaps.append(f"{language}:{name}.{key}")
+                continue
+        table[key] = value
+    return table
+
+
+def _language_section(name: str, source: Dict[str, Any], language: str, default: str, report: _Report) -> Any:
+    value = source.get(language)
+    if not value:
+        report.missing[language].append(name)
+        value = source.get(default)
+        if not value:
+            report.gaps.append(f"{language}:{name}")
+    return value
+
+
+def _quiz(quiz_key: str, quiz: Dict[str, Any], language: str, default: str, report: _Report) -> Dict[str, Any]:
+    title = quiz["title"].get(language)
+    if not title:
+        report.missing[language].append(f"quiz.{quiz_key}.title")
+        title = quiz["title"][default]
+    questions = quiz.get("questions")
+    if language != default:
+        questions = quiz.get(f"questions_{language}") or questions
+    ranges = quiz["ranges"].get(language)
+    if not ranges:
+        report.missing[language].append(f"quiz.{quiz_key}.ranges")
+        ranges = quiz["ranges"][default]
+    return {"badge": quiz["badge"], "title": title, "questions": questions, "ranges": ranges}
+
+
+def compile_catalog() -> Tuple[Dict[str, Any], Dict[str, Table]]:
+    """Собирает манифест и таблицы всех языков из utils/texts_data.py."""
+    from utils import texts_data as src
+    from utils.texts import DEFAULT_LANGUAGE, SUPPORTED_LANGUAGES
+
+    languages = list(SUPPORTED_LANGUAGES)
+    default = DEFAULT_LANGUAGE
+    report = _Report(languages)
+    tables: Dict[str, Table] = {}
+    for language in languages:
+        texts = _keyed_section("text", src.TEXTS, language, default, report)
+        templates = {key: template for key, value in texts.items() if (template := parse_template(value))}
+        tables[language] = {
+            "text": texts,
+            "templates": templates,
+            "list": _keyed_section("list", src.LIST_TEXTS, language, default, report),
+            "quotes": _language_section("quotes", src.QUOTES, language, default, report) or [],
+            "system_prompt": _language_section("system_prompt", src.SYSTEM_PROMPTS, language, default, report),
+            "stress_levels": _language_section("stress_levels", src.STRESS_LEVELS, language, default, report),
+            "quizzes": {
+                quiz_key: _quiz(quiz_key, quiz, language, default, report)
+                for quiz_key, quiz in src.QUIZZES.items()
+            },
+            "quiz_buttons": _language_section("quiz_buttons", src.QUIZ_BUTTONS, language, default, report),
+            "menu_buttons": _language_section("menu_buttons", src.MENU_BUTTONS, language, default, report),
+            "mood_options": _language_section("mood_options", src.MOOD_OPTIONS, language, default, report),
+            "cause_options": _language_section("cause_options", src.CAUSE_OPTIONS, language, default, report),
+            "stress_options": _language_section("stress_options", src.STRESS_OPTIONS, language, default, report),
+            "quiz_answer_options": _language_section(
+                "quiz_answer_options", src.QUIZ_ANSWER_OPTIONS, language, default, report
+            ),
+        }
+
+    quiz_button_map: Dict[str, str] = {}
+    for language in languages:
+        quiz_button_map.update(src.QUIZ_BUTTONS.get(language, {}))
+    manifest = {
+        "format": FORMAT_VERSION,
+        "source_hash": source_hash(),
+        "default": default,
+        "languages": languages,
+        "quiz_button_map": quiz_button_map,
+        "language_button_labels": [tables[language]["text"].get("language_button", "") for language in languages],
+        "report": report.as_dict(),
+    }
+    for language, keys in manifest["report"]["missing"].items():
+        logger.warning("Text catalog: %s falls back to %s for %s", language, default, ", ".join(keys))
+    for gap in report.gaps:
+        logger.error("Text catalog: no value in any language for %s", gap)
+    return manifest, tables
+
+
+def _write(path: Path, value: Any) -> None:
+    # Запись через временный файл: несколько процессов могут собирать каталог одновременно.
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    with os.fdopen(fd, "wb") as file:
+        pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def build_catalog(directory: Path = CATALOG_DIR) -> Tuple[Dict[str, Any], Dict[str, Table]]:
+    manifest, tables = compile_catalog()
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        for language, table in tables.items():
+            _write(directory / f"{language}.pickle", table)
+        _write(directory / MANIFEST_NAME, manifest)
+    except OSError as e:
+        logger.warning("Text catalog: cannot write %s, keeping it in memory: %s", directory, e)
+    return manifest, tables
+
+
+def _read(path: Path) -> Any:
+    try:
+        with path.open("rb") as file:
+            return pickle.load(file)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+class Catalog:
+    def __init__(self, directory: Path = CATALOG_DIR) -> None:
+        self.directory = directory
+        self._manifest: Optional[Dict[str, Any]] = None
+        self._tables: Dict[str, Table] = {}
+
+    @property
+    def manifest(self) -> Dict[str, Any]:
+        if self._manifest is None:
+            self._manifest = self._load_manifest()
+        return self._manifest
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        manifest = _read(self.directory / MANIFEST_NAME)
+        current = source_hash()
+        if (
+            manifest is not None
+            and manifest.get("format") == FORMAT_VERSION
+            and (current is None or manifest.get("source_hash") == current)
+        ):
+            return manifest
+        manifest, tables = build_catalog(self.directory)
+        # Таблицы уже в памяти — не перечитываем их с диска.
+        self._tables.update(tables)
+        return manifest
+
+    def table(self, language: str) -> Table:
+        table = self._tables.get(language)
+        if table is not None:
+            return table
+        manifest = self.manifest
+        code = language if language in manifest["languages"] else manifest["default"]
+        table = self._tables.get(code)
+        if table is None:
+            table = _read(self.directory / f"{code}.pickle")
+            if table is None:
+                self._manifest, tables = build_catalog(self.directory)
+                self._tables.update(tables)
+                table = tables[code]
+            self._tables[code] = table
+        if language in manifest["languages"]:
+            self._tables[language] = table
+        return table
+
+
+catalog = Catalog()
+
+
+def main() -> int:
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    manifest, tables = build_catalog()
+    report = manifest["report"]
+    print(f"Built {len(tables)} languages into {CATALOG_DIR}")
+    for language, keys in report["missing"].items():
+        print(f"  {language}: {len(keys)} keys fall back to {manifest['default']}: {', '.join(keys)}")
+    for gap in report["gaps"]:
+        print(f"  gap: {gap}")
+    if "--strict" in sys.argv and (report["missing"] or report["gaps"]):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""
+Метрики процесса в текстовом формате Prometheus, без внешних зависимостей.
+
+Гистограммы хранят только счётчики по корзинам, сумму и количество: запись
+замера — bisect по корзинам и три сложения под замком (замеры Motor
+приходят из потоков pymongo). Gauge вычисляются функцией в момент запроса
+/metrics, поэтому горячие пути их не обновляют.
+"""
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+import logging
+import math
+import threading
+
+logger = logging.getLogger(__name__)
+
+LabelValues = Tuple[str, ...]
+# Значение gauge: одно число или {значения меток: число}.
+GaugeValue = Union[float, Dict[LabelValues, float]]
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 7.5, 10.0, 15.0, 20.0, 30.0, 60.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in values]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # значения меток -> [счётчики по корзинам (последняя — +Inf), сумма, количество]
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            snapshot = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        lines = []
+        for key, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, math.inf), counts):
+                cumulative += bucket_count
+                le = _labels(self.labelnames, key, f'le="{_number(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), function: Optional[Callable[[], GaugeValue]] = None
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def samples(self) -> List[str]:
+        if self.function is None:
+            return []
+        try:
+            value = self.function()
+        except Exception:
+            logger.exception("Metrics: gauge %s failed", self.name)
+            return []
+        if not isinstance(value, dict):
+            return [f"{self.name} {_number(value)}"]
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(sample)}" for key, sample in value.items()]
+
+
+class FunctionCounter(Gauge):
+    """Счётчик, который уже ведёт сам объект (например, словарь stats), читается при запросе."""
+
+    kind = "counter"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(
+        self, name: str, documentation: str, function: Callable[[], GaugeValue], labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        """Повторная регистрация с тем же именем заменяет функцию (например, при пересборке Dispatcher)."""
+        return self.register(Gauge(name, documentation, labelnames, function))
+
+    def counter_function(
+        self, name: str, documentation: str, function: Callable[[], GaugeValue], labelnames: Sequence[str] = ()
+    ) -> FunctionCounter:
+        return self.register(FunctionCounter(name, documentation, labelnames, function))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+update_latency = registry.histogram(
+    "bot_update_seconds", "Update processing time, from the dispatcher to the last handler.", ("type", "outcome")
+)
+handler_latency = registry.histogram("bot_handler_seconds", "Handler run time.", ("handler", "outcome"))
+gemini_latency = registry.histogram(
+    "bot_gemini_seconds", "Gemini request time (for streams: until the last chunk).", ("command", "mode", "outcome"),
+    buckets=SLOW_BUCKETS,
+)
+mongo_latency = registry.histogram("bot_mongo_seconds", "MongoDB command time.", ("command", "outcome"))
+
+
+async def start_metrics_server(host: str, port: int):
+    """HTTP-сервер с GET /metrics; возвращает web.AppRunner, который нужно закрыть через cleanup()."""
+    from aiohttp import web
+
+    async def handle(request: "web.Request") -> "web.Response":
+        return web.Response(body=registry.render().encode("utf-8"), headers={"Content-Type": CONTENT_TYPE})
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info("Metrics on http://%s:%d/metrics", host, port)
+    return runner
@@ -1,5 +1,5 @@
 import random
-from typing import Iterable, List, Tuple
+from typing import Iterable, List, Optional, Tuple
 
 LANGUAGE_KK = "kk"
 LANGUAGE_RU = "ru"
@@ -15,553 +15,70 @@ LANGUAGE_FLAGS = {
     LANGUAGE_RU: "🇷🇺",
 }
 
-SYSTEM_PROMPTS = {
-    LANGUAGE_KK: (
-        "Сен қазақ тілінде сөйлейтін мейірімді психологиялық ассистентсің. "
-        "Эмоцияны байқап, ықтимал себепті көрсетіп, үш қысқа кеңес бер. "
-        "Өзін-өзі жарақаттау туралы мәтін болса, қауіпсіздік туралы ескерту қос."
-    ),
-    LANGUAGE_RU: (
-        "Ты доброжелательный психологический ассистент, отвечаешь на русском языке. "
-        "Замечай эмоцию, предположенную причину и давай три коротких совета. "
-        "Если в тексте есть упоминание самоповреждения, добавь предупреждение о безопасности."
-    ),
-}
-
-TEXTS = {
-    LANGUAGE_KK: {
-        "start_prompt": "Қай сервисті таңдайсыз? Тестті таңдаңыз немесе CHAT AI арқылы сөйлесіңіз.",
-        "chat_started": "CHAT AI іске қосылды. Сұрағыңызды немесе ойыңызды жазыңыз. Қызметтерді ауыстыру үшін төмендегі мәзірді пайдаланыңыз.",
-        "finish_quiz_first": "Алдымен тестті аяқтаңыз.",
-        "complete_other_step": "Қазір басқа қадам жүріп жатыр. Басты мәзірден CHAT AI батырмасын баспас бұрын оны аяқтаңыз.",
-        "start_chat_first": "AI-пен сөйлесу үшін басты мәзірдегі CHAT AI батырмасын басыңыз.",
-        "unknown_quiz": "Белгісіз тест.",
-        "quiz_intro": "{quiz_header}\n10 сұраққа Иә/Жоқ деп жауап беріңіз.",
-        "quiz_in_progress": "Қазір тест жүріп жатыр. Иә/Жоқ батырмаларын пайдаланыңыз.",
-        "quiz_not_found": "Тест табылмады. Басты мәзірден қайта таңдаңыз.",
-        "greeting": "Сәлем 🙂\nБүгін өзіңізді қалай сезініп тұрсыз?",
-        "checkin_thanks": "Рахмет. Сезіміңіз тіркелді.",
-        "checkin_prompt": "Бүгінгі көңіл-күйге не себеп болып тұр?",
-        "stats_empty": "Соңғы 7 күнде жазбалар жоқ. Көңіл-күйіңізді жазу үшін /start командасын пайдаланыңыз.",
-        "stats_title": "Апталық көңіл-күй қорытындысы",
-        "stats_count": "Жазбалар саны:",
-        "stats_average": "Орташа көңіл-күй ұпайы:",
-        "stats_triggers": "Ең жиі себептер:",
-        "stats_best_day": "Ең жеңіл күн:",
-        "stats_worst_day": "Қиын күн:",
-        "stress_score_label": "Ұпай:",
-        "stress_level_label": "Деңгей:",
-        "triggers_empty": "Тригерлер тіркелмеген.",
-        "mood_usage": "/mood кейін 1-10 аралығындағы ұпайды жазыңыз (мысалы, /mood 7).",
-        "mood_integer": "Тек бүтін сан енгізіңіз: 1-ден 10-ға дейін.",
-        "mood_range": "Ұпай 1-10 аралығында болуы тиіс.",
-        "mood_saved": "Көңіл-күй ұпайы {score} ретінде сақталды. Рахмет!",
-        "idea_author": (
-            "💡 Автор идеи\n"
-            "Бекболат Сабырбай\n"
-            "Создатель концепции проекта, определивший направление и содержание mental_bot."
-        ),
-        "stress_intro": "Қысқа 7 сұрақтан тұратын стресс тестін бастайық.",
-        "stress_completed": "Стресс тесті аяқталды.",
-        "panic_intro": "Мына тыныштандыру жаттығуын бірге орындайық.",
-        "breath_intro": "4-7-8 тыныс жаттығуын бірге жасайық. Ыңғайлы отырыңыз.",
-        "language_prompt": "Тілді таңдаңыз:",
-        "language_updated": "Тіл орнатылды: {language}.",
-        "language_button": "🌐 Тілді өзгерту",
-        "back_to_menu": "🏠 Басты мәзір",
-        "ai_usage": "/ai кейін мәселе немесе ойыңызды жазыңыз.",
-        "emotion_usage": "Эмоцияны анықтау үшін /emo кейін мәтін жазыңыз.",
-        "reframe_usage": "Теріс ойды қайта қарау үшін /reframe кейін ойды жазыңыз.",
-        "decision_usage": "Мәселені жазу үшін /decision кейін мәтін қосыңыз.",
-        "stress_ai_usage": "Стресс туғызатын жағдайды /stress_ai кейін жазыңыз.",
-        "mental_ai_usage": "/mental_ai кейін қызықтыратын психология тақырыбын немесе сұрағыңызды жазыңыз.",
-        "ai_chat_prompt": (
-            "Пайдаланушының мәтіні: {user_text}\nЭмоция → себеп → 3 кеңес → қолдау форматын сақта. "
-            "Тек психологиялық қолдау көрсет, басқа тақырыптарды талқылаудан сыпайы түрде бас тарт."
-        ),
-        "emotion_prompt": "Эмоцияны қысқа ата, ықтимал себепті көрсет және 3 қолдау кеңесін жаз. Мәтін: {user_text}",
-        "reframe_prompt": "Теріс ойды CBT тәсілімен қайта құрыңыз. Эмоция → себеп → 3 жаңа ой → қолдау форматын сақта. Ой: {user_text}",
-        "decision_prompt": "Проблеманы шешу үшін 3 нақты қадам ұсын. Әр қадам қысқа әрекет болсын. Мәселе: {user_text}",
-        "stress_ai_prompt": "Мәтінді оқып, стресс деңгейін (төмен/орташа/жоғары) белгіле. Себебін қысқа түсіндіріп, 3 нақты кеңес бер. Мәтін: {user_text}",
-        "mental_ai_prompt": (
-            "Пайдаланушымен психологиялық қолдау аясында еркін сөйлес. Тақырып: {user_text}. "
-            "Егер сұрақ психологияға қатыссыз болса, әдепті түрде тек көңіл-күй, стресс немесе өзін күту туралы сөйлесе алатыныңды айт. "
-            "Ашық сұрақ қойып, жылы әрі қысқа жауап бер."
-        ),
-        "fallback_prompt": (
-            "Қысқа әрі нақты жауап бер, эмоция мен қолдауды ұмытпа. "
-            "Тек психологиялық қолдау бер, басқа тақырыптарды сыпайы түрде талқылаудан бас тарт."
-        ),
-        "mood_scale_label": "Шкала бойынша",
-        "quiz_completed": "{quiz_header} аяқталды!",
-        "score_label": "Ұпай:",
-        "result_label": "Нәтиже:",
-        "advice_label": "Кеңес:",
-    },
-    LANGUAGE_RU: {
-        "start_prompt": "Что выберем? Пройдите тест или пообщайтесь через CHAT AI.",
-        "chat_started": "CHAT AI запущен. Напишите вопрос или мысль. Чтобы сменить сервис, используйте меню ниже.",
-        "finish_quiz_first": "Сначала завершите тест.",
-        "complete_other_step": "Сейчас идёт другой шаг. Завершите его перед нажатием кнопки CHAT AI в меню.",
-        "start_chat_first": "Чтобы общаться с ИИ, нажмите кнопку CHAT AI в главном меню.",
-        "unknown_quiz": "Неизвестный тест.",
-        "quiz_intro": "{quiz_header}\nОтветьте Да/Нет на 10 вопросов.",
-        "quiz_in_progress": "Сейчас идёт тест. Пользуйтесь кнопками Да/Нет.",
-        "quiz_not_found": "Тест не найден. Выберите его снова в главном меню.",
-        "greeting": "Привет 🙂\nКак ты себя чувствуешь сегодня?",
-        "checkin_thanks": "Спасибо. Ваше состояние записано.",
-        "checkin_prompt": "Что повлияло на ваше настроение сегодня?",
-        "stats_empty": "За последние 7 дней записей нет. Используйте команду /start, чтобы отметить настроение.",
-        "stats_title": "Итоги настроения за неделю",
-        "stats_count": "Количество записей:",
-        "stats_average": "Средний балл настроения:",
-        "stats_triggers": "Частые причины:",
-        "stats_best_day": "Самый лёгкий день:",
-        "stats_worst_day": "Сложный день:",
-        "stress_score_label": "Баллы:",
-        "stress_level_label": "Уровень:",
-        "triggers_empty": "Триггеры не зафиксированы.",
-        "mood_usage": "После /mood укажите балл от 1 до 10 (например, /mood 7).",
-        "mood_integer": "Введите целое число от 1 до 10.",
-        "mood_range": "Бал должен быть в диапазоне 1-10.",
-        "mood_saved": "Балл настроения сохранён как {score}. Спасибо!",
-        "idea_author": (
-            "💡 Автор идеи\n"
-            "Бекболат Сабырбай\n"
-            "Создатель концепции проекта, определивший направление и содержание mental_bot."
-        ),
-        "stress_intro": "Начнём короткий стресс-тест из 7 вопросов.",
-        "stress_completed": "Стресс-тест завершён.",
-        "panic_intro": "Давайте вместе сделаем это упражнение для успокоения.",
-        "breath_intro": "Сделаем дыхание 4-7-8. Удобно устройтесь.",
-        "language_prompt": "Выберите язык:",
-        "language_updated": "Язык установлен: {language}.",
-        "language_button": "🌐 Сменить язык",
-        "back_to_menu": "🏠 Главное меню",
-        "ai_usage": "После /ai напишите проблему или мысль.",
-        "emotion_usage": "Чтобы определить эмоцию, напишите текст после /emo.",
-        "reframe_usage": "Чтобы пересобрать мысль, напишите её после /reframe.",
-        "decision_usage": "Добавьте текст после /decision, чтобы сформулировать задачу.",
-        "stress_ai_usage": "Опишите стрессовую ситуацию после /stress_ai.",
-        "mental_ai_usage": "После /mental_ai напишите интересующую тему или вопрос о психологии.",
-        "ai_chat_prompt": (
-            "Текст пользователя: {user_text}\nСохраняй формат: эмоция → причина → 3 совета → поддержка. "
-            "Отвечай только в теме психологического благополучия; посторонние запросы вежливо отклоняй."
-        ),
-        "emotion_prompt": "Определи эмоцию, укажи вероятную причину и дай 3 поддерживающих совета. Текст: {user_text}",
-        "reframe_prompt": "Пересобери негативную мысль по CBT. Формат: эмоция → причина → 3 новых мысли → поддержка. Мысль: {user_text}",
-        "decision_prompt": "Предложи 3 конкретных шага для решения. Каждый шаг — короткое действие. Задача: {user_text}",
-        "stress_ai_prompt": "Прочитай текст и оцени уровень стресса (низкий/средний/высокий). Кратко объясни причину и дай 3 конкретных совета. Текст: {user_text}",
-        "mental_ai_prompt": (
-            "Общайся в рамках психологической поддержки. Тема: {user_text}. "
-            "Если вопрос не про эмоции или ментальное здоровье, мягко скажи, что отвечаешь только в этой сфере, и предложи обсудить чувства, стресс или заботу о себе. "
-            "Задай открытый вопрос, отвечай тепло и кратко."
-        ),
-        "fallback_prompt": (
-            "Отвечай кратко и конкретно, не забывай об эмоциях и поддержке. "
-            "Работай только с темами психологической поддержки и мягко отказывайся от других тем."
-        ),
-        "mood_scale_label": "По шкале",
-        "quiz_completed": "{quiz_header} завершён!",
-        "score_label": "Баллы:",
-        "result_label": "Результат:",
-        "advice_label": "Совет:",
-    },
-}
-
-LIST_TEXTS = {
-    LANGUAGE_KK: {
-        "breath_steps": [
-            "Мұрынмен терең тыныс алыңыз (4 секунд).",
-            "Тынысты ұстап тұрыңыз (7 секунд).",
-            "Ауыз арқылы баяу шығарыңыз (8 секунд).",
-            "Қайталап көріңіз, өзіңізді жайлы сезінгенше 3-5 цикл жасаңыз.",
-        ],
-        "stress_questions": [
-            "Күнделікті істер қатты шаршататындай көрінеді.",
-            "Тыныш ортада да босаңсу қиын.",
-            "Ұйқым мазасыз немесе бөлінеді.",
-            "Өзімді үнемі күштеніп, мазасыз сезінемін.",
-            "Назарымды жағдаятқа шоғырландыру қиындайды.",
-            "Әдеттегіден жиірек ашуланамын.",
-            "Жиі бас ауырады немесе дене ширығады.",
-        ],
-        "panic_breathing_steps": [
-            "Терең тыныс алыңыз (4 секунд)",
-            "Тынысты ұстаңыз (7 секунд)",
-            "Баяу шығарыңыз (8 секунд)",
-        ],
-        "panic_grounding_steps": [
-            "Жерге бекіну жаттығуы:",
-            "Көріп тұрған 5 затты атаңыз.",
-            "Ұстай алатын 4 затты атаңыз.",
-            "Ести алатын 3 дыбысты атаңыз.",
-            "Иіскей алатын 2 нәрсені атаңыз.",
-            "Дәмін сезе алатын 1 нәрсені атаңыз.",
-        ],
-    },
-    LANGUAGE_RU: {
-        "breath_steps": [
-            "Сделайте глубокий вдох носом (4 секунды).",
-            "Задержите дыхание (7 секунд).",
-            "Медленно выдохните через рот (8 секунд).",
-            "Повторите 3-5 циклов, пока не почувствуете комфорт.",
-        ],
-        "stress_questions": [
-            "Кажется, что повседневные дела сильно утомляют.",
-            "Даже в спокойной обстановке сложно расслабиться.",
-            "Сон беспокойный или прерывистый.",
-            "Часто чувствую напряжение и тревогу.",
-            "Трудно удерживать внимание на задаче.",
-            "Злюсь чаще, чем обычно.",
-            "Часто болит голова или чувствуется напряжение в теле.",
-        ],
-        "panic_breathing_steps": [
-            "Сделайте глубокий вдох (4 секунды)",
-            "Задержите дыхание (7 секунд)",
-            "Медленно выдохните (8 секунд)",
-        ],
-        "panic_grounding_steps": [
-            "Упражнение заземления:",
-            "Назовите 5 предметов, которые видите.",
-            "Назовите 4 предмета, которые можете потрогать.",
-            "Назовите 3 звука, которые слышите.",
-            "Назовите 2 запаха, которые чувствуете.",
-            "Назовите 1 вкус, который ощущаете.",
-        ],
-    },
-}
-
-
-QUOTES = {
-    LANGUAGE_KK: [
-        "Өзіңізге мейіріммен қараңыз: кішкентай қадамдар да алға жылжудың белгісі.",
-        "Тыныс алыңыз, тоқтаңыз және өзіңізге демалуға рұқсат беріңіз – сіз бұған лайықсыз.",
-        "Қиын күндер өтеді, ал сіздің төзімділігіңіз қалады. Өз күшіңізге сеніңіз.",
-    ],
-    LANGUAGE_RU: [
-        "Отнеситесь к себе с добротой: маленькие шаги тоже движение вперёд.",
-        "Сделайте вдох и позвольте себе передышку – вы заслужили это.",
-        "Сложные дни проходят, а ваша стойкость остаётся. Верьте в свои силы.",
-    ],
-}
+# Сами тексты — в utils/texts_data.py, здесь только доступ к собранному каталогу.
+from utils.catalog import catalog  # noqa: E402
 
 
 def get_random_quote(language: str) -> str:
-    quotes = QUOTES.get(language) or QUOTES.get(DEFAULT_LANGUAGE) or []
+    quotes = catalog.table(language)["quotes"]
     if not quotes:
         return ""
     return random.choice(quotes)
 
-STRESS_LEVELS = {
-    LANGUAGE_KK: {
-        "low": "төмен стресс",
-        "medium": "орташа стресс",
-        "high": "жоғары стресс",
-    },
-    LANGUAGE_RU: {
-        "low": "низкий стресс",
-        "medium": "средний стресс",
-        "high": "высокий стресс",
-    },
-}
-
-QUIZZES = {
-    "stress_level": {
-        "badge": "🌡️",
-        "title": {
-            LANGUAGE_KK: "1-Ойын: Стресс деңгейін анықтау тесті",
-            LANGUAGE_RU: "1-Игра: Тест на уровень стресса",
-        },
-        "questions": LIST_TEXTS[LANGUAGE_KK]["stress_questions"],
-        "questions_ru": LIST_TEXTS[LANGUAGE_RU]["stress_questions"],
-        "ranges": {
-            LANGUAGE_KK: [
-                (3, "Төмен стресс", "Ұпай аз – күш-қуатыңыз жақсы. Режимді сақтап, демалысты ұмытпаңыз."),
-                (6, "Орташа стресс", "Аздап шаршау бар. Кішкентай үзілістер, жеңіл жаттығу мен ұйқы тәртібі көмектеседі."),
-                (10, "Жоғары стресс", "Күшті стресс байқалады. Жұмысты жеңілдету, демалыс жоспарлау және қажет болса маманға жүгіну маңызды."),
-            ],
-            LANGUAGE_RU: [
-                (3, "Низкий стресс", "Набрано мало баллов — ресурс в порядке. Сохраняйте режим и не забывайте об отдыхе."),
-                (6, "Средний стресс", "Чувствуется лёгкая усталость. Помогут короткие перерывы, лёгкая активность и режим сна."),
-                (10, "Высокий стресс", "Отмечается сильное напряжение. Упростите задачи, запланируйте отдых и при необходимости обратитесь к специалисту."),
-            ],
-        },
-    },
-    "personality": {
-        "badge": "🧬 ",
-        "title": {
-            LANGUAGE_KK: "2-Ойын: Интроверт пе, экстраверт пе?",
-            LANGUAGE_RU: "2-Игра: Интроверт или экстраверт?",
-        },
-        "questions": [
-            "Жалғыз өткізетін уақыт сізге ұнай ма?",
-            "Көп адаммен бірге болу сізді шаршата ма?",
-            "Жаңа адамдармен танысу оңай ма?",
-            "Мерекелерде көпшіліктің ортасында жүруді ұнатасыз ба?",
-            "Телефон қоңырауынан қашатын кездеріңіз бола ма?",
-            "Әңгіме бастау сізге оңай ма?",
-            "Жалғыз қалу сізге энергия береді ме?",
-            "Топпен жұмыс істегенді жақсы көресіз бе?",
-            "Өз сезімдеріңізді білдіру қиынға соға ма?",
-            "Алдын ала жоспарсыз, кенеттен бір нәрсе жасауды ұнатасыз ба?",
-        ],
-        "questions_ru": [
-            "Вам нравится проводить время наедине?",
-            "В компании большого количества людей вы быстро устаёте?",
-            "Легко ли знакомиться с новыми людьми?",
-            "Любите быть в центре внимания на праздниках?",
-            "Бывает, что избегаете телефонных звонков?",
-            "Легко ли вам начинать разговор?",
-            "Дарит ли одиночество энергию?",
-            "Нравится работать в команде?",
-            "Трудно ли выражать свои чувства?",
-            "Любите ли внезапные действия без плана?",
-        ],
-        "ranges": {
-            LANGUAGE_KK: [
-                (3, "Көбірек экстраверт", "Әңгіме мен адамдардан күш аласыз. Топтық жобалар мен коммуникация қажет салалар сай келеді."),
-                (6, "Амбиверт", "Екі жаққа да бейімсіз: жалғыздық пен компанияны тең ұнатасыз. Жұмыс таңдағанда тепе-теңдік жасаңыз."),
-                (10, "Көбірек интроверт", "Тыныш орта мен жеке жұмысқа бейімсіз. Жұмысты жоспарлап, демалысқа уақыт бөліп отырыңыз."),
-            ],
-            LANGUAGE_RU: [
-                (3, "Ближе к экстраверту", "Вы заряжаетесь от общения. Подойдут проекты с командной работой и коммуникацией."),
-                (6, "Амбиверт", "Комфортны и в одиночестве, и в компании. Выбирайте деятельность с балансом обоих форматов."),
-                (10, "Ближе к интроверту", "Вам подходит спокойная среда и индивидуальная работа. Планируйте задачи и отдых."),
-            ],
-        },
-    },
-    "motivation": {
-        "badge": "🔥",
-        "title": {
-            LANGUAGE_KK: "3-Ойын: Мотивация түрін анықтау (ішкі/сыртқы)",
-            LANGUAGE_RU: "3-Игра: Определяем тип мотивации (внутренняя/внешняя)",
-        },
-        "questions": [
-            "Тапсырма орындауда ең маңыздысы – нәтиже деп ойлайсыз ба?",
-            "Мақтау естігенде көбірек ынталанасыз ба?",
-            "Жаңа нәрсе үйрену сізге қызық па?",
-            "Сыйлық болмаса жұмыс істеу қиын ба?",
-            "Мақсат қоюды жақсы көресіз бе?",
-            "Процестен гөрі нәтижені маңызды санайсыз ба?",
-            "Өз дамуыңыз үшін қиын тапсырмалар алуға дайынсыз ба?",
-            "Біреулер күткені үшін жұмыс істейтін кезіңіз бола ма?",
-            "Өзіңізді жетілдіруге бағытталған істер мотивация береді ме?",
-            "Нәтиже тез көрінбесе, қызығушылық тез сөне ме?",
-        ],
-        "questions_ru": [
-            "Считаете ли результат главным при выполнении задачи?",
-            "Больше ли вас мотивирует похвала?",
-            "Интересно ли вам учиться новому?",
-            "Сложно ли работать без награды?",
-            "Любите ли ставить цели?",
-            "Важнее ли для вас результат, чем процесс?",
-            "Готовы ли брать сложные задачи ради развития?",
-            "Бывает, что работаете, потому что этого ждут другие?",
-            "Мотивируют ли задачи на саморазвитие?",
-            "Если результат не видно сразу, интерес быстро угасает?",
-        ],
-        "ranges": {
-            LANGUAGE_KK: [
-                (3, "Ішкі мотивация басым", "Үйрену мен даму сізді алға жетелейді. Жеке мақсат қойып, прогресті бақылаңыз."),
-                (6, "Аралас мотивация", "Ішкі де, сыртқы да ынталандыру әсер етеді. Екеуін тең ұштастырып, өзіңізді марапаттауды ұмытпаңыз."),
-                (10, "Сыртқы мотивация басым", "Қарапайым сыйақы мен кері байланыс маңызды. Нәтижені бөлшектеп, аралық жетістіктерге сый жасаңыз."),
-            ],
-            LANGUAGE_RU: [
-                (3, "Преобладает внутренняя мотивация", "Вас движет обучение и рост. Ставьте личные цели и отслеживайте прогресс."),
-                (6, "Смешанная мотивация", "Работают и внутренние, и внешние факторы. Сочетайте их и не забывайте поощрять себя."),
-                (10, "Преобладает внешняя мотивация", "Важно вознаграждение и обратная связь. Делите результат на этапы и празднуйте промежуточные успехи."),
-            ],
-        },
-    },
-    "career": {
-        "badge": "💼",
-        "title": {
-            LANGUAGE_KK: "4-Ойын: Саған қай мамандық сәйкес келеді? (Мини-карьера тест)",
-            LANGUAGE_RU: "4-Игра: Какая профессия вам подходит? (мини-тест)",
-        },
-        "questions": [
-            "Адамдармен жұмыс істеу сізге ұнай ма?",
-            "Техника мен бағдарламалауға қызығасыз ба?",
-            "Командада жұмыс істеу ыңғайлы ма?",
-            "Графикалық дизайнға қызығуыңыз бар ма?",
-            "Сөйлеп, презентация жасағанды ұнатасыз ба?",
-            "Мәселелерді шешу сізді қызықтыра ма?",
-            "Санмен жұмыс істеу ұнай ма?",
-            "Жаңа идеялар ойлап табу қолыңыздан келе ме?",
-            "Тәртіп пен нақты жоспар сізге маңызды ма?",
-            "Бір уақытта бірнеше істі қатар атқара аласыз ба?",
-        ],
-        "questions_ru": [
-            "Нравится ли вам работать с людьми?",
-            "Интересуетесь ли техникой и программированием?",
-            "Удобно ли работать в команде?",
-            "Есть ли интерес к графическому дизайну?",
-            "Любите ли выступать и делать презентации?",
-            "Интересно ли решать проблемы?",
-            "Нравится ли работать с цифрами?",
-            "Легко ли придумывать новые идеи?",
-            "Важно ли для вас соблюдать порядок и чёткий план?",
-            "Можете ли делать несколько дел одновременно?",
-        ],
-        "ranges": {
-            LANGUAGE_KK: [
-                (3, "Шығармашылық/бейтарап бағыт", "Бірнеше саланы байқап көру керек. Хобби форматында тест жасап, өзіңізге ұнайтын бағытты белгілеңіз."),
-                (6, "Теңгерімді әмбебаптығыңыз бар", "Жоба менеджменті, өнім дайындау немесе аналитика сияқты аралас салаларға бейімсіз."),
-                (10, "Адамдармен және идеямен жұмыс", "Коммуникация, дизайн не IT жобалары сай келеді. Өзекті курстарды қарап, шағын пилот жобадан бастаңыз."),
-            ],
-            LANGUAGE_RU: [
-                (3, "Творческое/нейтральное направление", "Стоит попробовать разные сферы. Начните с хобби-формата, чтобы понять, что нравится."),
-                (6, "Хороший баланс навыков", "Подойдут гибридные роли: проджект- или продукт-менеджмент, аналитика."),
-                (10, "Работа с людьми и идеями", "Подойдут коммуникации, дизайн или IT-проекты. Изучите актуальные курсы и начните с малого пилота."),
-            ],
-        },
-    },
-}
-
-QUIZ_BUTTONS = {
-    LANGUAGE_KK: {
-        "🌡️ Стресс тесті": "stress_level",
-        "🧬 Интроверт/Экстраверт": "personality",
-        "🔥 Мотивация түрі": "motivation",
-        "💼 Қай мамандық?": "career",
-    },
-    LANGUAGE_RU: {
-        "🌡️ Тест на стресс": "stress_level",
-        "🧬 Интроверт/Экстраверт": "personality",
-        "🔥 Тип мотивации": "motivation",
-        "💼 Какая профессия?": "career",
-    },
-}
-
-MENU_BUTTONS = {
-    LANGUAGE_KK: [
-        "🌡️ Стресс тесті",
-        "🧬 Интроверт/Экстраверт",
-        "🔥 Мотивация түрі",
-        "💼 Қай мамандық?",
-        "🤖 CHAT AI",
-        "🌐 Тілді өзгерту",
-        "💡 Автор идеи",
-    ],
-    LANGUAGE_RU: [
-        "🌡️ Тест на стресс",
-        "🧬 Интроверт/Экстраверт",
-        "🔥 Тип мотивации",
-        "💼 Какая профессия?",
-        "🤖 CHAT AI",
-        "🌐 Сменить язык",
-        "💡 Автор идеи",
-    ],
-}
-
-MOOD_OPTIONS = {
-    LANGUAGE_KK: [
-        ("😊 Өте жақсы", "great"),
-        ("🙂 Жақсы", "fine"),
-        ("😐 Жәй", "okay"),
-        ("😞 Жаман", "bad"),
-        ("😡 Ашулы", "angry"),
-        ("😴 Шаршаған", "tired"),
-    ],
-    LANGUAGE_RU: [
-        ("😊 Отлично", "great"),
-        ("🙂 Хорошо", "fine"),
-        ("😐 Нормально", "okay"),
-        ("😞 Плохо", "bad"),
-        ("😡 Злюсь", "angry"),
-        ("😴 Устал", "tired"),
-    ],
-}
 
-CAUSE_OPTIONS = {
-    LANGUAGE_KK: [
-        ("Жұмыс", "work"),
-        ("Оқу", "study"),
-        ("Ұйқы", "sleep"),
-        ("Қатынас", "relationship"),
-        ("Отбасы", "family"),
-        ("Белгісіз", "unknown"),
-    ],
-    LANGUAGE_RU: [
-        ("Работа", "work"),
-        ("Учёба", "study"),
-        ("Сон", "sleep"),
-        ("Отношения", "relationship"),
-        ("Семья", "family"),
-        ("Неопределено", "unknown"),
-    ],
-}
-
-STRESS_OPTIONS = {
-    LANGUAGE_KK: [("Иә", "yes"), ("Жоқ", "no")],
-    LANGUAGE_RU: [("Да", "yes"), ("Нет", "no")],
-}
-
-QUIZ_ANSWER_OPTIONS = {
-    LANGUAGE_KK: [("Иә", "yes"), ("Жоқ", "no")],
-    LANGUAGE_RU: [("Да", "yes"), ("Нет", "no")],
-}
+def get_text(key: str, language: str) -> str:
+    return catalog.table(language)["text"].get(key, "")
 
 
-def get_text(key: str, language: str) -> str:
-    language_map = TEXTS.get(language, TEXTS[DEFAULT_LANGUAGE])
-    fallback_map = TEXTS[DEFAULT_LANGUAGE]
-    return language_map.get(key) or fallback_map.get(key, "")
+def render_text(key: str, language: str, **values: object) -> str:
+    """get_text(...).format(**values), но шаблон разобран заранее при сборке каталога."""
+    table = catalog.table(language)
+    template = table["templates"].get(key)
+    if template is None:
+        text = table["text"].get(key, "")
+        return text.format(**values) if values else text
+    return "".join(
+        literal if field is None else f"{literal}{values[field]}"
+        for literal, field in template
+    )
 
 
 def get_list(key: str, language: str) -> List[str]:
-    language_map = LIST_TEXTS.get(language, LIST_TEXTS[DEFAULT_LANGUAGE])
-    fallback_map = LIST_TEXTS[DEFAULT_LANGUAGE]
-    return language_map.get(key) or fallback_map.get(key, [])
+    return catalog.table(language)["list"].get(key, [])
 
 
 def get_system_prompt(language: str) -> str:
-    return SYSTEM_PROMPTS.get(language, SYSTEM_PROMPTS[DEFAULT_LANGUAGE])
+    return catalog.table(language)["system_prompt"]
 
 
 def get_quiz(language: str, quiz_key: str) -> dict:
-    quiz = QUIZZES[quiz_key]
-    lang = language if language in TEXTS else DEFAULT_LANGUAGE
-    questions = quiz.get("questions")
-    if lang == LANGUAGE_RU and quiz.get("questions_ru"):
-        questions = quiz["questions_ru"]
-    ranges = quiz["ranges"].get(lang) or quiz["ranges"][DEFAULT_LANGUAGE]
-    return {
-        "badge": quiz["badge"],
-        "title": quiz["title"].get(lang) or quiz["title"][DEFAULT_LANGUAGE],
-        "questions": questions,
-        "ranges": ranges,
-    }
-
-
-def get_quiz_button_map(language: str | None = None) -> dict:
-    if language and language in QUIZ_BUTTONS:
-        return QUIZ_BUTTONS[language]
-    merged: dict = {}
-    for lang_map in QUIZ_BUTTONS.values():
-        merged.update(lang_map)
-    return merged
+    return catalog.table(language)["quizzes"][quiz_key]
+
+
+def get_quiz_button_map(language: Optional[str] = None) -> dict:
+    if language and language in SUPPORTED_LANGUAGES:
+        return catalog.table(language)["quiz_buttons"]
+    return catalog.manifest["quiz_button_map"]
 
 
 def get_menu_buttons(language: str) -> List[str]:
-    return MENU_BUTTONS.get(language, MENU_BUTTONS[DEFAULT_LANGUAGE])
+    return catalog.table(language)["menu_buttons"]
 
 
 def get_mood_options(language: str) -> List[Tuple[str, str]]:
-    return MOOD_OPTIONS.get(language, MOOD_OPTIONS[DEFAULT_LANGUAGE])
+    return catalog.table(language)["mood_options"]
 
 
 def get_cause_options(language: str) -> List[Tuple[str, str]]:
-    return CAUSE_OPTIONS.get(language, CAUSE_OPTIONS[DEFAULT_LANGUAGE])
+    return catalog.table(language)["cause_options"]
 
 
 def get_stress_options(language: str) -> List[Tuple[str, str]]:
-    return STRESS_OPTIONS.get(language, STRESS_OPTIONS[DEFAULT_LANGUAGE])
+    return catalog.table(language)["stress_options"]
 
 
 def get_quiz_answer_options(language: str) -> List[Tuple[str, str]]:
-    return QUIZ_ANSWER_OPTIONS.get(language, QUIZ_ANSWER_OPTIONS[DEFAULT_LANGUAGE])
+    return catalog.table(language)["quiz_answer_options"]
 
 
 def get_language_options() -> Iterable[Tuple[str, str]]:
@@ -576,7 +93,7 @@ def get_language_names() -> List[str]:
 
 
 def language_button_labels() -> List[str]:
-    return [TEXTS[lang]["language_button"] for lang in TEXTS]
+    return catalog.manifest["language_button_labels"]
 
 
 def get_back_to_menu_label(language: str) -> str:
@@ -584,7 +101,7 @@ def get_back_to_menu_label(language: str) -> str:
 
 
 def get_stress_level_labels(language: str) -> dict:
-    return STRESS_LEVELS.get(language, STRESS_LEVELS[DEFAULT_LANGUAGE])
+    return catalog.table(language)["stress_levels"]
 
 
 def get_language_label(language: str) -> str: